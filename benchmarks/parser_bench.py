@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import fitz  # PyMuPDF
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.parser.model import ParserOptions  # noqa: E402
+from src.parser.parser import LINE_Y_TOLERANCE, PARSER_VERSION, Parser  # noqa: E402
+
+from benchmarks.synthetic import SyntheticSpec, generate_report  # noqa: E402
+
+
+RESULT_FORMAT_VERSION: int = 1
+DEFAULT_OUT: Path = PROJECT_ROOT / "output" / "bench" / "parser_bench.json"
+
+
+@dataclass(frozen=True)
+class ScenarioResult:
+    name: str
+    spec: Dict[str, Any]
+    pages: int
+    spans: int
+    lines: int
+    repeat: int
+    best_s: float
+    pages_per_s: float
+    spans_per_s: float
+    stages_s: Dict[str, float]
+    peak_python_bytes: int
+
+
+def default_specs(quick: bool = False) -> List[SyntheticSpec]:
+    edge = LINE_Y_TOLERANCE * 0.95
+    if quick:
+        return [
+            SyntheticSpec(pages=2, lines_per_page=40, spans_per_line=4),
+            SyntheticSpec(pages=2, lines_per_page=40, spans_per_line=4, y_jitter=edge, mixed_font_ratio=0.3),
+        ]
+    specs: List[SyntheticSpec] = []
+    for pages in (1, 10, 50):
+        for spans_per_line in (2, 6, 12):
+            specs.append(SyntheticSpec(pages=pages, lines_per_page=70, spans_per_line=spans_per_line))
+    specs.append(SyntheticSpec(pages=10, lines_per_page=70, spans_per_line=6, y_jitter=edge))
+    specs.append(SyntheticSpec(pages=10, lines_per_page=70, spans_per_line=6, y_jitter=edge, mixed_font_ratio=0.3))
+    specs.append(SyntheticSpec(pages=10, lines_per_page=35, spans_per_line=6, y_jitter=LINE_Y_TOLERANCE * 1.5))
+    return specs
+
+
+def run_scenario(spec: SyntheticSpec, options: ParserOptions, workdir: Path, repeat: int = 3) -> ScenarioResult:
+    pdf = workdir / f"{spec.name}.pdf"
+    spans = generate_report(spec, str(pdf))
+    parser = Parser(options)
+
+    best = float("inf")
+    line_count = 0
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        doc = parser.parse(str(pdf))
+        best = min(best, time.perf_counter() - t0)
+        line_count = sum(len(p.lines) for p in doc.pages)
+
+    stages = _time_stages(parser, str(pdf))
+
+    tracemalloc.start()
+    try:
+        parser.parse(str(pdf))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return ScenarioResult(
+        name=spec.name,
+        spec=asdict(spec),
+        pages=spec.pages,
+        spans=spans,
+        lines=line_count,
+        repeat=max(1, repeat),
+        best_s=best,
+        pages_per_s=spec.pages / best if best > 0 else 0.0,
+        spans_per_s=spans / best if best > 0 else 0.0,
+        stages_s=stages,
+        peak_python_bytes=peak,
+    )
+
+
+def _time_stages(parser: Parser, pdf_path: str) -> Dict[str, float]:
+    # Mirrors Parser._extract_page_lines_position_based, timing each stage separately.
+    stages = {"open_load": 0.0, "extract": 0.0, "cluster": 0.0, "join": 0.0}
+    t0 = time.perf_counter()
+    with fitz.open(pdf_path) as doc:
+        stages["open_load"] += time.perf_counter() - t0
+        for page_index in range(doc.page_count):
+            t0 = time.perf_counter()
+            page = doc.load_page(page_index)
+            t1 = time.perf_counter()
+            fragments = parser._extract_fragments(page)
+            t2 = time.perf_counter()
+            stages["open_load"] += t1 - t0
+            stages["extract"] += t2 - t1
+            if parser._numpy_layout is not None:
+                # numpy engine clusters and joins in one pass
+                parser._numpy_layout.build_lines(fragments)
+                stages["cluster"] += time.perf_counter() - t2
+                continue
+            clusters = parser._cluster_fragments_into_lines(fragments)
+            t3 = time.perf_counter()
+            for cluster in clusters:
+                parser._join_line_fragments(cluster)
+            stages["cluster"] += t3 - t2
+            stages["join"] += time.perf_counter() - t3
+    return stages
+
+
+def run(specs: List[SyntheticSpec], options: ParserOptions, repeat: int = 3,
+        workdir: Optional[Path] = None) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="parser_bench_") as tmp:
+        base = workdir or Path(tmp)
+        results = [run_scenario(spec, options, base, repeat) for spec in specs]
+    return {
+        "format": RESULT_FORMAT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "parser_version": PARSER_VERSION,
+        "pymupdf": fitz.VersionBind,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": asdict(options),
+        "scenarios": [asdict(r) for r in results],
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Return one message per scenario whose pages/s dropped by more than max_regression (0.2 = 20%)."""
+    before = {s["name"]: s for s in baseline.get("scenarios", [])}
+    regressions: List[str] = []
+    for s in current["scenarios"]:
+        ref = before.get(s["name"])
+        if not ref or ref["pages_per_s"] <= 0:
+            continue
+        change = s["pages_per_s"] / ref["pages_per_s"] - 1.0
+        if change < -max_regression:
+            regressions.append(
+                f"{s['name']}: {ref['pages_per_s']:.1f} -> {s['pages_per_s']:.1f} pages/s ({change:+.0%})"
+            )
+    return regressions
+
+
+def _print_table(report: Dict[str, Any]) -> None:
+    print(f"parser_version={report['parser_version']} pymupdf={report['pymupdf']} options={report['options']}")
+    print(f"{'scenario':<32} {'pages/s':>9} {'spans/s':>10} {'extract':>8} {'cluster':>8} {'join':>8} {'peak KiB':>9}")
+    for s in report["scenarios"]:
+        st = s["stages_s"]
+        print(
+            f"{s['name']:<32} {s['pages_per_s']:>9.1f} {s['spans_per_s']:>10.0f} "
+            f"{st['extract']:>8.4f} {st['cluster']:>8.4f} {st['join']:>8.4f} {s['peak_python_bytes'] / 1024:>9.0f}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Parser throughput benchmark on synthetic lab-report PDFs")
+    ap.add_argument("--quick", action="store_true", help="small scenario set (smoke run)")
+    ap.add_argument("--repeat", type=int, default=3, help="timed runs per scenario (best is reported)")
+    ap.add_argument("--clustering", default="sweep")
+    ap.add_argument("--extraction", default="lean")
+    ap.add_argument("--layout", default="python")
+    ap.add_argument("--out", default=str(DEFAULT_OUT), help="JSON result file")
+    ap.add_argument("--baseline", help="earlier JSON result; exit 1 on throughput regressions")
+    ap.add_argument("--max-regression", type=float, default=0.2)
+    args = ap.parse_args(argv)
+
+    options = ParserOptions(clustering=args.clustering, extraction=args.extraction, layout=args.layout)
+    report = run(default_specs(args.quick), options, repeat=args.repeat)
+    _print_table(report)
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"results: {out}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.max_regression)
+        for r in regressions:
+            print(f"REGRESSION {r}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+
+PAGE_WIDTH: float = 595.32
+PAGE_HEIGHT: float = 841.92
+MARGIN_TOP: float = 40.0
+MARGIN_BOTTOM: float = 40.0
+LINE_HEIGHT: float = 10.5
+COLUMN_WIDTH: float = 72.0
+FONT_SIZE: float = 8.0
+
+
+@dataclass(frozen=True)
+class SyntheticSpec:
+    pages: int = 10
+    lines_per_page: int = 60
+    spans_per_line: int = 6
+    # max. vertical offset of a span against its line baseline; values around
+    # LINE_Y_TOLERANCE (2.0) exercise the clustering edge cases
+    y_jitter: float = 0.0
+    # share of spans rendered in a smaller font (different bbox height, same line)
+    mixed_font_ratio: float = 0.0
+    seed: int = 0
+
+    @property
+    def name(self) -> str:
+        return f"p{self.pages}_l{self.lines_per_page}_s{self.spans_per_line}_j{self.y_jitter:g}_f{self.mixed_font_ratio:g}"
+
+
+def generate_report(spec: SyntheticSpec, out_path: str) -> int:
+    """Write a synthetic lab-report PDF and return the number of spans written."""
+    rng = random.Random(spec.seed)
+    usable = PAGE_HEIGHT - MARGIN_TOP - MARGIN_BOTTOM
+    lines_per_page = min(spec.lines_per_page, int(usable // LINE_HEIGHT))
+    column_width = min(COLUMN_WIDTH, (PAGE_WIDTH - 20.0) / max(1, spec.spans_per_line))
+    spans = 0
+    font = fitz.Font("helv")
+    doc = fitz.open()
+    try:
+        for page_index in range(spec.pages):
+            page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+            # one TextWriter per page: a single content stream instead of one per span
+            writer = fitz.TextWriter(page.rect)
+            writer.append((260.0, 10.0), "Synthetic Assay IgG  Validationskriterien erfüllt", font=font,
+                          fontsize=FONT_SIZE)
+            writer.append((0.0, 30.0), f"Plattenname: SYN{spec.seed:04d}  Zeit: 21:26:16  Seite {page_index + 1}",
+                          font=font, fontsize=FONT_SIZE)
+            spans += 2
+            for line_index in range(lines_per_page):
+                baseline = MARGIN_TOP + (line_index + 1) * LINE_HEIGHT
+                for col in range(spec.spans_per_line):
+                    y = baseline + (rng.uniform(-spec.y_jitter, spec.y_jitter) if spec.y_jitter else 0.0)
+                    size = FONT_SIZE * 0.75 if rng.random() < spec.mixed_font_ratio else FONT_SIZE
+                    text = _cell_text(rng, line_index, col)
+                    writer.append((10.0 + col * column_width, y), text, font=font, fontsize=size)
+                    spans += 1
+            writer.write_text(page)
+        Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+        doc.save(out_path)
+    finally:
+        doc.close()
+    return spans
+
+
+def _cell_text(rng: random.Random, line_index: int, col: int) -> str:
+    if col == 0:
+        return f"Sample {line_index:03d}"
+    kind = rng.randrange(3)
+    if kind == 0:
+        return f"{rng.randrange(10**9, 10**10)}"
+    if kind == 1:
+        return f"{rng.uniform(0, 3):.3f}".replace(".", ",") + " O.D."
+    return f"{rng.randrange(0, 400)} IU/ml"
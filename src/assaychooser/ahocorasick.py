@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+
+ROOT_SKIP_MAX_CHARS: int = 8
+
+
+class AhoCorasick:
+    """Multi-pattern matcher: first occurrence of every pattern in one left-to-right pass.
+
+    While the automaton sits in its root state, the scan jumps straight to the next
+    character that can start a pattern (str.find), so text between candidates is
+    skipped at C speed. Matching is case-sensitive (same as str.find).
+    """
+
+    def __init__(self, patterns: Tuple[str, ...]) -> None:
+        self._patterns = tuple(dict.fromkeys(p for p in patterns if p))
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+        for idx, pattern in enumerate(self._patterns):
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = nxt
+            self._out[state] = self._out[state] + (idx,)
+        self._build_failure_links()
+        # root skipping only pays off while few characters can start a pattern
+        self._root_chars = tuple(self._goto[0]) if len(self._goto[0]) <= ROOT_SKIP_MAX_CHARS else ()
+
+    def _build_failure_links(self) -> None:
+        # depth-1 states fail to the root (already 0); deeper states via BFS
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def first_positions(self, text: str) -> Dict[str, int]:
+        """Map pattern -> start index of its first occurrence (patterns not found are absent)."""
+        found: Dict[str, int] = {}
+        if not self._patterns:
+            return found
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self._patterns
+        remaining = len(patterns)
+        n = len(text)
+        i = 0
+        state = 0
+        skip = bool(self._root_chars)
+        next_pos: Dict[str, int] = {ch: -1 for ch in self._root_chars}
+        while i < n:
+            if state == 0 and skip:
+                i = self._next_root_candidate(text, i, next_pos)
+                if i < 0:
+                    break
+            ch = text[i]
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for idx in out[state]:
+                p = patterns[idx]
+                if p not in found:
+                    found[p] = i - len(p) + 1
+                    remaining -= 1
+                    if not remaining:
+                        return found
+            i += 1
+        return found
+
+    @staticmethod
+    def _next_root_candidate(text: str, start: int, next_pos: Dict[str, int]) -> int:
+        # next_pos caches each root char's next occurrence; exhausted chars are removed
+        best = -1
+        for ch in list(next_pos):
+            pos = next_pos[ch]
+            if pos < start:
+                pos = text.find(ch, start)
+                if pos == -1:
+                    del next_pos[ch]
+                    continue
+                next_pos[ch] = pos
+            if best == -1 or pos < best:
+                best = pos
+        return best
+
+
+@lru_cache(maxsize=32)
+def automaton_for(patterns: Tuple[str, ...]) -> AhoCorasick:
+    """Build (once per distinct pattern tuple) and reuse the automaton."""
+    return AhoCorasick(patterns)
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-from typing import List
+from typing import List, Mapping
+
+from src.contentsplitter.api import BlockView
+from src.normalizer.api import PageIndex
 
 from .model import AssayMatch
 from .assaychooser import AssayChooser
@@ -16,3 +19,16 @@ def detect_assays(norm_text: str, rules_index_path: str) -> List[AssayMatch]:
     - Multi-assay: return all found keys, deduped by key, sorted by first occurrence position.
     """
     return AssayChooser().detect_assays(norm_text, rules_index_path)
+
+
+def assign_page_ranges(matches: List[AssayMatch], blocks: Mapping[str, BlockView],
+                       page_index: PageIndex) -> List[AssayMatch]:
+    """Public API (AssayChooser) – page ranges
+
+    Contract:
+    - blocks: result of src.contentsplitter.api.split_by_assay_name_and_key_views on the same text.
+    - page_index: filled by src.normalizer.api.normalize_text for that text.
+    - Returns the matches (same order) with first_page/last_page of their block set.
+    - A match without a block raises AssayChooserError.
+    """
+    return AssayChooser().assign_page_ranges(matches, blocks, page_index)
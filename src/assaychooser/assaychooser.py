@@ -1,8 +1,13 @@
 from __future__ import annotations
 
-import json
-from typing import Dict, List, Tuple
+from dataclasses import replace
+from typing import Dict, List, Mapping
 
+from src.contentsplitter.api import BlockView
+from src.normalizer.api import PageIndex
+from src.ruleresolver.api import list_assay_keys
+
+from .ahocorasick import automaton_for
 from .model import AssayMatch
 
 
@@ -14,29 +19,30 @@ class AssayChooserError(RuntimeError):
 class AssayChooser:
     def detect_assays(self, norm_text: str, rules_index_path: str) -> List[AssayMatch]:
         try:
-            index = json.loads(Path(rules_index_path).read_text(encoding="utf-8"))
+            keys: List[str] = list_assay_keys(rules_index_path)  # shared rules registry, no re-read per job
         except Exception as e:
-            raise AssayChooserError(f"Cannot read index.json: {e}") from e
+            raise AssayChooserError(str(e)) from e
 
-        assays = index.get("assays", [])
-        keys: List[str] = [a.get("assay_key") for a in assays if a.get("assay_key")]
         if not keys:
             raise AssayChooserError("index.json contains no assay_key entries")
 
-        hits: List[Tuple[int, str]] = []
-        for key in keys:
-            pos = norm_text.find(key)
-            if pos != -1:
-                hits.append((pos, key))
-
-        # keep first occurrence per key
-        first: Dict[str, int] = {}
-        for pos, key in sorted(hits, key=lambda x: x[0]):
-            if key not in first:
-                first[key] = pos
-
-        ordered = sorted(first.items(), key=lambda x: x[1])
-        return [AssayMatch(assay_key=k, occurrence_index=1) for k, _ in ordered]
-
-
-from pathlib import Path
+        # one pass over the text for all keys (automaton cached per key set)
+        first: Dict[str, int] = automaton_for(tuple(keys)).first_positions(norm_text)
+
+        # index order breaks ties, like the stable sort over per-key find() hits did
+        ordered = sorted((k for k in dict.fromkeys(keys) if k in first), key=lambda k: first[k])
+        return [AssayMatch(assay_key=k, occurrence_index=1) for k in ordered]
+
+    def assign_page_ranges(self, matches: List[AssayMatch], blocks: Mapping[str, BlockView],
+                           page_index: PageIndex) -> List[AssayMatch]:
+        # the block boundaries are where the splitter cut (assay_name start .. next start, stripped),
+        # not the key's first hit, so a heading on the page before the key is counted
+        out: List[AssayMatch] = []
+        for m in matches:
+            block = blocks.get(m.assay_key)
+            if block is None:
+                raise AssayChooserError(f"no block for assay_key {m.assay_key}")
+            first = page_index.page_at(block.start)
+            last = page_index.page_at(max(block.start, block.end - 1))
+            out.append(replace(m, first_page=first, last_page=last))
+        return out
@@ -1,6 +1,10 @@
 from dataclasses import dataclass
+from typing import Optional
 
 @dataclass(frozen=True)
 class AssayMatch:
     assay_key: str
     occurrence_index: int
+    # pages covered by the assay's block (set by assign_page_ranges after the split)
+    first_page: Optional[int] = None
+    last_page: Optional[int] = None
@@ -3,7 +3,7 @@ from __future__ import annotations
 from typing import Dict, List
 
 from .contentsplitter import ContentSplitter, split_by_assay_keys
-from .model import AssayDescriptor
+from .model import AssayDescriptor, BlockView
 
 
 # TODO: deprecated – remove after migration to split_by_assay_name_and_key
@@ -28,3 +28,14 @@ def split_by_assay_name_and_key(norm_text: str, assays: List[AssayDescriptor]) -
     - MUST-SPLIT: if any assay cannot be split into a non-empty block -> raise ContentSplitError("content_split_failed: ...").
     """
     return ContentSplitter().split_by_assay_name_and_key(norm_text, assays)
+
+
+def split_by_assay_name_and_key_views(norm_text: str, assays: List[AssayDescriptor]) -> Dict[str, BlockView]:
+    """Public API (ContentSplitter) – zero-copy variant
+
+    Contract:
+    - Same validation, errors and block boundaries as split_by_assay_name_and_key.
+    - Returns BlockView(source=norm_text, start, end) per assay_key instead of copied strings;
+      BlockView.text() equals the string split_by_assay_name_and_key would return.
+    """
+    return ContentSplitter().split_by_assay_name_and_key_views(norm_text, assays)
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import Dict, List, Tuple
 
-from .model import AssayDescriptor
+from .model import AssayDescriptor, BlockView
 
 
 class ContentSplitError(RuntimeError):
@@ -65,6 +65,10 @@ class ContentSplitter:
 
     # NEW (final mechanism)
     def split_by_assay_name_and_key(self, norm_text: str, assays: List[AssayDescriptor]) -> Dict[str, str]:
+        views = self.split_by_assay_name_and_key_views(norm_text, assays)
+        return {k: v.text() for k, v in views.items()}
+
+    def split_by_assay_name_and_key_views(self, norm_text: str, assays: List[AssayDescriptor]) -> Dict[str, BlockView]:
         if not assays:
             raise ContentSplitError("content_split_failed: no assays provided")
 
@@ -89,13 +93,17 @@ class ContentSplitter:
         # Multi-assay: sort by start positions and cut blocks
         starts.sort(key=lambda x: x[0])
 
-        blocks: Dict[str, str] = {}
+        blocks: Dict[str, BlockView] = {}
         for i, (start, a) in enumerate(starts):
             end = starts[i + 1][0] if i + 1 < len(starts) else len(norm_text)
-            block = norm_text[start:end].strip()
-            if not block:
+            # strip() by offsets instead of copying the block
+            while start < end and norm_text[start].isspace():
+                start += 1
+            while end > start and norm_text[end - 1].isspace():
+                end -= 1
+            if start == end:
                 raise ContentSplitError(f"content_split_failed: empty block for assay_key {a.assay_key}")
-            blocks[a.assay_key] = block
+            blocks[a.assay_key] = BlockView(source=norm_text, start=start, end=end)
 
         # Ensure 1:1 mapping by assay_key
         if set(blocks.keys()) != {a.assay_key for a in assays}:
@@ -4,4 +4,21 @@ from typing import Dict, Any
 @dataclass(frozen=True)
 class AssayDescriptor:
     assay_key: str   # e.g. "(5f03)"
-    assay_name: str  # e.g. "Anti-TPO IgG"
\ No newline at end of file
+    assay_name: str  # e.g. "Anti-TPO IgG"
+
+
+@dataclass(frozen=True)
+class BlockView:
+    """Zero-copy assay block: [start, end) of the shared normalized text (already stripped)."""
+    source: str
+    start: int
+    end: int
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def text(self) -> str:
+        return self.source[self.start:self.end]
+
+    def line_count(self) -> int:
+        return self.source.count("\n", self.start, self.end) + 1 if self.end > self.start else 0
@@ -1,15 +1,26 @@
 from __future__ import annotations
 
-from src.ruleresolver.api import RuleSet
+from typing import Optional, Union
+
+from src.contentsplitter.api import BlockView
+from src.ruleresolver.api import CompiledRuleSet, RuleSet
 #from .model import AssayRecord
-from .extractor import Extractor, AssayRecord
+from .extractor import DEFAULT_REGEX_BUDGET_S, Extractor, AssayRecord
 
-def extract_record(assay_text: str, ruleset: RuleSet) -> AssayRecord:
+def extract_record(assay_text: Union[str, BlockView], ruleset: Union[RuleSet, CompiledRuleSet],
+                   regex_budget_s: Optional[float] = DEFAULT_REGEX_BUDGET_S) -> AssayRecord:
     """Public API (Extractor)
 
     Contract:
     - Extract one assay-specific record from assay_text using ruleset.
+    - assay_text may be a BlockView (split_by_assay_name_and_key_views); it is searched
+      in place and yields the same record as its materialized text.
+    - ruleset: prefer CompiledRuleSet (resolve_compiled_ruleset), which reuses its compiled patterns;
+      a plain RuleSet is compiled per call.
     - Must produce lot_id and dedupe_key.
     - Dedupe-key policy: test|YYYY-MM-DD|HH:MM:SS
+    - Patterns flagged by the static backtracking check (CompiledField.risk) run in a killable
+      worker process (forkserver/spawn, never fork); one exceeding regex_budget_s raises ExtractionError naming the field and the time
+      spent. regex_budget_s=None runs them inline without a limit.
     """
-    return Extractor().extract_record(assay_text, ruleset)
+    return Extractor(regex_budget_s).extract_record(assay_text, ruleset)
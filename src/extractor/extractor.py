@@ -1,21 +1,37 @@
 from __future__ import annotations
 
-import re
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple, Union
 
-from src.ruleresolver.api import RuleSet
+from src.contentsplitter.api import BlockView
+from src.ruleresolver.api import CompiledRuleSet, RuleCompileError, RuleSet, compile_ruleset
 from .model import AssayRecord
+from .regexguard import RegexWorkerError
+from .scanner import BlockScan, FieldTimeout, scanner_for
 
 
 class ExtractionError(RuntimeError):
     pass
 
 
+# per-search limit for patterns flagged by the ruleset's static backtracking check
+DEFAULT_REGEX_BUDGET_S: float = 2.0
+
+
 class Extractor:
-    def extract_record(self, assay_text: str, ruleset: RuleSet) -> AssayRecord:
-        rs = ruleset.data
-        lot_id = self._extract_lot_id(assay_text, rs["lot_rule"])
-        data = self._extract_fields(assay_text, rs["extract_rules"])
+    def __init__(self, regex_budget_s: Optional[float] = DEFAULT_REGEX_BUDGET_S) -> None:
+        # None: run flagged patterns inline as well (no worker, no limit)
+        self._regex_budget_s = regex_budget_s
+
+    def extract_record(self, assay_text: Union[str, BlockView],
+                       ruleset: Union[RuleSet, CompiledRuleSet]) -> AssayRecord:
+        compiled = self._compiled(ruleset)
+        scanner = scanner_for(compiled.lot_pattern, compiled.lot_prefilter, compiled.fields, compiled.lot_risk)
+        scan = scanner.scan(*self._bounds(assay_text), budget_s=self._regex_budget_s)
+        try:
+            lot_id = self._extract_lot_id(scan)
+            data = self._extract_fields(scan)
+        except (FieldTimeout, RegexWorkerError) as e:
+            raise ExtractionError(str(e)) from e
 
         test = self._require_str(data.get("test"), "test")
         date = self._require_str(data.get("date"), "date")
@@ -24,49 +40,28 @@ class Extractor:
         dedupe_key = f"{test}|{date}|{time}"
         return AssayRecord(assay_key=ruleset.assay_key, lot_id=lot_id, dedupe_key=dedupe_key, data=data)
 
-    def _extract_lot_id(self, text: str, lot_rule: Dict[str, Any]) -> str:
-        regex = lot_rule.get("regex")
-        if not regex:
-            raise ExtractionError("lot_rule.regex missing")
-        m = re.search(regex, text)
+    @staticmethod
+    def _compiled(ruleset: Union[RuleSet, CompiledRuleSet]) -> CompiledRuleSet:
+        if isinstance(ruleset, CompiledRuleSet):
+            return ruleset
+        # plain RuleSet (e.g. built by hand): compile for this call only
+        try:
+            return compile_ruleset(ruleset)
+        except RuleCompileError as e:
+            raise ExtractionError(str(e)) from e
+
+    def _extract_lot_id(self, scan: BlockScan) -> str:
+        m = scan.lot()
         if not m:
             raise ExtractionError("lot_id not found")
         return (m.group(1) if m.groups() else m.group(0)).strip()
 
-    def _extract_fields(self, text: str, extract_rules: Dict[str, Any]) -> Dict[str, Any]:
-        fields = extract_rules.get("fields", [])
-        if not isinstance(fields, list) or not fields:
-            raise ExtractionError("extract_rules.fields missing/empty")
-
+    def _extract_fields(self, scan: BlockScan) -> Dict[str, Any]:
+        # fields sharing a search_from window or a (pattern, window) pair reuse one search
         out: Dict[str, Any] = {}
-        lines = text.splitlines()
-
-        for f in fields:
-            key = f.get("key")
-            regex = f.get("regex")
-            req = bool(f.get("required", False))
-
-            if not key or not regex:
-                raise ExtractionError("field requires key+regex")
-
-            search_text = text  # default: kompletter Block
-
-            # 🔹 optionaler Such-Start
-            search_from = f.get("search_from")
-            if isinstance(search_from, dict):
-                if "after" in search_from:
-                    marker = search_from["after"]
-                    for i, ln in enumerate(lines):
-                        if re.search(marker, ln):
-                            search_text = "\n".join(lines[i + 1:])
-                            break
-                elif "line" in search_from:
-                    start = int(search_from["line"])
-                    search_text = "\n".join(lines[start:])
-
-            m = re.search(regex, search_text)
+        for key, required, m in scan.fields():
             if not m:
-                if req:
+                if required:
                     raise ExtractionError(f"required field not found: {key}")
                 out[key] = None
                 continue
@@ -75,6 +70,12 @@ class Extractor:
 
         return out
 
+    @staticmethod
+    def _bounds(text: Union[str, BlockView]) -> Tuple[str, int, int]:
+        if isinstance(text, str):
+            return text, 0, len(text)
+        return text.source, text.start, text.end
+
     def _require_str(self, v: Any, key: str) -> str:
         if v is None:
             raise ExtractionError(f"required field missing: {key}")
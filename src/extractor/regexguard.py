@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+
+# fork would copy the parent's threads and held locks (write-behind writer, lock heartbeats)
+# into a worker that outlives them; forkserver/spawn start workers from a clean process
+_MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+
+
+class RegexTimeout(RuntimeError):
+    def __init__(self, elapsed_s: float) -> None:
+        super().__init__(f"regex exceeded its time budget after {elapsed_s:.2f}s")
+        self.elapsed_s = elapsed_s
+
+
+class RegexWorkerError(RuntimeError):
+    """The guard worker raised or died while evaluating a call."""
+
+
+class _Worker:
+    def __init__(self) -> None:
+        parent, child = _MP_CONTEXT.Pipe()
+        self.proc = _MP_CONTEXT.Process(target=_worker, args=(child,), name="regex-guard", daemon=True)
+        self.proc.start()
+        child.close()
+        self.conn = parent
+
+    def stop(self) -> None:
+        self.proc.terminate()
+        self.proc.join(timeout=5)
+        self.conn.close()
+
+
+class RegexGuard:
+    """Runs regex work in persistent worker processes so that it can be killed.
+
+    re cannot be interrupted from Python; a call that exceeds its budget terminates
+    its worker and raises RegexTimeout. Each call checks out its own worker (started
+    on demand, up to max_idle are kept for reuse), so concurrent extractions do not
+    wait for each other.
+    """
+
+    def __init__(self, max_idle: Optional[int] = None) -> None:
+        self._lock = threading.Lock()
+        self._idle: List[_Worker] = []
+        self._max_idle = max_idle or os.cpu_count() or 1
+        self._closed = False
+
+    def call(self, budget_s: float, fn: Callable[..., Any], *args: Any) -> Tuple[Any, float]:
+        """(fn(*args) evaluated in a worker, elapsed seconds); fn must be a module-level function."""
+        worker = self._checkout()
+        t0 = time.perf_counter()
+        try:
+            worker.conn.send((fn, args))
+            if not worker.conn.poll(budget_s):
+                elapsed = time.perf_counter() - t0
+                worker.stop()
+                raise RegexTimeout(elapsed)
+            ok, value = worker.conn.recv()
+        except (EOFError, OSError) as e:
+            worker.stop()
+            raise RegexWorkerError(f"regex worker died: {e or type(e).__name__}") from e
+        elapsed = time.perf_counter() - t0
+        self._checkin(worker)
+        if not ok:
+            raise RegexWorkerError(f"regex worker failed: {value}")
+        return value, elapsed
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()
+
+    def _checkout(self) -> _Worker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.proc.is_alive():
+                    return worker
+                worker.stop()
+        return _Worker()
+
+    def _checkin(self, worker: _Worker) -> None:
+        with self._lock:
+            if not self._closed and len(self._idle) < self._max_idle:
+                self._idle.append(worker)
+                return
+        worker.stop()
+
+
+def _worker(conn: Any) -> None:
+    while True:
+        try:
+            fn, args = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            conn.send((True, fn(*args)))
+        except Exception as e:
+            conn.send((False, f"{type(e).__name__}: {e}"))
+
+
+_shared: Optional[RegexGuard] = None
+_shared_lock = threading.Lock()
+
+
+def shared_guard() -> RegexGuard:
+    """One guard (worker pool) per process, started on first use and stopped at exit."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = RegexGuard()
+            atexit.register(_shared.close)
+        return _shared
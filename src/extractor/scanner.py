@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, Iterator, List, Match, Optional, Pattern, Tuple
+
+from src.ruleresolver.api import CompiledField, context_flags, leading_literal, line_sensitive
+
+from .regexguard import RegexTimeout, shared_guard
+
+
+# Constructs whose result at pos > 0 depends on the text before pos, unlike at the start of a
+# sliced string: ^/\A never match there and lookbehind looks back. \b/\B only differ when the
+# preceding character is not a line break.
+_context_flags = lru_cache(maxsize=1024)(context_flags)
+# Markers searched over the whole block must behave as on a single line: no anchors,
+# end assertions, word boundaries or lookaround
+_line_sensitive = lru_cache(maxsize=1024)(line_sensitive)
+# line breaks str.splitlines() knows besides "\n"
+_OTHER_LINE_BREAKS = re.compile("[\r\x0b\x0c\x1c-\x1e\x85\u2028\u2029]")
+
+
+class LineIndex:
+    """Line-start offsets of one block, built once per block for all search_from fields.
+
+    Lines are those of str.splitlines() on the block; a window from line k is the
+    [start, end) range equal to "\n".join(lines[k:]), so fields are searched with
+    pattern.search(source, pos, endpos) instead of joined copies.
+    """
+
+    def __init__(self, source: str, start: int, end: int) -> None:
+        self.starts: List[int] = []
+        if start < end and _OTHER_LINE_BREAKS.search(source, start, end):
+            # rare: rebuild the block from its lines so that "\n" is the only separator
+            lines = source[start:end].splitlines()
+            source = "\n".join(lines)
+            start, end = 0, len(source)
+            for ln in lines:
+                self.starts.append(start)
+                start += len(ln) + 1
+        elif start < end:
+            if source[end - 1] == "\n":
+                end -= 1  # splitlines() drops one trailing line break
+            pos = start
+            while pos != -1:
+                self.starts.append(pos)
+                nl = source.find("\n", pos, end)
+                pos = nl + 1 if nl != -1 else -1
+        self.source = source
+        self.end = end
+
+    def _line_end(self, i: int) -> int:
+        return self.starts[i + 1] - 1 if i + 1 < len(self.starts) else self.end
+
+    def from_line(self, k: int) -> Tuple[str, int, int]:
+        n = len(self.starts)
+        if k < 0:
+            k = max(0, n + k)
+        pos = self.starts[k] if k < n else self.end
+        return self.source, pos, self.end
+
+    def after(self, marker: Pattern[str]) -> Optional[Tuple[str, int, int]]:
+        """Window after the first line containing marker (None if no line does)."""
+        i = self._marker_line(marker)
+        if i is None:
+            return None
+        return self.from_line(i + 1) if i + 1 < len(self.starts) else (self.source, self.end, self.end)
+
+    def _marker_line(self, marker: Pattern[str]) -> Optional[int]:
+        src, starts = self.source, self.starts
+        first = 0
+        if not _line_sensitive(marker) and starts:
+            # one search over the block; a hit inside a single line is the first matching line
+            m = marker.search(src, starts[0], self.end)
+            if m is None:
+                return None
+            first = bisect_right(starts, m.start()) - 1
+            if m.end() <= self._line_end(first):
+                return first
+            # the hit spans a line break: check line by line from there
+            for i in range(first, len(starts)):
+                if marker.search(src, starts[i], self._line_end(i)):
+                    return i
+            return None
+        for i in range(first, len(starts)):
+            if marker.search(src[starts[i]:self._line_end(i)]):
+                return i
+        return None
+
+
+def search_window(pattern: Pattern[str], source: str, pos: int, endpos: int,
+                  prefilter: str = "") -> Optional[Match[str]]:
+    """pattern.search on source[pos:endpos] without copying, whenever that is equivalent.
+
+    prefilter: literal every match starts with (CompiledField.prefilter); candidates are
+    found with str.find and only matched there.
+    """
+    source, pos, endpos = _standalone((pattern,), source, pos, endpos)
+    if not prefilter:
+        return pattern.search(source, pos, endpos)
+    i = source.find(prefilter, pos, endpos)
+    while i != -1:
+        m = pattern.match(source, i, endpos)
+        if m:
+            return m
+        i = source.find(prefilter, i + 1, endpos)
+    return None
+
+
+def _standalone(patterns: Tuple[Pattern[str], ...], source: str, pos: int, endpos: int) -> _Window:
+    # the window as its own string when any pattern would see the text before pos
+    if pos:
+        for pattern in patterns:
+            anchored, boundary = _context_flags(pattern)
+            if anchored or (boundary and source[pos - 1] != "\n"):
+                source = source[pos:endpos]
+                return source, 0, len(source)
+    return source, pos, endpos
+
+
+class FieldTimeout(RegexTimeout):
+    """A guarded regex of one field (or of lot_rule) exceeded the time budget."""
+
+    def __init__(self, key: str, risk: str, elapsed_s: float) -> None:
+        RuntimeError.__init__(self, f"regex time budget exceeded: {key} after {elapsed_s:.2f}s ({risk})")
+        self.key = key
+        self.risk = risk
+        self.elapsed_s = elapsed_s
+
+
+class _GuardedMatch:
+    """The parts of a Match the extractor uses, sent back from the guard worker."""
+
+    def __init__(self, group0: str, groups: Tuple[Optional[str], ...]) -> None:
+        self._group0 = group0
+        self._groups = groups
+
+    def group(self, i: int = 0) -> Optional[str]:
+        return self._group0 if i == 0 else self._groups[i - 1]
+
+    def groups(self) -> Tuple[Optional[str], ...]:
+        return self._groups
+
+
+def _guarded_search(pattern: Pattern[str], window: str, prefilter: str) -> Optional[_GuardedMatch]:
+    # runs in the guard worker; search_window() treats a window like this standalone copy
+    m = search_window(pattern, window, 0, len(window), prefilter)
+    return None if m is None else _GuardedMatch(m.group(0), m.groups())
+
+
+def _guarded_after(block: str, marker: Pattern[str]) -> Optional[Tuple[Optional[str], int, int]]:
+    # runs in the guard worker; returns offsets into block (plus the block itself only when
+    # LineIndex had to rebuild it), so the block is not sent back
+    lines = LineIndex(block, 0, len(block))
+    found = lines.after(marker)
+    if found is None:
+        return None
+    return (found[0] if lines.source is not block else None), found[1], found[2]
+
+
+# (search_from.after, search_from.line); (None, None) is the whole block
+_WindowSpec = Tuple[Optional[Pattern[str]], Optional[int]]
+_Window = Tuple[str, int, int]
+_UNSET = object()
+
+
+class FieldScanner:
+    """Extraction plan of one ruleset, built once and shared by all blocks.
+
+    Distinct search windows (whole block, after marker X, from line k) and distinct
+    (pattern, window) searches are numbered once, so a block resolves every marker
+    and runs every search at most once however many fields share them. Searches of
+    one window whose matches all start with the same literal ("Kit\\s+(\\S+)",
+    "Kit\\s+E\\w+\\s+(\\d{6})", ...) form a group: one pass for the literal over the
+    window yields the candidates, and each still-missing search of the group is matched
+    there. (The literal is searched as a pattern: sre finds it faster than str.find.)
+    Patterns with a backtracking risk stay single, so a budgeted scan can guard them.
+    """
+
+    def __init__(self, lot_pattern: Pattern[str], lot_prefilter: str, fields: Tuple[CompiledField, ...],
+                 lot_risk: str = "") -> None:
+        self.windows: List[_WindowSpec] = [(None, None)]
+        self.window_risks: List[str] = [""]
+        # (pattern, window id, prefilter literal, backtracking risk)
+        self.searches: List[Tuple[Pattern[str], int, str, str]] = []
+        window_ids: Dict[_WindowSpec, int] = {(None, None): 0}
+        search_ids: Dict[Tuple[Pattern[str], int], int] = {}
+
+        def search_id(pattern: Pattern[str], prefilter: str, risk: str, spec: _WindowSpec, window_risk: str) -> int:
+            w = window_ids.setdefault(spec, len(self.windows))
+            if w == len(self.windows):
+                self.windows.append(spec)
+                self.window_risks.append(window_risk)
+            s = search_ids.setdefault((pattern, w), len(self.searches))
+            if s == len(self.searches):
+                self.searches.append((pattern, w, prefilter, risk))
+            return s
+
+        self.lot = search_id(lot_pattern, lot_prefilter, lot_risk, (None, None), "")
+        self.lot_risk = lot_risk
+        # (key, required, search id, risk); "after" takes precedence over "line", as in CompiledField
+        self.fields: Tuple[Tuple[str, bool, int, str], ...] = tuple(
+            (f.key, f.required,
+             search_id(f.pattern, f.prefilter, f.risk, (f.after, None if f.after is not None else f.line), f.after_risk),
+             f.risk or f.after_risk)
+            for f in fields
+        )
+
+        # (pattern of the shared leading literal, search ids) of every window/literal with 2+ searches
+        by_literal: Dict[Tuple[int, str], List[int]] = {}
+        for i, (pattern, w, prefilter, risk) in enumerate(self.searches):
+            literal = prefilter or leading_literal(pattern)
+            if literal and not risk:
+                by_literal.setdefault((w, literal), []).append(i)
+        self.groups: List[Tuple[Pattern[str], Tuple[int, ...]]] = [
+            (re.compile(re.escape(literal)), tuple(ids)) for (_, literal), ids in by_literal.items() if len(ids) > 1
+        ]
+        self.group_of: Dict[int, int] = {i: g for g, (_, ids) in enumerate(self.groups) for i in ids}
+
+    def scan(self, source: str, start: int, end: int, budget_s: Optional[float] = None) -> BlockScan:
+        """budget_s: per-search time limit for risky patterns (None: run everything inline)."""
+        return BlockScan(self, (source, start, end), budget_s)
+
+
+class BlockScan:
+    """Lazy, memoized evaluation of a FieldScanner on one block."""
+
+    def __init__(self, scanner: FieldScanner, block: _Window, budget_s: Optional[float] = None) -> None:
+        self._scanner = scanner
+        self._block = block
+        self._budget_s = budget_s
+        self._lines: Optional[LineIndex] = None
+        self._windows: List[Optional[_Window]] = [block] + [None] * (len(scanner.windows) - 1)
+        self._matches: List[object] = [_UNSET] * len(scanner.searches)
+
+    def lot(self) -> Optional[Match[str]]:
+        try:
+            return self._match(self._scanner.lot)
+        except RegexTimeout as e:
+            raise FieldTimeout("lot_rule", self._scanner.lot_risk, e.elapsed_s) from e
+
+    def fields(self) -> Iterator[Tuple[str, bool, Optional[Match[str]]]]:
+        """(key, required, match) in field order; searches run as the iterator advances."""
+        for key, required, search, risk in self._scanner.fields:
+            try:
+                m = self._match(search)
+            except RegexTimeout as e:
+                raise FieldTimeout(key, risk, e.elapsed_s) from e
+            yield key, required, m
+
+    def _match(self, i: int) -> Optional[Match[str]]:
+        m = self._matches[i]
+        if m is _UNSET and i in self._scanner.group_of:
+            self._scan_group(self._scanner.group_of[i])
+            m = self._matches[i]
+        if m is _UNSET:
+            pattern, w, prefilter, risk = self._scanner.searches[i]
+            source, pos, endpos = self._window(w)
+            if risk and self._budget_s is not None:
+                # only the window travels to the worker
+                m, _ = shared_guard().call(self._budget_s, _guarded_search, pattern, source[pos:endpos], prefilter)
+            else:
+                m = search_window(pattern, source, pos, endpos, prefilter)
+            self._matches[i] = m
+        return m  # type: ignore[return-value]
+
+    def _scan_group(self, g: int) -> None:
+        # one pass over the candidates of the shared literal fills every search of the group
+        literal, ids = self._scanner.groups[g]
+        searches = self._scanner.searches
+        source, pos, endpos = self._window(searches[ids[0]][1])
+        source, pos, endpos = _standalone(tuple(searches[i][0] for i in ids), source, pos, endpos)
+        missing = list(ids)
+        candidate = literal.search(source, pos, endpos)
+        while candidate and missing:
+            at = candidate.start()
+            still: List[int] = []
+            for i in missing:
+                m = searches[i][0].match(source, at, endpos)
+                if m:
+                    self._matches[i] = m
+                else:
+                    still.append(i)
+            missing = still
+            candidate = literal.search(source, at + 1, endpos)
+        for i in missing:
+            self._matches[i] = None
+
+    def _window(self, w: int) -> _Window:
+        window = self._windows[w]
+        if window is None:
+            if self._lines is None:
+                self._lines = LineIndex(*self._block)
+            after, line = self._scanner.windows[w]
+            if after is not None and self._scanner.window_risks[w] and self._budget_s is not None:
+                source, start, end = self._block
+                found, _ = shared_guard().call(self._budget_s, _guarded_after, source[start:end], after)
+                if found is None:
+                    window = self._block
+                elif found[0] is not None:
+                    window = found  # type: ignore[assignment]
+                else:
+                    window = (source, start + found[1], start + found[2])
+            elif after is not None:
+                window = self._lines.after(after) or self._block
+            else:
+                window = self._lines.from_line(line)  # type: ignore[arg-type]
+            self._windows[w] = window
+        return window
+
+
+@lru_cache(maxsize=64)
+def scanner_for(lot_pattern: Pattern[str], lot_prefilter: str, fields: Tuple[CompiledField, ...],
+                lot_risk: str = "") -> FieldScanner:
+    return FieldScanner(lot_pattern, lot_prefilter, fields, lot_risk)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, List
 
 from .jobcontroller import JobController
 from .jobcontroller import JobResult
@@ -18,3 +18,21 @@ def submit(pdf_path: str, project_root: str) -> JobResult:
     - serial pipeline
     """
     return JobController().submit(pdf_path, project_root)
+
+
+def submit_batch(pdf_paths: List[str], project_root: str) -> List[JobResult]:
+    """Public API (JobController) – batch mode
+
+    Contract:
+    - Each PDF runs the same locked, state-tracked pipeline as submit() up to extraction.
+    - Records of all successful jobs are written with one Writer batch (each workbook saved once);
+      job locks are held until that write finished.
+    - JobController(write_behind=open_write_behind_queue()) hands records to the write-behind
+      queue right after each extraction instead; results still report every record's write.
+    - JobController(staging=True) stages records (src.writer.api.stage_records); the xlsx files
+      are written by the writer's materializer.
+    - JobController(strip_furniture=True) parses with ParserOptions(strip_furniture=True): repeated
+      header/footer lines are dropped before normalization (off by default).
+    - One JobResult per input path, in input order.
+    """
+    return JobController().submit_batch(pdf_paths, project_root)
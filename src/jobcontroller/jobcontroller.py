@@ -4,24 +4,77 @@ import hashlib
 import json
 import os
 from pathlib import Path
-from typing import Any, Dict, List
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from .model import JobResult
 
 
+@dataclass
+class _PendingJob:
+    # a job extracted up to its records; lock is still held until the records are written
+    job_id: str
+    pdf_path: str
+    state: Dict[str, Any]
+    state_path: Path
+    lock_path: Path
+    assay_keys: List[str]
+    records: List[Tuple[Any, Any]] = field(default_factory=list)  # (AssayRecord, RuleSet)
+    writes: List[Any] = field(default_factory=list)  # write-behind mode: Future[WriteResult] per record
+
+
 class JobController:
+    def __init__(self, write_behind: Optional[Any] = None, staging: bool = False,
+                 strip_furniture: bool = False) -> None:
+        # optional src.writer.api.WriteBehindQueue: records are handed to its writer thread
+        # right after extraction and the next PDF is extracted while they are saved
+        self._write_behind = write_behind
+        # staging: records go to the writer's staging store, xlsx files are materialized later
+        self._staging = staging
+        # opt-in: repeated header/footer lines are dropped by the parser (ParserOptions.strip_furniture)
+        self._strip_furniture = strip_furniture
+
     def submit(self, pdf_path: str, project_root: str):
+        return self.submit_batch([pdf_path], project_root)[0]
+
+    def submit_batch(self, pdf_paths: List[str], project_root: str) -> List[JobResult]:
+        """Run several jobs; their records are written in one Writer batch (each workbook saved once)."""
+        results: List[Optional[JobResult]] = [None] * len(pdf_paths)
+        pending: List[Tuple[int, _PendingJob]] = []
+        output_dir = str(Path(project_root) / "output" / "final")
+        try:
+            for i, pdf_path in enumerate(pdf_paths):
+                out = self._extract_job(pdf_path, project_root)
+                if isinstance(out, _PendingJob):
+                    if self._write_behind is not None:
+                        out.writes = [self._write_behind.submit(rec, rs, output_dir) for rec, rs in out.records]
+                    pending.append((i, out))
+                else:
+                    results[i] = out
+            if pending:
+                jobs = [job for _, job in pending]
+                done = self._collect_jobs(jobs) if self._write_behind is not None else self._write_jobs(jobs, output_dir)
+                for i, result in done:
+                    results[pending[i][0]] = result
+        finally:
+            for _, job in pending:
+                self._release_lock(job.lock_path)
+        return [r for r in results if r is not None]
+
+    def _extract_job(self, pdf_path: str, project_root: str) -> Union[JobResult, _PendingJob]:
         root = Path(project_root)
         pdf = Path(pdf_path)
 
         if not pdf.exists():
             return self._result("FAILED", "", str(pdf), {"error": "pdf_not_found"})
 
-        job_id = self._hash_file(pdf)
+        # full sha256 doubles as the parse cache key, so a cached parse reads the PDF only once
+        digest = self._hash_file(pdf)
+        job_id = digest[:16]
         locks_dir = root / "locks"
         jobs_dir = root / "jobs"
         rules_dir = root / "rules"
-        output_dir = root / "output" / "final"
+        cache_dir = root / "cache"
         locks_dir.mkdir(exist_ok=True)
         jobs_dir.mkdir(exist_ok=True)
 
@@ -46,101 +99,168 @@ class JobController:
         state: Dict[str, Any] = {"job_id": job_id, "pdf_path": str(pdf), "status": "LOCKED", "steps": []}
         self._save_state(state_path, state)
 
+        job: Optional[_PendingJob] = None
         try:
             # PARSE
-            from src.parser.api import parse
-            from src.assaychooser.api import detect_assays
-            from src.normalizer.api import normalize_lines
-            from src.ruleresolver.api import resolve_ruleset
-            from src.contentsplitter.api import split_by_assay_name_and_key
+            from src.parser.api import ParserOptions, iter_pages
+            from src.assaychooser.api import assign_page_ranges, detect_assays
+            from src.normalizer.api import PageIndex, normalize_text
+            from src.ruleresolver.api import resolve_compiled_ruleset
+            from src.contentsplitter.api import split_by_assay_name_and_key_views
+            from src.contentsplitter.contentsplitter import ContentSplitError
             from src.contentsplitter.model import AssayDescriptor
             from src.extractor.api import extract_record
-            from src.writer.api import write_record
+            from src.extractor.extractor import ExtractionError
 
-            doc = parse(str(pdf))
-            state["status"] = "PARSED"
-            state["steps"].append({"step": "parser", "page_count": doc.meta.get("page_count")})
-            self._save_state(state_path, state)
+            # PLAN PARSE REGIONS: if every assay in the document has a header-only ruleset with
+            # parse_regions, only those clip rectangles are parsed instead of the full pages
+            index_path = str(rules_dir / "index.json")
+            parser_cache_dir = str(cache_dir / "parser")
+            plan = self._plan_parse_regions(str(pdf), str(rules_dir), index_path, parser_cache_dir, digest)
+            regions = None if plan is None else plan[0]
+            state["steps"].append({
+                "step": "parse_regions",
+                "mode": "full" if regions is None else "regions",
+                "regions": 0 if regions is None else len(regions),
+            })
 
-            # NORMALIZE
-            raw_lines = [ln for p in doc.pages for ln in p.lines]
-            norm_lines = normalize_lines(raw_lines)
-            norm_text = "\n".join(norm_lines)
-            state["status"] = "NORMALIZED"
-            state["steps"].append({"step": "normalizer", "lines": len(norm_lines)})
-            self._save_state(state_path, state)
+            # PARSE + NORMALIZE (streamed: pages go straight into the normalizer's output buffer,
+            # neither raw nor normalized line lists are retained); page_index maps text offsets to pages
+            counts = {"pages": 0, "lines": 0}
 
-            # DEBUG DUMP: normalized text (full)
-            normalized_dump = jobs_dir / f"{job_id}_normalized.txt"
-            normalized_dump.write_text(norm_text, encoding="utf-8")
-            state["steps"].append({"step": "debug", "normalized_dump": str(normalized_dump)})
-            self._save_state(state_path, state)
+            def parse_text(regions: Optional[Tuple[Any, ...]]) -> Tuple[str, Any]:
+                counts["pages"] = counts["lines"] = 0
+                page_index = PageIndex()
+                parser_options = ParserOptions(cache_dir=parser_cache_dir, regions=regions,
+                                               strip_furniture=self._strip_furniture)
 
-            # ASSAY DETECT
-            index_path = str(rules_dir / "index.json")
-            matches = detect_assays(norm_text, index_path)
-            assay_keys = [m.assay_key for m in matches]
-            state["status"] = "ASSAYS_DETECTED"
-            state["steps"].append({"step": "assaychooser", "assay_keys": assay_keys})
-            self._save_state(state_path, state)
+                def page_lines():
+                    for page in iter_pages(str(pdf), parser_options, digest):
+                        counts["pages"] += 1
+                        counts["lines"] += len(page.lines)
+                        yield page.lines
 
-            if not assay_keys:
-                state["status"] = "FAILED"
-                state["error"] = "no_assay_detected"
+                return normalize_text(page_lines(), page_index), page_index
+
+            norm_text, page_index = parse_text(regions)
+            if plan is not None:
+                # the clipped pages must show exactly the planned assays; otherwise (a clip that misses
+                # its key, another assay's key inside a clip) the document is parsed in full instead
+                # of dropping an assay
+                seen = [m.assay_key for m in detect_assays(norm_text, index_path)]
+                if sorted(seen) != sorted(plan[1]):
+                    state["steps"].append({"step": "parse_regions", "mode": "full", "reason": "assays_differ",
+                                           "planned": plan[1], "seen": seen})
+                    regions = None
+                    norm_text, page_index = parse_text(None)
+
+            def record_parse(norm_text: str) -> None:
+                state["status"] = "PARSED"
+                state["steps"].append({"step": "parser", "page_count": counts["pages"]})
                 self._save_state(state_path, state)
-                return self._result("FAILED", job_id, str(pdf), {"error": "no_assay_detected"})
-
-            # Resolve rulesets early (required for assay_name-based split)
-            assay_rulesets: Dict[str, Any] = {}
-            assay_descriptors: List[Any] = []
-            for k in assay_keys:
-                rs = resolve_ruleset(k, str(rules_dir), index_path)
-                assay_rulesets[k] = rs
-                assay_name = rs.data.get("assay_name")
-                if not assay_name:
-                    raise RuntimeError(f"ruleset missing assay_name for {k}")
-                assay_descriptors.append(AssayDescriptor(assay_key=k, assay_name=assay_name))
-
-            # SPLIT (NEW): start at FIRST assay_name; valid only if assay_key appears after it
-            blocks = split_by_assay_name_and_key(norm_text, assay_descriptors)
-
-            state["status"] = "SPLIT"
-            state["steps"].append({
-                "step": "contentsplitter",
-                "mode": "assay_name_and_key",
-                "assays": [{"assay_key": a.assay_key, "assay_name": a.assay_name} for a in assay_descriptors],
-                "blocks": {k: len(v.splitlines()) for k, v in blocks.items()},
-            })
-            self._save_state(state_path, state)
 
-            # DEBUG DUMP: per-assay blocks (exact input to Extractor)
-            block_dumps = {}
-            for k, block in blocks.items():
-                safe_k = k.replace("(", "").replace(")", "")
-                p = jobs_dir / f"{job_id}_{safe_k}_block.txt"
-                p.write_text(block, encoding="utf-8")
-                block_dumps[k] = str(p)
+                state["status"] = "NORMALIZED"
+                state["steps"].append({"step": "normalizer", "lines": counts["lines"]})
+                self._save_state(state_path, state)
 
-            state["steps"].append({"step": "debug_blocks", "block_dumps": block_dumps})
-            self._save_state(state_path, state)
+                # DEBUG DUMP: normalized text (full)
+                normalized_dump = jobs_dir / f"{job_id}_normalized.txt"
+                normalized_dump.write_text(norm_text, encoding="utf-8")
+                state["steps"].append({"step": "debug", "normalized_dump": str(normalized_dump)})
+                self._save_state(state_path, state)
+
+            def analyze(norm_text: str, page_index: Any) -> Union[JobResult, Tuple[List[str], List[Any]]]:
+                # ASSAY DETECT
+                matches = detect_assays(norm_text, index_path)
+                assay_keys = [m.assay_key for m in matches]
+                state["status"] = "ASSAYS_DETECTED"
+                state["steps"].append({"step": "assaychooser", "assay_keys": assay_keys})
+                self._save_state(state_path, state)
+
+                if not assay_keys:
+                    state["status"] = "FAILED"
+                    state["error"] = "no_assay_detected"
+                    self._save_state(state_path, state)
+                    return self._result("FAILED", job_id, str(pdf), {"error": "no_assay_detected"})
+
+                # Resolve rulesets early (required for assay_name-based split)
+                assay_rulesets: Dict[str, Any] = {}
+                assay_descriptors: List[Any] = []
+                for k in assay_keys:
+                    rs = resolve_compiled_ruleset(k, str(rules_dir), index_path)
+                    assay_rulesets[k] = rs
+                    assay_name = rs.data.get("assay_name")
+                    if not assay_name:
+                        raise RuntimeError(f"ruleset missing assay_name for {k}")
+                    assay_descriptors.append(AssayDescriptor(assay_key=k, assay_name=assay_name))
+
+                # patterns flagged by the static backtracking check run under the extractor's time budget
+                risky: Dict[str, Dict[str, str]] = {}
+                for k, rs in assay_rulesets.items():
+                    flagged = {f.key: f.risk or f.after_risk for f in rs.fields if f.risk or f.after_risk}
+                    if rs.lot_risk:
+                        flagged["lot_rule"] = rs.lot_risk
+                    if flagged:
+                        risky[k] = flagged
+                if risky:
+                    state["steps"].append({"step": "ruleset_checks", "guarded_fields": risky})
+
+                # SPLIT (NEW): start at FIRST assay_name; valid only if assay_key appears after it
+                # (blocks are offset views into norm_text, nothing is copied)
+                blocks = split_by_assay_name_and_key_views(norm_text, assay_descriptors)
+                matches = assign_page_ranges(matches, blocks, page_index)
 
-            # EXTRACT + WRITE (reuse already loaded rulesets)
-            writes: List[Dict[str, Any]] = []
-            for k in assay_keys:
-                ruleset = assay_rulesets[k]
-                rec = extract_record(blocks[k], ruleset)
-                wr = write_record(rec, ruleset, str(output_dir))
-                writes.append({
-                    "assay_key": k,
-                    "excel_path": wr.excel_path,
-                    "sheet": wr.sheet_name,
-                    "status": wr.status
+                state["status"] = "SPLIT"
+                state["steps"].append({
+                    "step": "contentsplitter",
+                    "mode": "assay_name_and_key",
+                    "assays": [{"assay_key": a.assay_key, "assay_name": a.assay_name} for a in assay_descriptors],
+                    "blocks": {k: v.line_count() for k, v in blocks.items()},
+                    "pages": {m.assay_key: [m.first_page, m.last_page] for m in matches},
                 })
+                self._save_state(state_path, state)
+
+                # DEBUG DUMP: per-assay blocks (exact input to Extractor)
+                block_dumps = {}
+                for k, block in blocks.items():
+                    safe_k = k.replace("(", "").replace(")", "")
+                    p = jobs_dir / f"{job_id}_{safe_k}_block.txt"
+                    p.write_text(block.text(), encoding="utf-8")
+                    block_dumps[k] = str(p)
+
+                state["steps"].append({"step": "debug_blocks", "block_dumps": block_dumps})
+                self._save_state(state_path, state)
+
+                # EXTRACT (reuse already loaded rulesets); records are written by the caller's batch
+                records = []
+                for k in assay_keys:
+                    ruleset = assay_rulesets[k]
+                    records.append((extract_record(blocks[k], ruleset), ruleset.ruleset))
+                return assay_keys, records
+
+            record_parse(norm_text)
+            try:
+                analyzed = analyze(norm_text, page_index)
+            except (ContentSplitError, ExtractionError) as e:
+                if regions is None:
+                    raise
+                # parse_regions must cover every field the ruleset reads (assay_name, lot_rule and all
+                # extract_rules fields); a clip that misses one gets the full document instead of failing
+                state["steps"].append({"step": "parse_regions", "mode": "full", "reason": "clip_incomplete",
+                                       "error": str(e)})
+                regions = None
+                norm_text, page_index = parse_text(None)
+                record_parse(norm_text)
+                analyzed = analyze(norm_text, page_index)
+            if isinstance(analyzed, JobResult):
+                return analyzed
+            assay_keys, records = analyzed
 
-            state["status"] = "DONE"
-            state["steps"].append({"step": "writer", "writes": writes})
+            state["status"] = "EXTRACTED"
             self._save_state(state_path, state)
-            return self._result("DONE", job_id, str(pdf), {"assay_keys": assay_keys, "writes": writes})
+            job = _PendingJob(job_id=job_id, pdf_path=str(pdf), state=state, state_path=state_path,
+                              lock_path=lock_path, assay_keys=assay_keys, records=records)
+            return job
 
         except Exception as e:
             state["status"] = "FAILED"
@@ -148,14 +268,122 @@ class JobController:
             self._save_state(state_path, state)
             return self._result("FAILED", job_id, str(pdf), {"error": str(e)})
         finally:
-            self._release_lock(lock_path)
+            # a pending job keeps its lock until its records are written
+            if job is None:
+                self._release_lock(lock_path)
+
+    def _write_jobs(self, jobs: List[_PendingJob], output_dir: str) -> List[Tuple[int, JobResult]]:
+        from src.writer.api import stage_records, write_records
+
+        write = stage_records if self._staging else write_records
+        try:
+            write_results = write([item for job in jobs for item in job.records], output_dir)
+        except Exception as e:
+            return [(i, self._fail_job(job, e)) for i, job in enumerate(jobs)]
+
+        out = []
+        it = iter(write_results)
+        for i, job in enumerate(jobs):
+            out.append((i, self._finish_job(job, [wr for _, wr in zip(job.records, it)])))
+        return out
+
+    def _collect_jobs(self, jobs: List[_PendingJob]) -> List[Tuple[int, JobResult]]:
+        # write-behind mode: each job waits only for the futures of its own records. All of them
+        # are queued by now, so start writing at once instead of waiting for the queue's max delay.
+        # A dead writer thread fails its futures, so result() cannot block forever.
+        self._write_behind.flush(block=False)
+        out = []
+        for i, job in enumerate(jobs):
+            try:
+                write_results = [f.result() for f in job.writes]
+            except Exception as e:
+                out.append((i, self._fail_job(job, e)))
+                continue
+            out.append((i, self._finish_job(job, write_results)))
+        return out
+
+    def _finish_job(self, job: _PendingJob, write_results: List[Any]) -> JobResult:
+        writes: List[Dict[str, Any]] = []
+        for (rec, _), wr in zip(job.records, write_results):
+            writes.append({
+                "assay_key": rec.assay_key,
+                "excel_path": wr.excel_path,
+                "sheet": wr.sheet_name,
+                "status": wr.status
+            })
+        job.state["status"] = "DONE"
+        job.state["steps"].append({"step": "writer", "writes": writes})
+        self._save_state(job.state_path, job.state)
+        return self._result("DONE", job.job_id, job.pdf_path, {"assay_keys": job.assay_keys, "writes": writes})
+
+    def _fail_job(self, job: _PendingJob, e: Exception) -> JobResult:
+        job.state["status"] = "FAILED"
+        job.state["error"] = str(e)
+        self._save_state(job.state_path, job.state)
+        return self._result("FAILED", job.job_id, job.pdf_path, {"error": str(e)})
+
+    def _plan_parse_regions(self, pdf_path: str, rules_dir: str, index_path: str, parser_cache_dir: str,
+                            digest: Optional[str] = None) -> Optional[Tuple[Tuple[Any, ...], List[str]]]:
+        """Return (absolute parse regions, assay keys they were planned for), or None for a full parse.
+
+        Ruleset parse_regions are relative to the first page that contains the assay_key
+        (page_offset 0 = that page) and must cover everything the ruleset reads (assay_name,
+        assay_key, lot_rule, every extract_rules field); the job parses in full when they do not. A cheap text-mode probe locates those pages; it stops at
+        the first page showing an assay without parse_regions, as the document is then parsed
+        in full anyway. Keys are also looked up with whitespace removed, so a key the probe's
+        reading order breaks across lines still counts.
+        """
+        from src.parser.api import ParserOptions, ParseRegion, iter_pages
+        from src.assaychooser.api import detect_assays
+        from src.normalizer.api import normalize_text
+        from src.ruleresolver.api import list_assay_keys, resolve_ruleset
+
+        try:
+            index_keys = list_assay_keys(index_path)
+        except Exception:
+            return None
+        region_rules: Dict[str, List[Dict[str, Any]]] = {}
+        for k in index_keys:
+            try:
+                regions = resolve_ruleset(k, rules_dir, index_path).data.get("parse_regions")
+            except Exception:
+                continue
+            if regions:
+                region_rules[k] = regions
+        if not region_rules:
+            return None
+
+        first_pages: Dict[str, int] = {}
+        page_count = 0
+        pages = iter_pages(pdf_path, ParserOptions(extraction="text", cache_dir=parser_cache_dir), digest)
+        try:
+            for page in pages:
+                page_count += 1
+                text = normalize_text([page.lines])
+                for m in detect_assays(text + "\n" + "".join(text.split()), index_path):
+                    if m.assay_key not in region_rules:
+                        return None
+                    first_pages.setdefault(m.assay_key, page_count)
+        finally:
+            pages.close()
+        if not first_pages:
+            return None
+
+        planned: List[Tuple[int, Tuple[float, float, float, float]]] = []
+        for k, first_page in first_pages.items():
+            for r in region_rules[k]:
+                page_number = first_page + int(r.get("page_offset", 0))
+                if 1 <= page_number <= page_count:
+                    planned.append((page_number, tuple(float(v) for v in r["clip"])))
+        regions = tuple(ParseRegion(page_number=n, clip=c) for n, c in sorted(set(planned)))
+        return regions, list(first_pages)
 
     def _hash_file(self, path: Path) -> str:
         h = hashlib.sha256()
         with open(path, "rb") as f:
             for chunk in iter(lambda: f.read(1024 * 1024), b""):
                 h.update(chunk)
-        return h.hexdigest()[:16]
+        return h.hexdigest()
 
     def _acquire_lock(self, lock_path: Path) -> None:
         fd = os.open(str(lock_path), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from typing import List
+from typing import Iterable, List, Optional
+
+from .model import PageIndex
 
 from .normalizer import Normalizer
 
@@ -13,3 +15,16 @@ def normalize_lines(lines: List[str]) -> List[str]:
     - Preserve line breaks (line count unchanged).
     """
     return Normalizer().normalize_lines(lines)
+
+
+def normalize_text(chunks: Iterable[List[str]], page_index: Optional[PageIndex] = None) -> str:
+    """Public API (Normalizer) – whole document
+
+    Contract:
+    - chunks: line lists in document order (e.g. ParsedPage.lines from src.parser.api.iter_pages);
+      consumed lazily, one pass.
+    - Result is byte-identical to "\\n".join(normalize_lines(<all lines of all chunks>)).
+    - page_index (optional, empty PageIndex): filled with the start offset of every non-empty chunk;
+      chunk n (1-based) is page n, as iter_pages yields every page in order.
+    """
+    return Normalizer().normalize_text(chunks, page_index)
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+
+@dataclass
+class PageIndex:
+    """Page boundaries in a normalized text: page_numbers[i] starts at offset starts[i].
+
+    Filled by normalize_text while it builds the text (offsets strictly increasing).
+    """
+    starts: List[int] = field(default_factory=list)
+    page_numbers: List[int] = field(default_factory=list)
+
+    def add(self, start: int, page_number: int) -> None:
+        self.starts.append(start)
+        self.page_numbers.append(page_number)
+
+    def page_at(self, offset: int) -> Optional[int]:
+        """Page number containing the character at offset (None before the first page)."""
+        i = bisect_right(self.starts, offset) - 1
+        return self.page_numbers[i] if i >= 0 else None
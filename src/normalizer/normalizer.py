@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import re
-from typing import List
+from typing import Iterable, List, Optional
+
+from .model import PageIndex
 
 
 class Normalizer:
@@ -12,3 +14,24 @@ class Normalizer:
         for line in lines:
             out.append(self._ws_re.sub(" ", line).strip())
         return out
+
+    def normalize_text(self, chunks: Iterable[List[str]], page_index: Optional[PageIndex] = None) -> str:
+        # One regex pass per chunk (page) instead of per line; the pattern never matches "\n",
+        # so substituting the joined chunk is identical to substituting each line.
+        sub = self._ws_re.sub
+        out: List[str] = []
+        pos = 0  # offset of the next chunk in the joined result
+        for page_number, lines in enumerate(chunks, start=1):
+            if not lines:
+                continue
+            chunk = "\n".join(lines)
+            if chunk.count("\n") != len(lines) - 1:
+                # a line with an embedded newline: keep per-line strip semantics
+                chunk = "\n".join(sub(" ", line).strip() for line in lines)
+            else:
+                chunk = "\n".join(part.strip() for part in sub(" ", chunk).split("\n"))
+            if page_index is not None:
+                page_index.add(pos, page_number)
+            out.append(chunk)
+            pos += len(chunk) + 1
+        return "\n".join(out)
@@ -1,17 +1,51 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional
 
-from .model import ParsedDocument, ParsedPage
+from .model import ParsedDocument, ParsedPage, ParserOptions, ParseRegion
 from .parser import Parser
 
-def parse(pdf_path: str) -> ParsedDocument:
+def parse(pdf_path: str, options: Optional[ParserOptions] = None, digest: Optional[str] = None) -> ParsedDocument:
     """Public API (Parser)
 
     Contract:
     - Positional / line-based PDF extraction using PyMuPDF.
     - Deterministic.
     - No normalization.
+    - options.clustering selects the line clustering strategy ("sweep" default, "scan" reference);
+      both produce identical ParsedPage.lines.
+    - options.extraction selects span extraction ("lean" default: no image payloads, slotted fragments;
+      "dict" reference); both produce identical ParsedPage.lines.
+    - options.layout = "numpy" builds lines with array-based geometry (identical ParsedPage.lines);
+      falls back to the pure-Python layout when NumPy is not installed.
+    - options.workers > 1 (0 = all cores) parses page ranges in a process pool once the document has
+      at least options.parallel_min_pages pages; pages are returned in document order.
+    - options.cache_dir enables a persistent cache keyed by sha256(file) + parser config version;
+      a hit skips PyMuPDF entirely. Least recently used entries are evicted above options.cache_max_bytes.
+      A caller that already hashed the file passes digest (sha256 hex) and the file is not read again.
+    - options.extraction = "text" returns PyMuPDF reading-order lines without positional clustering
+      (cheap probe for assay detection; lines differ from "lean"/"dict").
+    - options.regions restricts extraction to the given page/clip rectangles; pages without a region
+      are not loaded and come back with empty lines (page numbering unchanged).
+    - options.low_memory uses text-only TextPage flags (ligatures expanded, no images);
+      options.store_max_bytes trims MuPDF's process-wide resource store after each page.
+      Pages and TextPages are released as soon as their lines are built.
+    - options.strip_furniture drops header/footer lines (top/bottom page band, same position + text)
+      that repeat within a section; a section starts on every page with a new header line, so each
+      section keeps one copy. Dropped lines are listed in ParsedDocument.meta["furniture"] (parse() only).
     """
-    return Parser().parse(pdf_path)
+    return Parser(options).parse(pdf_path, digest)
+
+
+def iter_pages(pdf_path: str, options: Optional[ParserOptions] = None, digest: Optional[str] = None) -> Iterator[ParsedPage]:
+    """Public API (Parser) – streaming
+
+    Contract:
+    - Same pages and lines as parse(), yielded lazily in document order.
+    - Only a bounded window of pages is held by the parser at any time.
+    - Errors surface as ParserError while iterating.
+    - With options.cache_dir the cache entry is written and read page by page as well; it is
+      committed only when the last page was yielded (stopping early stores nothing).
+    """
+    return Parser(options).iter_pages(pdf_path, digest)
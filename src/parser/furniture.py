@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+
+BAND_TOP: str = "top"
+BAND_BOTTOM: str = "bottom"
+
+# ("<band>:<text hash>", (x0, y0) of the line's first fragment)
+FurnitureKey = Tuple[str, Tuple[float, float]]
+
+
+class FurnitureFilter:
+    """Drops repeated page furniture (header/footer lines) inside a section.
+
+    Furniture lines carry a key "<band>:<text hash>" plus the (x0, y0) of their first
+    fragment; a line repeats when key and position (within the tolerance) match. A
+    page whose top-band lines all repeat continues the current section, and its
+    repeated furniture lines are dropped. Any new top-band line (e.g. the
+    next assay's title) starts a new section whose first page keeps all lines,
+    so every section still carries its own header for splitting/extraction.
+    """
+
+    def __init__(self, tolerance: float) -> None:
+        self._tolerance = tolerance
+        self._section: Dict[str, Tuple[float, float]] = {}
+        self._records: Dict[str, Dict[str, object]] = {}
+
+    def apply(self, page_number: int, lines: List[str], keys: List[Optional[FurnitureKey]]) -> List[str]:
+        top = [k for k in keys if k is not None and k[0].startswith(BAND_TOP + ":")]
+        if not top or not all(self._repeats(k) for k in top):
+            self._section = {k[0]: k[1] for k in keys if k is not None}
+            for line, key in zip(lines, keys):
+                if key is not None:
+                    self._record(key[0], line, page_number)
+            return list(lines)
+
+        out: List[str] = []
+        for line, key in zip(lines, keys):
+            if key is None:
+                out.append(line)
+                continue
+            if self._repeats(key):
+                self._records[key[0]]["repeated_on"].append(page_number)
+                continue
+            self._section[key[0]] = key[1]
+            self._record(key[0], line, page_number)
+            out.append(line)
+        return out
+
+    def _repeats(self, key: FurnitureKey) -> bool:
+        seen = self._section.get(key[0])
+        if seen is None:
+            return False
+        return abs(seen[0] - key[1][0]) <= self._tolerance and abs(seen[1] - key[1][1]) <= self._tolerance
+
+    def furniture(self) -> List[Dict[str, object]]:
+        """Document-level metadata: every furniture line that was dropped at least once."""
+        return [dict(r) for r in self._records.values() if r["repeated_on"]]
+
+    def _record(self, key: str, line: str, page_number: int) -> None:
+        if key not in self._records:
+            self._records[key] = {
+                "band": key.split(":", 1)[0],
+                "text": line,
+                "first_page": page_number,
+                "repeated_on": [],
+            }
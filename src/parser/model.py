@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 @dataclass(frozen=True)
 class ParsedPage:
@@ -11,3 +11,22 @@ class ParsedDocument:
     source_path: str
     pages: List[ParsedPage]
     meta: Dict[str, object]
+
+@dataclass(frozen=True)
+class ParseRegion:
+    page_number: int  # 1-based
+    clip: Tuple[float, float, float, float]  # x0, y0, x1, y1 in PDF points
+
+@dataclass(frozen=True)
+class ParserOptions:
+    clustering: str = "sweep"  # sweep|scan
+    extraction: str = "lean"  # lean|dict|text
+    layout: str = "python"  # python|numpy (numpy falls back to python when NumPy is not installed)
+    workers: int = 1  # process pool size for page-parallel parsing; 1 = sequential, 0 = os.cpu_count()
+    parallel_min_pages: int = 32  # documents with fewer pages are always parsed sequentially
+    cache_dir: Optional[str] = None  # persistent parse cache (content-addressed); None = disabled
+    cache_max_bytes: int = 256 * 1024 * 1024  # LRU-by-size eviction threshold for cache_dir
+    regions: Optional[Tuple[ParseRegion, ...]] = None  # clip-region parsing; None = full pages, pages without a region yield no lines
+    low_memory: bool = False  # text-only TextPage flags (no images, ligatures expanded) for lean/text extraction
+    store_max_bytes: Optional[int] = None  # cap for MuPDF's (process-wide) resource store, trimmed after each page
+    strip_furniture: bool = False  # drop repeated header/footer lines within a section; listed in ParsedDocument.meta["furniture"]
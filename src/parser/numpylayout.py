@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from typing import List, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency; Parser falls back to the pure-Python layout
+    np = None
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+class NumpyLayout:
+    """Array-backed line building (same lines as the pure-Python sweep/scan path).
+
+    Bboxes are held in one float64 array; y-centers, x-ordering inside lines and the
+    gap space counts are computed in batch. Only the cluster labelling walks the
+    sorted centers, because each line's running mean depends on the previous ones.
+    Strings are joined once per line at the very end.
+    """
+
+    def __init__(self, line_y_tolerance: float, min_x_gap_for_space: float, multi_space_gap_step: float,
+                 min_printable_chars: int) -> None:
+        self._tol = line_y_tolerance
+        self._min_gap = min_x_gap_for_space
+        self._gap_step = multi_space_gap_step
+        self._min_chars = min_printable_chars
+
+    def build_lines(self, fragments: Sequence) -> List[str]:
+        if not fragments:
+            return []
+        texts = [f.text for f in fragments]
+        boxes = np.array([(f.x0, f.y0, f.x1, f.y1) for f in fragments], dtype=np.float64)
+        x0, y0, x1, y1 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+        yc = (y0 + y1) / 2.0
+
+        by_y = np.lexsort((x0, yc))
+        labels = self._cluster_labels(yc[by_y].tolist())
+        # stable: equal x0 inside a line keeps (y_center, x0) order, like sorted() in the Python path
+        in_line = np.lexsort((x0[by_y], labels))
+        order = by_y[in_line]
+        labels = labels[in_line]
+
+        gaps = x0[order[1:]] - x1[order[:-1]]
+        spaces = np.zeros(len(order), dtype=np.int64)
+        if self._gap_step > 0:
+            extra = np.maximum(0, np.floor_divide(gaps, self._gap_step)).astype(np.int64)
+        else:
+            extra = np.zeros(len(gaps), dtype=np.int64)
+        spaces[1:] = np.where(gaps > self._min_gap, 1 + extra, 0)
+        starts = np.flatnonzero(np.diff(labels)) + 1
+        spaces[starts] = 0
+        spaces[0] = 0
+
+        bounds = [0, *starts.tolist(), len(order)]
+        order_l = order.tolist()
+        spaces_l = spaces.tolist()
+        lines: List[str] = []
+        for a, b in zip(bounds, bounds[1:]):
+            line_text = "".join(" " * spaces_l[i] + texts[order_l[i]] for i in range(a, b)).strip()
+            if len(line_text.strip()) >= self._min_chars:
+                lines.append(line_text)
+        return lines
+
+    def _cluster_labels(self, centers: List[float]):
+        # Same arithmetic as Parser._cluster_fragments_sweep so tolerance edge cases match bit for bit.
+        labels: List[int] = []
+        label = 0
+        y_ref = centers[0]
+        n = 0
+        tol = self._tol
+        for y in centers:
+            if n and abs(y - y_ref) > tol:
+                label += 1
+                n = 0
+            if n:
+                n += 1
+                y_ref = (y_ref * (n - 1) + y) / n
+            else:
+                y_ref = y
+                n = 1
+            labels.append(label)
+        return np.array(labels, dtype=np.int64)
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import zlib
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
+
+from .model import ParsedPage
+
+
+CACHE_FILE_SUFFIX: str = ".pagez"
+CACHE_FORMAT_VERSION: int = 3
+_READ_CHUNK: int = 64 * 1024
+
+
+class ParseCacheError(RuntimeError):
+    pass
+
+
+class ParseCache:
+    """Content-addressed on-disk cache of parser output.
+
+    Entries are named <sha256(pdf)>-<config fingerprint> and hold one zlib stream of JSON
+    lines: a {"format": ...} header, one [page_number, lines] record per page and a
+    {"furniture": [...]} trailer. They are written and read one page at a time, so neither
+    a miss nor a hit holds the whole document. A hit refreshes the entry's mtime; when the
+    directory grows beyond max_bytes the least recently used entries (oldest mtime) are evicted.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, fingerprint: str) -> None:
+        self._dir = Path(cache_dir)
+        self._max_bytes = max_bytes
+        self._fingerprint = fingerprint
+
+    def key_for(self, pdf_path: str, digest: Optional[str] = None) -> str:
+        """Cache key of a PDF; digest (sha256 hex of the file) skips re-hashing it."""
+        if digest is None:
+            h = hashlib.sha256()
+            with open(pdf_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    h.update(chunk)
+            digest = h.hexdigest()
+        return f"{digest}-{self._fingerprint}"
+
+    def load(self, key: str) -> Optional[CachedEntry]:
+        path = self._path(key)
+        records = _read_records(path)
+        try:
+            header = next(records)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # corrupt / truncated entry -> treat as miss and drop it
+            records.close()
+            path.unlink(missing_ok=True)
+            return None
+        if not isinstance(header, dict) or header.get("format") != CACHE_FORMAT_VERSION:
+            records.close()
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return CachedEntry(path, records)
+
+    def open_entry(self, key: str) -> CacheEntryWriter:
+        """Start writing an entry; it becomes visible only on commit()."""
+        self._dir.mkdir(parents=True, exist_ok=True)
+        return CacheEntryWriter(self, self._path(key))
+
+    def _path(self, key: str) -> Path:
+        return self._dir / f"{key}{CACHE_FILE_SUFFIX}"
+
+    def _evict(self) -> None:
+        entries = []
+        total = 0
+        for p in self._dir.glob(f"*{CACHE_FILE_SUFFIX}"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+            total += st.st_size
+        if total <= self._max_bytes:
+            return
+        entries.sort(key=lambda e: e[0])
+        for _, size, p in entries:
+            if total <= self._max_bytes:
+                break
+            try:
+                p.unlink()
+                total -= size
+            except OSError:
+                pass
+
+
+class CacheEntryWriter:
+    """Appends pages to a temporary file; commit() renames it into place."""
+
+    def __init__(self, cache: ParseCache, path: Path) -> None:
+        self._cache = cache
+        self._path = path
+        self._tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        self._file: BinaryIO = open(self._tmp, "wb")
+        self._zip = zlib.compressobj()
+        self._closed = False
+        self._write({"format": CACHE_FORMAT_VERSION})
+
+    def append(self, page: ParsedPage) -> None:
+        self._write([page.page_number, page.lines])
+
+    def commit(self, furniture: Optional[List[Dict[str, Any]]] = None) -> None:
+        self._write({"furniture": furniture or []})
+        self._file.write(self._zip.flush())
+        self._file.close()
+        self._closed = True
+        os.replace(self._tmp, self._path)
+        self._cache._evict()
+
+    def abort(self) -> None:
+        if self._closed:
+            return
+        self._file.close()
+        self._closed = True
+        self._tmp.unlink(missing_ok=True)
+
+    def _write(self, record: Any) -> None:
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        self._file.write(self._zip.compress(line.encode("utf-8")))
+
+
+class CachedEntry:
+    """A cache hit; pages() streams the entry, furniture is set once it is exhausted.
+
+    Damage past the header only shows while streaming: pages() then raises ParseCacheError.
+    """
+
+    def __init__(self, path: Path, records: Iterator[Any]) -> None:
+        self._path = path
+        self._records = records
+        self.furniture: List[Dict[str, Any]] = []
+
+    def pages(self) -> Iterator[ParsedPage]:
+        try:
+            for record in self._records:
+                if isinstance(record, dict):
+                    self.furniture = record.get("furniture", [])
+                    return
+                n, lines = record
+                yield ParsedPage(page_number=n, lines=lines)
+            raise ValueError(f"parse cache entry has no trailer: {self._path.name}")
+        except (ValueError, zlib.error) as e:
+            # corrupt / truncated after the header: drop it, the caller parses the PDF instead
+            self._path.unlink(missing_ok=True)
+            raise ParseCacheError(f"corrupt parse cache entry: {e}") from e
+        finally:
+            self._records.close()
+
+
+def _read_records(path: Path) -> Iterator[Any]:
+    # decompress in chunks and yield one JSON record per line
+    unzip = zlib.decompressobj()
+    buf = b""
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_READ_CHUNK), b""):
+            buf += unzip.decompress(chunk)
+            *lines, buf = buf.split(b"\n")
+            for line in lines:
+                yield json.loads(line)
+    if buf or not unzip.eof:
+        raise ValueError(f"truncated parse cache entry: {path.name}")
@@ -1,18 +1,52 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import List, Optional, Tuple
+from itertools import islice
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
 
 import fitz  # PyMuPDF
 
-from .model import ParsedDocument, ParsedPage
+from .model import ParsedDocument, ParsedPage, ParserOptions, ParseRegion
+from .furniture import BAND_BOTTOM, BAND_TOP, FurnitureFilter, FurnitureKey
+from .numpylayout import NumpyLayout, numpy_available
+from .parsecache import ParseCache, ParseCacheError
 
 
+# Bump whenever a change alters ParsedPage.lines for the same input (invalidates the parse cache).
+PARSER_VERSION: str = "1"
+
 LINE_Y_TOLERANCE: float = 2.0
 MIN_X_GAP_FOR_SPACE: float = 1.5
 MULTI_SPACE_GAP_STEP: float = 20.0
 MIN_PRINTABLE_CHARS: int = 1
 
+CLUSTERING_SWEEP: str = "sweep"
+CLUSTERING_SCAN: str = "scan"
+
+EXTRACTION_LEAN: str = "lean"
+EXTRACTION_DICT: str = "dict"
+EXTRACTION_TEXT: str = "text"
+
+LAYOUT_PYTHON: str = "python"
+LAYOUT_NUMPY: str = "numpy"
+
+# Page furniture bands (fraction of page height): candidate header/footer lines
+FURNITURE_TOP_RATIO: float = 0.09
+FURNITURE_BOTTOM_RATIO: float = 0.94
+
+PARALLEL_CHUNKS_PER_WORKER: int = 4
+PARALLEL_WINDOW_PER_WORKER: int = 2
+
+# "dict" defaults minus image payloads; image blocks are discarded anyway, so span output is unchanged.
+LEAN_TEXT_FLAGS: int = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+# Low-memory profile: text only, ligatures expanded (no ligature glyph bookkeeping).
+LOW_MEMORY_TEXT_FLAGS: int = LEAN_TEXT_FLAGS & ~fitz.TEXT_PRESERVE_LIGATURES
+
 
 @dataclass(frozen=True)
 class _Fragment:
@@ -27,6 +61,20 @@ class _Fragment:
         return (self.y0 + self.y1) / 2.0
 
 
+class _LeanFragment:
+    """Slotted fragment with a precomputed y_center (no per-instance dict)."""
+
+    __slots__ = ("text", "x0", "y0", "x1", "y1", "y_center")
+
+    def __init__(self, text: str, x0: float, y0: float, x1: float, y1: float) -> None:
+        self.text = text
+        self.x0 = x0
+        self.y0 = y0
+        self.x1 = x1
+        self.y1 = y1
+        self.y_center = (y0 + y1) / 2.0
+
+
 class ParserError(RuntimeError):
     pass
 
@@ -34,32 +82,244 @@ class ParserError(RuntimeError):
 class Parser:
     """Internal parser implementation (positional)."""
 
-    def parse(self, pdf_path: str) -> ParsedDocument:
+    def __init__(self, options: Optional[ParserOptions] = None) -> None:
+        self._options = options or ParserOptions()
+        if self._options.clustering not in (CLUSTERING_SWEEP, CLUSTERING_SCAN):
+            raise ParserError(f"unknown clustering strategy: {self._options.clustering}")
+        if self._options.extraction not in (EXTRACTION_LEAN, EXTRACTION_DICT, EXTRACTION_TEXT):
+            raise ParserError(f"unknown extraction mode: {self._options.extraction}")
+        if self._options.workers < 0:
+            raise ParserError(f"invalid worker count: {self._options.workers}")
+        if self._options.layout not in (LAYOUT_PYTHON, LAYOUT_NUMPY):
+            raise ParserError(f"unknown layout engine: {self._options.layout}")
+        self._numpy_layout: Optional[NumpyLayout] = None
+        if self._options.layout == LAYOUT_NUMPY and numpy_available():
+            self._numpy_layout = NumpyLayout(LINE_Y_TOLERANCE, MIN_X_GAP_FOR_SPACE, MULTI_SPACE_GAP_STEP, MIN_PRINTABLE_CHARS)
+        if self._options.store_max_bytes is not None and self._options.store_max_bytes < 0:
+            raise ParserError(f"invalid store_max_bytes: {self._options.store_max_bytes}")
+        self._text_flags = LOW_MEMORY_TEXT_FLAGS if self._options.low_memory else LEAN_TEXT_FLAGS
+        self._clips_by_page: Optional[Dict[int, List[fitz.Rect]]] = None
+        if self._options.regions is not None:
+            self._clips_by_page = self._index_regions(self._options.regions)
+        self._furniture: List[Dict[str, Any]] = []
+        self._cache: Optional[ParseCache] = None
+        if self._options.cache_dir:
+            self._cache = ParseCache(self._options.cache_dir, self._options.cache_max_bytes, self._cache_fingerprint())
+
+    def parse(self, pdf_path: str, digest: Optional[str] = None) -> ParsedDocument:
+        parsed_pages = list(self.iter_pages(pdf_path, digest))
+        meta: Dict[str, object] = {"page_count": len(parsed_pages), "engine": "pymupdf_positional"}
+        if self._options.strip_furniture:
+            meta["furniture"] = self._furniture
+        return ParsedDocument(source_path=pdf_path, pages=parsed_pages, meta=meta)
+
+    def iter_pages(self, pdf_path: str, digest: Optional[str] = None) -> Iterator[ParsedPage]:
         try:
-            pages = self._extract_pdf_pages_position_based(pdf_path)
+            self._furniture = []
+            if self._cache is None:
+                yield from self._iter_parsed_pages(pdf_path)
+                return
+
+            key = self._cache.key_for(pdf_path, digest)
+            cached = self._cache.load(key)
+            done = 0
+            if cached is not None:
+                try:
+                    for page in cached.pages():
+                        yield page
+                        done += 1
+                    self._furniture = cached.furniture
+                    return
+                except ParseCacheError:
+                    pass  # entry was damaged and is dropped: parse again, skipping the pages already yielded
+
+            # each page goes to the cache entry as it is yielded; a consumer that stops early
+            # (or an error) leaves no entry behind
+            entry = self._cache.open_entry(key)
+            try:
+                for i, page in enumerate(self._iter_parsed_pages(pdf_path)):
+                    entry.append(page)
+                    if i >= done:
+                        yield page
+            except BaseException:
+                entry.abort()
+                raise
+            entry.commit(self._furniture)
         except Exception as e:
             raise ParserError(str(e)) from e
 
-        parsed_pages = [ParsedPage(page_number=p.page_number, lines=p.lines) for p in pages]
-        meta = {"page_count": len(parsed_pages), "engine": "pymupdf_positional"}
-        return ParsedDocument(source_path=pdf_path, pages=parsed_pages, meta=meta)
+    def _iter_parsed_pages(self, pdf_path: str) -> Iterator[ParsedPage]:
+        furniture = FurnitureFilter(LINE_Y_TOLERANCE) if self._options.strip_furniture else None
+        for p in self._extract_pdf_pages_position_based(pdf_path):
+            lines = p.lines
+            if furniture is not None and p.furniture_keys is not None:
+                lines = furniture.apply(p.page_number, p.lines, p.furniture_keys)
+            yield ParsedPage(page_number=p.page_number, lines=lines)
+        if furniture is not None:
+            self._furniture = furniture.furniture()
+
+    def _cache_fingerprint(self) -> str:
+        # Only settings that change the output belong here (not workers/cache settings).
+        config = {
+            "parser_version": PARSER_VERSION,
+            "line_y_tolerance": LINE_Y_TOLERANCE,
+            "min_x_gap_for_space": MIN_X_GAP_FOR_SPACE,
+            "multi_space_gap_step": MULTI_SPACE_GAP_STEP,
+            "min_printable_chars": MIN_PRINTABLE_CHARS,
+            "pymupdf": fitz.VersionBind,
+            # lean and dict produce identical lines; text does not
+            "text_lines": self._options.extraction == EXTRACTION_TEXT,
+            # expanded ligatures change span text
+            "low_memory": self._options.low_memory,
+            "strip_furniture": self._options.strip_furniture,
+            "regions": None if self._options.regions is None
+            else sorted([r.page_number, *r.clip] for r in self._options.regions),
+        }
+        return hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+    def _index_regions(self, regions: Tuple[ParseRegion, ...]) -> Dict[int, List[fitz.Rect]]:
+        clips: Dict[int, List[fitz.Rect]] = {}
+        for r in regions:
+            if r.page_number < 1:
+                raise ParserError(f"invalid region page_number: {r.page_number}")
+            if len(r.clip) != 4:
+                raise ParserError(f"invalid region clip: {r.clip}")
+            rect = fitz.Rect(r.clip)
+            if rect.is_empty:
+                raise ParserError(f"empty region clip: {r.clip}")
+            clips.setdefault(r.page_number, []).append(rect)
+        return clips
 
     @dataclass(frozen=True)
     class _PdfPageText:
         page_number: int
         lines: List[str]
+        furniture_keys: Optional[List[Optional[FurnitureKey]]] = None  # parallel to lines; set when strip_furniture
 
-    def _extract_pdf_pages_position_based(self, pdf_path: str) -> List[_PdfPageText]:
-        pages: List[Parser._PdfPageText] = []
+    def _extract_pdf_pages_position_based(self, pdf_path: str) -> Iterator[_PdfPageText]:
         with fitz.open(pdf_path) as doc:
-            for page_index in range(doc.page_count):
-                page = doc.load_page(page_index)
-                lines = self._extract_page_lines_position_based(page)
-                pages.append(Parser._PdfPageText(page_number=page_index + 1, lines=lines))
-        return pages
-
-    def _extract_page_lines_position_based(self, page: fitz.Page) -> List[str]:
-        fragments = self._extract_fragments(page)
+            page_count = doc.page_count
+            workers = self._worker_count()
+            if workers <= 1 or page_count < self._options.parallel_min_pages:
+                yield from self._iter_page_range(doc, 0, page_count)
+                return
+        yield from self._iter_pdf_pages_parallel(pdf_path, page_count, workers)
+
+    def _iter_page_range(self, doc: fitz.Document, start: int, stop: int) -> Iterator[_PdfPageText]:
+        for page_index in range(start, stop):
+            clips: Optional[List[fitz.Rect]] = None
+            if self._clips_by_page is not None:
+                clips = self._clips_by_page.get(page_index + 1)
+                if not clips:
+                    # region mode: pages without a region are never loaded
+                    yield Parser._PdfPageText(page_number=page_index + 1, lines=[])
+                    continue
+            page = doc.load_page(page_index)
+            keys: Optional[List[Optional[FurnitureKey]]] = None
+            if self._options.strip_furniture and self._options.extraction != EXTRACTION_TEXT:
+                lines, keys = self._extract_page_lines_with_furniture(page, clips)
+            else:
+                lines = self._extract_page_lines_position_based(page, clips)
+            # drop the page before yielding: a suspended generator would otherwise keep it alive
+            del page
+            self._trim_store()
+            yield Parser._PdfPageText(page_number=page_index + 1, lines=lines, furniture_keys=keys)
+
+    def _trim_store(self) -> None:
+        # MuPDF's resource store (fonts, images, ...) is process-wide; shrink it back under the cap.
+        cap = self._options.store_max_bytes
+        if cap is None:
+            return
+        size = fitz.TOOLS.store_size
+        if callable(size):  # property in older PyMuPDF releases, method in newer ones
+            size = size()
+        if size is None:
+            # newer PyMuPDF no longer reports the store size -> empty it (always within the cap)
+            fitz.TOOLS.store_shrink(100)
+        elif size > cap:
+            fitz.TOOLS.store_shrink(100 if cap == 0 else min(100, -(-(size - cap) * 100 // size)))
+
+    def _iter_pdf_pages_parallel(self, pdf_path: str, page_count: int, workers: int) -> Iterator[_PdfPageText]:
+        workers = min(workers, page_count)
+        chunk = max(1, -(-page_count // (workers * PARALLEL_CHUNKS_PER_WORKER)))
+        ranges = iter([(start, min(start + chunk, page_count)) for start in range(0, page_count, chunk)])
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Bounded look-ahead: at most PARALLEL_WINDOW_PER_WORKER chunks per worker are in flight
+            # or buffered, and chunks are consumed in submission order -> pages stay in document order.
+            pending: Deque[Future] = deque()
+            for start, stop in islice(ranges, workers * PARALLEL_WINDOW_PER_WORKER):
+                pending.append(pool.submit(_extract_page_range_worker, pdf_path, start, stop, self._options))
+            while pending:
+                chunk_pages = pending.popleft().result()
+                nxt = next(ranges, None)
+                if nxt is not None:
+                    pending.append(pool.submit(_extract_page_range_worker, pdf_path, nxt[0], nxt[1], self._options))
+                yield from chunk_pages
+
+    def _worker_count(self) -> int:
+        if self._options.workers == 0:
+            return os.cpu_count() or 1
+        return self._options.workers
+
+    def _extract_page_lines_position_based(self, page: fitz.Page, clips: Optional[List[fitz.Rect]] = None) -> List[str]:
+        if self._options.extraction == EXTRACTION_TEXT:
+            return self._extract_page_lines_text(page, clips)
+        return self._build_lines(self._collect_fragments(page, clips))
+
+    def _extract_page_lines_with_furniture(
+        self, page: fitz.Page, clips: Optional[List[fitz.Rect]]
+    ) -> Tuple[List[str], List[Optional[FurnitureKey]]]:
+        """Lines in page order plus a furniture key per line (None for body lines).
+
+        Fragments in the top/bottom bands are laid out separately from the body, so a
+        header/footer line never merges with body text; its key is the text hash plus position.
+        """
+        top_limit = page.rect.height * FURNITURE_TOP_RATIO
+        bottom_limit = page.rect.height * FURNITURE_BOTTOM_RATIO
+        top: List[_Fragment] = []
+        body: List[_Fragment] = []
+        bottom: List[_Fragment] = []
+        for frag in self._collect_fragments(page, clips):
+            if frag.y_center < top_limit:
+                top.append(frag)
+            elif frag.y_center > bottom_limit:
+                bottom.append(frag)
+            else:
+                body.append(frag)
+
+        lines: List[str] = []
+        keys: List[Optional[FurnitureKey]] = []
+        for band, frags in ((BAND_TOP, top), (None, body), (BAND_BOTTOM, bottom)):
+            if band is None:
+                body_lines = self._build_lines(frags)
+                lines.extend(body_lines)
+                keys.extend([None] * len(body_lines))
+                continue
+            for cluster in self._cluster_fragments_into_lines(frags):
+                line_text = self._join_line_fragments(cluster)
+                if len(line_text.strip()) >= MIN_PRINTABLE_CHARS:
+                    digest = hashlib.sha1(line_text.encode("utf-8")).hexdigest()[:16]
+                    lines.append(line_text)
+                    keys.append((f"{band}:{digest}", (cluster[0].x0, cluster[0].y0)))
+        return lines, keys
+
+    def _collect_fragments(self, page: fitz.Page, clips: Optional[List[fitz.Rect]]) -> List[_Fragment]:
+        if clips is None:
+            return self._extract_fragments(page)
+        fragments: List[_Fragment] = []
+        seen = set()
+        for clip in clips:
+            for frag in self._extract_fragments(page, clip):
+                # overlapping regions must not duplicate spans
+                ident = (frag.text, frag.x0, frag.y0, frag.x1, frag.y1)
+                if ident not in seen:
+                    seen.add(ident)
+                    fragments.append(frag)
+        return fragments
+
+    def _build_lines(self, fragments: List[_Fragment]) -> List[str]:
+        if self._numpy_layout is not None:
+            return self._numpy_layout.build_lines(fragments)
         clusters = self._cluster_fragments_into_lines(fragments)
         lines: List[str] = []
         for cluster in clusters:
@@ -68,8 +328,23 @@ class Parser:
                 lines.append(line_text)
         return lines
 
-    def _extract_fragments(self, page: fitz.Page) -> List[_Fragment]:
-        data = page.get_text("dict")
+    def _extract_page_lines_text(self, page: fitz.Page, clips: Optional[List[fitz.Rect]]) -> List[str]:
+        # PyMuPDF reading order, no positional clustering: cheap, but lines differ from lean/dict.
+        lines: List[str] = []
+        for clip in clips or [None]:
+            for line in page.get_text("text", clip=clip, flags=self._text_flags).splitlines():
+                line = line.strip()
+                if len(line) >= MIN_PRINTABLE_CHARS:
+                    lines.append(line)
+        return lines
+
+    def _extract_fragments(self, page: fitz.Page, clip: Optional[fitz.Rect] = None) -> List[_Fragment]:
+        if self._options.extraction == EXTRACTION_LEAN:
+            return self._extract_fragments_lean(page, clip)
+        return self._extract_fragments_dict(page, clip)
+
+    def _extract_fragments_dict(self, page: fitz.Page, clip: Optional[fitz.Rect] = None) -> List[_Fragment]:
+        data = page.get_text("dict", clip=clip)
         fragments: List[_Fragment] = []
         for block in data.get("blocks", []):
             if block.get("type") != 0:
@@ -83,7 +358,31 @@ class Parser:
                     fragments.append(_Fragment(text=txt, x0=x0, y0=y0, x1=x1, y1=y1))
         return fragments
 
+    def _extract_fragments_lean(self, page: fitz.Page, clip: Optional[fitz.Rect] = None) -> List[_LeanFragment]:
+        # Span dicts, not word tuples: words drop the whitespace inside and at the edges of a span,
+        # and that whitespace decides the spacing of _join_line_fragments. rawdict would build a dict per char.
+        textpage = page.get_textpage(clip=clip, flags=self._text_flags)
+        blocks = textpage.extractDICT()["blocks"]
+        del textpage
+        fragments: List[_LeanFragment] = []
+        append = fragments.append
+        for block in blocks:
+            if block["type"] != 0:
+                continue
+            for line in block["lines"]:
+                for span in line["spans"]:
+                    txt = span["text"]
+                    if txt:
+                        x0, y0, x1, y1 = span["bbox"]
+                        append(_LeanFragment(txt, x0, y0, x1, y1))
+        return fragments
+
     def _cluster_fragments_into_lines(self, fragments: List[_Fragment]) -> List[List[_Fragment]]:
+        if self._options.clustering == CLUSTERING_SCAN:
+            return self._cluster_fragments_scan(fragments)
+        return self._cluster_fragments_sweep(fragments)
+
+    def _cluster_fragments_scan(self, fragments: List[_Fragment]) -> List[List[_Fragment]]:
         if not fragments:
             return []
         frags_sorted = sorted(fragments, key=lambda f: (f.y_center, f.x0))
@@ -102,6 +401,36 @@ class Parser:
         clusters.sort(key=lambda c: c[0])
         return [sorted(frags, key=lambda f: f.x0) for _, frags in clusters]
 
+    def _cluster_fragments_sweep(self, fragments: List[_Fragment]) -> List[List[_Fragment]]:
+        """Same grouping as the scan strategy in O(n log n).
+
+        Fragments arrive sorted by y_center, and a cluster's y_ref is the mean of
+        already-seen (smaller) centers. A cluster that misses one fragment can
+        therefore never match a later one, so it is dropped from the active queue.
+        The queue head is always the first live cluster in creation order, which
+        is exactly the cluster the scan strategy would pick.
+        """
+        if not fragments:
+            return []
+        frags_sorted = sorted(fragments, key=lambda f: (f.y_center, f.x0))
+        clusters: List[List] = []  # [y_ref, frags] in creation order
+        active: Deque[List] = deque()
+        for frag in frags_sorted:
+            y = frag.y_center
+            while active and abs(y - active[0][0]) > LINE_Y_TOLERANCE:
+                active.popleft()
+            if active:
+                cluster = active[0]
+                frags = cluster[1]
+                frags.append(frag)
+                cluster[0] = (cluster[0] * (len(frags) - 1) + y) / len(frags)
+            else:
+                cluster = [y, [frag]]
+                clusters.append(cluster)
+                active.append(cluster)
+        clusters.sort(key=lambda c: c[0])
+        return [sorted(frags, key=lambda f: f.x0) for _, frags in clusters]
+
     def _join_line_fragments(self, line_frags: List[_Fragment]) -> str:
         if not line_frags:
             return ""
@@ -119,3 +448,10 @@ class Parser:
             parts.append(frag.text)
             prev_x1 = frag.x1
         return "".join(parts).strip()
+
+
+def _extract_page_range_worker(pdf_path: str, start: int, stop: int, options: ParserOptions) -> List[Parser._PdfPageText]:
+    # Process-pool entry point: every worker opens its own document handle.
+    parser = Parser(options)
+    with fitz.open(pdf_path) as doc:
+        return list(parser._iter_page_range(doc, start, stop))
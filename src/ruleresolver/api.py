@@ -1,11 +1,29 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Dict
+from typing import Any, Dict, List
 
+from .compiler import RuleCompileError, compile_ruleset, context_flags, leading_literal, line_sensitive
 from .ruleresolver import RuleResolver
-from .model import RuleSet
+from .model import CompiledField, CompiledRuleSet, RuleSet
 
 def resolve_ruleset(assay_key: str, rules_dir: str, rules_index_path: str) -> RuleSet:
     """Public API (RuleResolver)"""
     return RuleResolver().resolve_ruleset(assay_key, rules_dir, rules_index_path)
+
+
+def resolve_compiled_ruleset(assay_key: str, rules_dir: str, rules_index_path: str) -> CompiledRuleSet:
+    """Public API (RuleResolver) – RuleSet with precompiled patterns.
+
+    Patterns are compiled and validated once per RuleSet file version and shared by all records;
+    an invalid regex raises RuleResolverError at load instead of during extraction.
+    """
+    return RuleResolver().resolve_compiled_ruleset(assay_key, rules_dir, rules_index_path)
+
+
+def list_assay_keys(rules_index_path: str) -> List[str]:
+    """Public API (RuleResolver) – assay_key values of index.json in index order.
+
+    Served from the shared in-process rules registry (re-read only when index.json changes).
+    """
+    return RuleResolver().list_assay_keys(rules_index_path)
@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import replace
+from typing import Any, Callable, Dict, List, Optional, Pattern, Set, Tuple
+
+try:
+    from re import _parser as _sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse as _sre_parse  # type: ignore[no-redef]
+
+from .model import CompiledField, CompiledRuleSet, RuleSet
+
+
+_log = logging.getLogger(__name__)
+
+# Shorter literals are too frequent for a str.find loop to beat the regex engine
+PREFILTER_MIN_LENGTH: int = 2
+# Zero-width assertions a prefilter may skip; ^ only under MULTILINE (line starts), since
+# ^ and \A at the start of the string leave nothing to skip
+_SKIPPABLE_AT = (_sre_parse.AT_BOUNDARY, _sre_parse.AT_NON_BOUNDARY)
+# possessive repeats and atomic groups exist since Python 3.11
+_REPEATS = (_sre_parse.MAX_REPEAT, _sre_parse.MIN_REPEAT, getattr(_sre_parse, "POSSESSIVE_REPEAT", None))
+_ATOMIC_GROUP = getattr(_sre_parse, "ATOMIC_GROUP", None)
+
+
+# risk of a pattern the private sre parser rejects (it changed): run it under the budget
+UNPARSED_RISK: str = "unanalyzed pattern"
+
+
+class RuleCompileError(RuntimeError):
+    pass
+
+
+def compile_ruleset(ruleset: RuleSet) -> CompiledRuleSet:
+    """Compile every regex of a RuleSet; structural and pattern errors raise RuleCompileError."""
+    rs = ruleset.data
+    regex = (rs.get("lot_rule") or {}).get("regex")
+    if not regex:
+        raise RuleCompileError("lot_rule.regex missing")
+    lot_pattern = _compile(regex, "lot_rule.regex")
+    lot_prefilter = prefilter_literal(lot_pattern)
+    lot_risk = backtracking_risk(lot_pattern)
+
+    fields = (rs.get("extract_rules") or {}).get("fields", [])
+    if not isinstance(fields, list) or not fields:
+        raise RuleCompileError("extract_rules.fields missing/empty")
+
+    compiled: List[CompiledField] = []
+    for f in fields:
+        key = f.get("key")
+        regex = f.get("regex")
+        if not key or not regex:
+            raise RuleCompileError("field requires key+regex")
+        pattern = _compile(regex, f"field {key}")
+        compiled.append(CompiledField(
+            key=key,
+            pattern=pattern,
+            required=bool(f.get("required", False)),
+            prefilter=prefilter_literal(pattern),
+            **_search_from(f.get("search_from"), key),
+        ))
+        field = compiled[-1]
+        after_risk = backtracking_risk(field.after) if field.after is not None else ""
+        compiled[-1] = replace(field, risk=backtracking_risk(pattern), after_risk=after_risk)
+    return CompiledRuleSet(ruleset=ruleset, lot_pattern=lot_pattern, fields=tuple(compiled),
+                           lot_prefilter=lot_prefilter, lot_risk=lot_risk)
+
+
+def prefilter_literal(pattern: Pattern[str]) -> str:
+    """Literal every match of pattern starts with, when the regex engine cannot use it itself.
+
+    sre already jumps to a leading literal (e.g. "Datum:\\s*..."), but not past a leading
+    zero-width assertion such as \\b ("\\bPCQ1\\s+..."); only then is the literal returned,
+    so the extractor can find() candidates and match() there. Otherwise "".
+    """
+    literal, skipped = _leading_literal(pattern)
+    return literal if skipped else ""
+
+
+def leading_literal(pattern: Pattern[str]) -> str:
+    """Literal every match of pattern starts with, after leading \\b/\\B (and ^ under MULTILINE).
+
+    Unlike prefilter_literal() also for patterns sre can scan for themselves; the extractor
+    uses it to find() the candidates of several patterns sharing it in one pass. "" if none.
+    """
+    return _leading_literal(pattern)[0]
+
+
+def _leading_literal(pattern: Pattern[str]) -> Tuple[str, bool]:
+    # (leading literal or "", whether zero-width assertions were skipped before it)
+    parsed = _parse(pattern)
+    if parsed is None:
+        return "", False
+    flags = parsed.state.flags
+    if flags & re.IGNORECASE:
+        return "", False
+    skippable = _SKIPPABLE_AT + ((_sre_parse.AT_BEGINNING,) if flags & re.MULTILINE else ())
+    items = list(parsed)
+    skipped = 0
+    while skipped < len(items) and items[skipped][0] is _sre_parse.AT and items[skipped][1] in skippable:
+        skipped += 1
+    literal, _ = _literal_run(items[skipped:])
+    return (literal if len(literal) >= PREFILTER_MIN_LENGTH else ""), bool(skipped)
+
+
+def context_flags(pattern: Pattern[str]) -> Tuple[bool, bool]:
+    """(anchored, boundary): how a match at pos > 0 may depend on the text before pos.
+
+    anchored: ^, \\A or a lookbehind anywhere in the pattern; boundary: \\b or \\B.
+    Read from the parsed pattern, so "[^\\s]" or an escaped "\\\\b" do not count.
+    A pattern that cannot be parsed counts as both.
+    """
+    found = _assertions(pattern)
+    if found is None:
+        return True, True
+    anchored = bool(found & {_sre_parse.AT_BEGINNING, _sre_parse.AT_BEGINNING_STRING, "lookbehind"})
+    boundary = bool(found & {_sre_parse.AT_BOUNDARY, _sre_parse.AT_NON_BOUNDARY})
+    return anchored, boundary
+
+
+def line_sensitive(pattern: Pattern[str]) -> bool:
+    """Whether pattern contains any anchor, end or word-boundary assertion or lookaround."""
+    found = _assertions(pattern)
+    return found is None or bool(found)
+
+
+def _assertions(pattern: Pattern[str]) -> Optional[Set[Any]]:
+    # AT codes and "lookahead"/"lookbehind" used anywhere in pattern; None if unparsable
+    parsed = _parse(pattern)
+    if parsed is None:
+        return None
+    found: Set[Any] = set()
+    _collect_assertions(list(parsed), found)
+    return found
+
+
+def _collect_assertions(items: List[Any], found: Set[Any]) -> None:
+    for op, av in items:
+        if op is _sre_parse.AT:
+            found.add(av)
+        elif op in (_sre_parse.ASSERT, _sre_parse.ASSERT_NOT):
+            found.add("lookbehind" if av[0] < 0 else "lookahead")
+            _collect_assertions(list(av[1]), found)
+        elif op in _REPEATS:
+            _collect_assertions(list(av[2]), found)
+        elif op is _sre_parse.SUBPATTERN:
+            _collect_assertions(list(av[3]), found)
+        elif op is _ATOMIC_GROUP:
+            _collect_assertions(list(av), found)
+        elif op is _sre_parse.BRANCH:
+            for branch in av[1]:
+                _collect_assertions(list(branch), found)
+        elif op is _sre_parse.GROUPREF_EXISTS:
+            for branch in av[1:]:
+                if branch is not None:
+                    _collect_assertions(list(branch), found)
+
+
+def backtracking_risk(pattern: Pattern[str]) -> str:
+    """Static ReDoS check: reason why pattern may backtrack catastrophically, else "".
+
+    Flags variable-length quantifiers nested in any repeat of more than one pass
+    ("(\\w+\\s?)+", "(.*a){20}"), unbounded quantifiers that follow each other over
+    overlapping characters ("\\s*\\s*x") and alternations whose branches can start alike
+    inside an unbounded repeat ("(a|ab)*"). Conservative: a flagged pattern is not
+    necessarily slow, it is only run under a time budget. A pattern the check cannot
+    parse is flagged as UNPARSED_RISK.
+    """
+    parsed = _parse(pattern)
+    if parsed is None:
+        return UNPARSED_RISK
+    return _risk(list(parsed), False)
+
+
+def _parse(pattern: Pattern[str]) -> Any:
+    # sre's parse tree, or None when the private parser API rejects a pattern re itself compiled;
+    # prefilters are then skipped and the ReDoS check flags the pattern
+    try:
+        return _sre_parse.parse(pattern.pattern, pattern.flags)
+    except Exception as e:
+        _log.warning("regex analysis skipped for %r: %s: %s", pattern.pattern, type(e).__name__, e)
+        return None
+
+
+def _risk(items: List[Any], in_repeat: bool) -> str:
+    # in_repeat: inside a repeat that may run more than once (hi > 1)
+    pending: List[Any] = []  # unbounded repeats since the last item that must consume a char
+    for op, av in items:
+        if op in (_sre_parse.MAX_REPEAT, _sre_parse.MIN_REPEAT):
+            lo, hi, sub = av
+            if in_repeat and lo != hi:
+                return "nested quantifier"
+            unbounded = hi == _sre_parse.MAXREPEAT
+            if unbounded and _ambiguous_branch(list(sub)):
+                return "overlapping alternation in repeat"
+            if hi > 1 and _has_variable_repeat(list(sub)):
+                return "nested quantifier"
+            if unbounded:
+                if any(_overlap(p, sub) for p in pending):
+                    return "adjacent quantifiers"
+                # one or more chars the earlier repeats cannot take separate them from later ones
+                pending = [*pending, sub] if not lo else [sub]
+            elif lo:
+                pending = []
+            reason = _risk(list(sub), in_repeat or hi > 1)
+        elif op is _sre_parse.SUBPATTERN:
+            reason = _risk(list(av[3]), in_repeat)
+            pending = []
+        elif op is _sre_parse.BRANCH:
+            reason = next((r for r in (_risk(list(b), in_repeat) for b in av[1]) if r), "")
+            pending = []
+        elif op in (_sre_parse.ASSERT, _sre_parse.ASSERT_NOT):
+            reason = _risk(list(av[1]), in_repeat)
+        else:
+            # atomic groups and possessive repeats never backtrack into themselves
+            reason = ""
+            if op is not _sre_parse.AT:
+                pending = []
+        if reason:
+            return reason
+    return ""
+
+
+def _has_variable_repeat(items: List[Any]) -> bool:
+    for op, av in items:
+        if op in (_sre_parse.MAX_REPEAT, _sre_parse.MIN_REPEAT):
+            if av[0] != av[1] or _has_variable_repeat(list(av[2])):
+                return True
+        elif op is _sre_parse.SUBPATTERN:
+            if _has_variable_repeat(list(av[3])):
+                return True
+        elif op is _sre_parse.BRANCH:
+            if any(_has_variable_repeat(list(b)) for b in av[1]):
+                return True
+    return False
+
+
+# Characters probed to decide whether two single-character repeats can match the same input
+_PROBE_CHARS = [chr(c) for c in range(128)] + ["\xa0", "\xe4", "\xdf", "\u2028", "\u3000"]
+_CATEGORY_CHECKS = {
+    _sre_parse.CATEGORY_DIGIT: str.isdigit,
+    _sre_parse.CATEGORY_SPACE: str.isspace,
+    _sre_parse.CATEGORY_WORD: lambda c: c.isalnum() or c == "_",
+}
+_NEGATED_CATEGORIES = {
+    _sre_parse.CATEGORY_NOT_DIGIT: _sre_parse.CATEGORY_DIGIT,
+    _sre_parse.CATEGORY_NOT_SPACE: _sre_parse.CATEGORY_SPACE,
+    _sre_parse.CATEGORY_NOT_WORD: _sre_parse.CATEGORY_WORD,
+}
+
+
+def _overlap(a: Any, b: Any) -> bool:
+    # whether two repeated subpatterns may both match one character; True unless both are
+    # single-character sets known to be disjoint
+    test_a, test_b = _char_test(list(a)), _char_test(list(b))
+    if test_a is None or test_b is None:
+        return True
+    literals = [chr(av) for op, av in (*a, *b) if op is _sre_parse.LITERAL]
+    return any(test_a(c) and test_b(c) for c in _PROBE_CHARS + literals)
+
+
+def _char_test(items: List[Any]) -> Optional[Callable[[str], bool]]:
+    if len(items) != 1:
+        return None
+    op, av = items[0]
+    if op is _sre_parse.LITERAL:
+        return lambda c: c == chr(av)
+    if op is _sre_parse.NOT_LITERAL:
+        return lambda c: c != chr(av)
+    if op is _sre_parse.ANY:
+        return lambda c: True
+    if op is not _sre_parse.IN:
+        return None
+    tests: List[Callable[[str], bool]] = []
+    negate = False
+    for sop, sav in av:
+        if sop is _sre_parse.NEGATE:
+            negate = True
+        elif sop is _sre_parse.LITERAL:
+            tests.append(lambda c, v=sav: c == chr(v))
+        elif sop is _sre_parse.RANGE:
+            tests.append(lambda c, v=sav: v[0] <= ord(c) <= v[1])
+        elif sop is _sre_parse.CATEGORY and sav in _CATEGORY_CHECKS:
+            tests.append(_CATEGORY_CHECKS[sav])
+        elif sop is _sre_parse.CATEGORY and sav in _NEGATED_CATEGORIES:
+            tests.append(lambda c, f=_CATEGORY_CHECKS[_NEGATED_CATEGORIES[sav]]: not f(c))
+        else:
+            return None
+    return lambda c: any(t(c) for t in tests) != negate
+
+
+def _ambiguous_branch(items: List[Any]) -> bool:
+    # a branch (directly or in a group) with an empty, non-literal or repeated first item
+    for op, av in items:
+        if op is _sre_parse.SUBPATTERN:
+            if _ambiguous_branch(list(av[3])):
+                return True
+        elif op is _sre_parse.BRANCH:
+            firsts = [b[0] if len(b) else None for b in av[1]]
+            if any(f is None or f[0] is not _sre_parse.LITERAL for f in firsts):
+                return True
+            if len({f[1] for f in firsts}) != len(firsts):
+                return True
+    return False
+
+
+def _literal_run(items: List[Any]) -> Tuple[str, bool]:
+    # (leading literal text, whether all items were literal)
+    out: List[str] = []
+    for op, av in items:
+        if op is _sre_parse.LITERAL:
+            out.append(chr(av))
+            continue
+        if op is _sre_parse.SUBPATTERN and not av[1] and not av[2]:  # group without inline flags
+            text, complete = _literal_run(list(av[3]))
+            out.append(text)
+            if complete:
+                continue
+        return "".join(out), False
+    return "".join(out), True
+
+
+def _search_from(search_from: Any, key: str) -> Dict[str, Any]:
+    if not isinstance(search_from, dict):
+        return {}
+    if "after" in search_from:
+        return {"after": _compile(search_from["after"], f"field {key} search_from.after")}
+    if "line" in search_from:
+        try:
+            return {"line": int(search_from["line"])}
+        except (TypeError, ValueError) as e:
+            raise RuleCompileError(f"field {key} search_from.line must be an int") from e
+    return {}
+
+
+def _compile(regex: str, where: str) -> Pattern[str]:
+    try:
+        return re.compile(regex)
+    except (re.error, TypeError) as e:
+        raise RuleCompileError(f"invalid regex in {where}: {e}") from e
@@ -1,8 +1,41 @@
 from dataclasses import dataclass
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Pattern, Tuple
 
 @dataclass(frozen=True)
 class RuleSet:
     assay_key: str
     ruleset_file: str
     data: Dict[str, Any]
+
+
+@dataclass(frozen=True)
+class CompiledField:
+    key: str
+    pattern: Pattern[str]
+    required: bool
+    # search_from: "after" marker (takes precedence) or start line index
+    after: Optional[Pattern[str]] = None
+    line: Optional[int] = None
+    # literal each match starts with, for str.find() candidate search ("" = none)
+    prefilter: str = ""
+    # backtracking_risk() of pattern / after marker ("" = none); risky ones run under a time budget
+    risk: str = ""
+    after_risk: str = ""
+
+
+@dataclass(frozen=True)
+class CompiledRuleSet:
+    """RuleSet with lot_rule, field and search_from patterns compiled once."""
+    ruleset: RuleSet
+    lot_pattern: Pattern[str]
+    fields: Tuple[CompiledField, ...]
+    lot_prefilter: str = ""
+    lot_risk: str = ""
+
+    @property
+    def assay_key(self) -> str:
+        return self.ruleset.assay_key
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        return self.ruleset.data
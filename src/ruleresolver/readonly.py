@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from typing import Any, NoReturn
+
+
+def _read_only(*args: Any, **kwargs: Any) -> NoReturn:
+    raise TypeError("RuleSet data is read-only (shared by all jobs); copy it before changing it")
+
+
+class ReadOnlyDict(dict):
+    """dict that rejects every mutation; still a dict for isinstance checks and json.dumps."""
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        # copy/pickle rebuild through the constructor, not through __setitem__
+        return type(self), (dict(self),)
+
+
+class ReadOnlyList(list):
+    """list that rejects every mutation; still a list for isinstance checks and json.dumps."""
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __reduce__(self):
+        return type(self), (list(self),)
+
+
+def freeze(value: Any) -> Any:
+    """Recursively wrap parsed JSON (dicts/lists) into read-only containers."""
+    if isinstance(value, dict):
+        return ReadOnlyDict((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return ReadOnlyList(freeze(v) for v in value)
+    return value
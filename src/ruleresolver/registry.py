@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .compiler import RuleCompileError, compile_ruleset
+from .model import CompiledRuleSet, RuleSet
+from .readonly import freeze
+
+
+class RuleResolverError(RuntimeError):
+    pass
+
+
+# (st_mtime_ns, st_size): cheap change detection without reading the file
+_Stamp = Tuple[int, int]
+
+
+def _stamp(path: Path) -> Optional[_Stamp]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class RuleRegistry:
+    """In-process cache of index.json and the RuleSets it references.
+
+    The index is loaded on first use; each RuleSet on first request. Every access
+    re-stats the backing file and reloads it only when mtime/size changed, so edits
+    to rules/ are picked up without restarting while unchanged files are never re-read.
+    The shared RuleSet data is frozen (read-only dicts/lists), so no job can change it
+    for every later one.
+    """
+
+    def __init__(self, rules_dir: str, rules_index_path: str) -> None:
+        self._rules_dir = Path(rules_dir)
+        self._index_path = Path(rules_index_path)
+        self._lock = threading.Lock()
+        self._index_stamp: Optional[_Stamp] = None
+        self._mapping: Dict[str, str] = {}
+        self._keys: List[str] = []
+        # compiled patterns are built lazily, on the first compiled_ruleset() call
+        self._rulesets: Dict[str, Tuple[_Stamp, RuleSet, Optional[CompiledRuleSet]]] = {}
+
+    def assay_keys(self) -> List[str]:
+        """assay_key values in index order (duplicates kept, as listed)."""
+        with self._lock:
+            self._refresh_index()
+            return list(self._keys)
+
+    def ruleset(self, assay_key: str) -> RuleSet:
+        with self._lock:
+            return self._entry(assay_key)[1]
+
+    def compiled_ruleset(self, assay_key: str) -> CompiledRuleSet:
+        """RuleSet plus its compiled patterns; compiled (and validated) once per file version."""
+        with self._lock:
+            stamp, rs, compiled = self._entry(assay_key)
+            if compiled is None:
+                try:
+                    compiled = compile_ruleset(rs)
+                except RuleCompileError as e:
+                    raise RuleResolverError(f"Invalid RuleSet {rs.ruleset_file}: {e}") from e
+                self._rulesets[assay_key] = (stamp, rs, compiled)
+            return compiled
+
+    def _entry(self, assay_key: str) -> Tuple[_Stamp, RuleSet, Optional[CompiledRuleSet]]:
+        self._refresh_index()
+        if assay_key not in self._mapping:
+            raise RuleResolverError(f"Unknown assay_key: {assay_key}")
+
+        ruleset_file = self._mapping[assay_key]
+        path = self._rules_dir / ruleset_file
+        stamp = _stamp(path)
+        if stamp is None:
+            self._rulesets.pop(assay_key, None)
+            raise RuleResolverError(f"RuleSet file not found: {path}")
+
+        cached = self._rulesets.get(assay_key)
+        if cached is not None and cached[0] == stamp and cached[1].ruleset_file == ruleset_file:
+            return cached
+
+        rs = RuleSet(assay_key=assay_key, ruleset_file=ruleset_file, data=self._load_ruleset(path, assay_key))
+        entry = (stamp, rs, None)
+        self._rulesets[assay_key] = entry
+        return entry
+
+    def _refresh_index(self) -> None:
+        stamp = _stamp(self._index_path)
+        if stamp is not None and stamp == self._index_stamp:
+            return
+        try:
+            idx = json.loads(self._index_path.read_text(encoding="utf-8"))
+        except Exception as e:
+            self._index_stamp = None
+            raise RuleResolverError(f"Cannot read index.json: {e}") from e
+
+        keys: List[str] = []
+        mapping: Dict[str, str] = {}
+        for a in idx.get("assays", []):
+            k = a.get("assay_key")
+            f = a.get("ruleset_file")
+            if k:
+                keys.append(k)
+            if k and f:
+                mapping[k] = f
+        self._keys = keys
+        self._mapping = mapping
+        self._index_stamp = stamp
+
+    def _load_ruleset(self, path: Path, assay_key: str) -> Dict[str, Any]:
+        try:
+            data: Dict[str, Any] = json.loads(path.read_text(encoding="utf-8"))
+        except Exception as e:
+            raise RuleResolverError(f"Cannot parse RuleSet JSON: {e}") from e
+
+        if data.get("assay_key") != assay_key:
+            raise RuleResolverError("RuleSet assay_key mismatch")
+
+        for req in ("lot_rule", "extract_rules", "excel_rules"):
+            if req not in data:
+                raise RuleResolverError(f"RuleSet missing required section: {req}")
+
+        regions = data.get("parse_regions")
+        if regions is not None:
+            if not isinstance(regions, list) or not regions:
+                raise RuleResolverError("RuleSet parse_regions must be a non-empty list")
+            for r in regions:
+                clip = r.get("clip") if isinstance(r, dict) else None
+                if not isinstance(clip, list) or len(clip) != 4:
+                    raise RuleResolverError("RuleSet parse_regions entry requires clip [x0, y0, x1, y1]")
+                if not isinstance(r.get("page_offset", 0), int):
+                    raise RuleResolverError("RuleSet parse_regions page_offset must be an int")
+
+        return freeze(data)
+
+
+_registries: Dict[Tuple[str, str], RuleRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def shared_registry(rules_dir: str, rules_index_path: str) -> RuleRegistry:
+    """One registry per (rules_dir, index.json) for the whole process."""
+    key = (os.path.abspath(rules_dir), os.path.abspath(rules_index_path))
+    with _registries_lock:
+        reg = _registries.get(key)
+        if reg is None:
+            reg = RuleRegistry(*key)
+            _registries[key] = reg
+        return reg
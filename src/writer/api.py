@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
 
 from src.extractor.api import AssayRecord
 from src.ruleresolver.api import RuleSet
+from .materializer import DEFAULT_INTERVAL_S, Materializer
+from .writebehind import DEFAULT_MAX_BATCH, DEFAULT_MAX_DELAY_S, WriteBehindQueue
 from .writer import Writer, WriteResult
 
 
@@ -15,7 +18,86 @@ def write_record(record: AssayRecord, ruleset: RuleSet, output_dir: str) -> Writ
     - One Excel file per assay.
     - One sheet per lot.
     - One row per run.
-    - Dedupe by record.dedupe_key (test|date|time).
-    - Global excel writer lock file in output dir.
+    - Dedupe by record.dedupe_key (test|date|time), looked up in the output dir's sidecar index.
+    - Per-workbook lock file .<workbook>.lock in output dir; waits with backoff (default 60 s),
+      breaks stale locks, then fails with WriterError excel_writer_lock_timeout. A held lock's mtime is
+      touched periodically, so only locks of stopped writers go stale.
     """
     return Writer().write_record(record, ruleset, output_dir)
+
+
+def write_records(items: Sequence[Tuple[AssayRecord, RuleSet]], output_dir: str) -> List[WriteResult]:
+    """Public API (Writer) – batch
+
+    Contract:
+    - Same files, sheets, rows, dedupe and statuses as write_record called per item in order.
+    - Records are grouped by target workbook: each workbook is loaded once and saved once.
+    - Locks of all target workbooks are taken (in sorted order) before the first write and held
+      for the whole batch; batches for other workbooks run concurrently.
+    - Returns one WriteResult per item, in input order.
+    """
+    return Writer().write_records(items, output_dir)
+
+
+def rebuild_dedupe_index(output_dir: str) -> Dict[str, int]:
+    """Public API (Writer) – dedupe index maintenance
+
+    Contract:
+    - Re-reads the dedupe keys of every *.xlsx in output_dir into the sidecar index.
+    - Entries of deleted workbooks are dropped.
+    - Returns workbook file name -> number of indexed keys.
+    - Not needed after normal runs: a workbook changed outside the writer is re-indexed on its next write.
+    """
+    return Writer().rebuild_dedupe_index(output_dir)
+
+
+def open_write_behind_queue(max_batch: int = DEFAULT_MAX_BATCH, max_delay_s: float = DEFAULT_MAX_DELAY_S) -> WriteBehindQueue:
+    """Public API (Writer) – write-behind mode
+
+    Contract:
+    - One dedicated writer thread; submit(record, ruleset, output_dir) only enqueues and returns a
+      Future[WriteResult], so producers never wait for an xlsx save.
+    - Pending records are coalesced and written via write_records per output dir (each workbook
+      saved once per flush) when max_batch records are pending or the oldest waited max_delay_s.
+    - flush() writes and waits for everything submitted so far (flush(block=False) only starts the
+      write); close() flushes and stops the thread.
+    - A failing flush fails the futures of the records it contained; others are unaffected.
+    - If the writer thread dies, all unfinished futures fail with RuntimeError and submit() raises.
+    """
+    return WriteBehindQueue(Writer(), max_batch, max_delay_s)
+
+
+def stage_records(items: Sequence[Tuple[AssayRecord, RuleSet]], output_dir: str) -> List[WriteResult]:
+    """Public API (Writer) – staging mode
+
+    Contract:
+    - Appends records to the append-only store <output_dir>/.staging.sqlite; no xlsx is opened,
+      locked or saved, so ingest latency does not depend on workbook size.
+    - Same targets (workbook, sheet per lot), dedupe and statuses as write_records.
+    - The store keeps sheet and excel_rules per row; the xlsx files are written by materialize().
+    - Do not mix with write_record(s) on the same output dir while rows are pending.
+    """
+    return Writer().stage_records(items, output_dir)
+
+
+def materialize(output_dir: str, rebuild: bool = False) -> Dict[str, int]:
+    """Public API (Writer) – staging mode, on demand
+
+    Contract:
+    - Appends the rows staged since the last run to their workbooks (each saved once, under its lock).
+    - rebuild=True re-checks every staged row against the xlsx and re-appends missing ones.
+    - Result equals write_records over the staged records in staging order.
+    - Returns workbook file name -> rows appended.
+    """
+    return Writer().materialize(output_dir, rebuild)
+
+
+def open_materializer(output_dir: str, interval_s: float = DEFAULT_INTERVAL_S) -> Materializer:
+    """Public API (Writer) – staging mode, scheduled
+
+    Contract:
+    - start()/`with`: materializes every interval_s on a background thread.
+    - stop() ends the schedule and runs a final pass; run_once(rebuild) materializes on demand.
+    - Failing passes (e.g. lock timeout) are kept in last_error and retried next interval.
+    """
+    return Materializer(output_dir, interval_s)
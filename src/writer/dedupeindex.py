@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from openpyxl import load_workbook
+
+
+INDEX_FILENAME: str = ".dedupe_index.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS workbooks (
+    workbook TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dedupe_keys (
+    workbook TEXT NOT NULL,
+    sheet TEXT NOT NULL,
+    dedupe_key TEXT NOT NULL,
+    PRIMARY KEY (workbook, sheet, dedupe_key)
+) WITHOUT ROWID;
+"""
+
+# (st_mtime_ns, st_size) of the workbook the keys were taken from
+_Stamp = Tuple[int, int]
+
+
+def _stamp(path: Path) -> Optional[_Stamp]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class DedupeIndex:
+    """Sidecar index of the dedupe keys in every workbook of one output directory.
+
+    Lookups never open the xlsx. Each workbook's entry carries the mtime/size of the file
+    it describes; when the file changed behind the index's back (edited by hand, crash
+    between save and index update) the entry is rebuilt from the workbook first.
+    """
+
+    def __init__(self, output_dir: str) -> None:
+        self._dir = Path(output_dir)
+        self._conn = sqlite3.connect(str(self._dir / INDEX_FILENAME), timeout=30.0)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> DedupeIndex:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def keys(self, excel_path: Path, sheet: str) -> Set[str]:
+        """Dedupe keys of one sheet (empty if workbook or sheet does not exist yet)."""
+        self._ensure_fresh(excel_path)
+        rows = self._conn.execute(
+            "SELECT dedupe_key FROM dedupe_keys WHERE workbook = ? AND sheet = ?", (excel_path.name, sheet)
+        )
+        return {r[0] for r in rows}
+
+    def record(self, excel_path: Path, added: Iterable[Tuple[str, str]]) -> None:
+        """Register (sheet, dedupe_key) pairs just saved to excel_path and its new stamp."""
+        stamp = _stamp(excel_path)
+        if stamp is None:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO dedupe_keys (workbook, sheet, dedupe_key) VALUES (?, ?, ?)",
+                [(excel_path.name, sheet, key) for sheet, key in added],
+            )
+            self._set_stamp(excel_path.name, stamp)
+
+    def rebuild(self, excel_path: Path) -> int:
+        """Re-read all dedupe keys of one workbook from the xlsx; returns the key count."""
+        stamp = _stamp(excel_path)
+        with self._conn:
+            self._conn.execute("DELETE FROM dedupe_keys WHERE workbook = ?", (excel_path.name,))
+            self._conn.execute("DELETE FROM workbooks WHERE workbook = ?", (excel_path.name,))
+            if stamp is None:
+                return 0
+            pairs = _read_dedupe_keys(excel_path)
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO dedupe_keys (workbook, sheet, dedupe_key) VALUES (?, ?, ?)",
+                [(excel_path.name, sheet, key) for sheet, key in pairs],
+            )
+            self._set_stamp(excel_path.name, stamp)
+        return len(pairs)
+
+    def prune(self, workbooks: Set[str]) -> None:
+        """Drop the entries of all workbooks not named in workbooks (deleted/renamed files)."""
+        with self._conn:
+            for (name,) in self._conn.execute("SELECT workbook FROM workbooks").fetchall():
+                if name not in workbooks:
+                    self._conn.execute("DELETE FROM dedupe_keys WHERE workbook = ?", (name,))
+                    self._conn.execute("DELETE FROM workbooks WHERE workbook = ?", (name,))
+
+    def _ensure_fresh(self, excel_path: Path) -> None:
+        row = self._conn.execute(
+            "SELECT mtime_ns, size FROM workbooks WHERE workbook = ?", (excel_path.name,)
+        ).fetchone()
+        if _stamp(excel_path) != (tuple(row) if row else None):
+            self.rebuild(excel_path)
+
+    def _set_stamp(self, name: str, stamp: _Stamp) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO workbooks (workbook, mtime_ns, size) VALUES (?, ?, ?)", (name, *stamp)
+        )
+
+
+def _read_dedupe_keys(excel_path: Path) -> List[Tuple[str, str]]:
+    # same column lookup as Writer: first row without empty cells, "dedupe_key" header
+    wb = load_workbook(excel_path, read_only=True)
+    try:
+        pairs: List[Tuple[str, str]] = []
+        for ws in wb.worksheets:
+            rows = ws.iter_rows(values_only=True)
+            header = next(rows, None) or ()
+            headers = [v for v in header if v is not None]
+            if "dedupe_key" not in headers:
+                continue
+            col = headers.index("dedupe_key")
+            for row in rows:
+                if row and len(row) > col and row[col]:
+                    pairs.append((ws.title, str(row[col])))
+        return pairs
+    finally:
+        wb.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Rebuild the dedupe-key index of an Excel output directory")
+    ap.add_argument("output_dir", nargs="?", default="output/final")
+    args = ap.parse_args(argv)
+    from .writer import Writer
+
+    for name, count in Writer().rebuild_dedupe_index(args.output_dir).items():
+        print(f"{name}: {count} keys")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import argparse
+import atexit
+import sys
+import threading
+from typing import Dict, List, Optional
+
+from .writer import Writer
+
+
+DEFAULT_INTERVAL_S: float = 30.0
+
+
+class Materializer:
+    """Writes the staging store of one output directory to its xlsx files.
+
+    run_once() materializes on demand; start() repeats it every interval_s on a
+    background thread until stop(), which runs a final pass so nothing staged is left
+    behind (also registered via atexit while the schedule runs).
+    """
+
+    def __init__(self, output_dir: str, interval_s: float = DEFAULT_INTERVAL_S,
+                 writer: Optional[Writer] = None) -> None:
+        self._output_dir = output_dir
+        self._interval_s = interval_s
+        self._writer = writer or Writer()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_error: Optional[Exception] = None
+
+    def __enter__(self) -> Materializer:
+        self.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+    def run_once(self, rebuild: bool = False) -> Dict[str, int]:
+        return self._writer.materialize(self._output_dir, rebuild=rebuild)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="materializer", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        atexit.unregister(self.stop)
+        self.run_once()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval_s):
+            try:
+                self.run_once()
+                self.last_error = None
+            except Exception as e:
+                # e.g. a workbook held open in Excel (lock timeout); retried next interval
+                self.last_error = e
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Write staged records to the Excel files of an output directory")
+    ap.add_argument("output_dir", nargs="?", default="output/final")
+    ap.add_argument("--rebuild", action="store_true", help="re-check every staged row against the xlsx files")
+    ap.add_argument("--interval", type=float, help="keep running and materialize every INTERVAL seconds")
+    args = ap.parse_args(argv)
+
+    materializer = Materializer(args.output_dir, args.interval or DEFAULT_INTERVAL_S)
+    for name, count in materializer.run_once(rebuild=args.rebuild).items():
+        print(f"{name}: {count} rows")
+    if args.interval:
+        materializer.start()
+        try:
+            while True:
+                threading.Event().wait(3600)
+        except KeyboardInterrupt:
+            materializer.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from src.extractor.api import AssayRecord
+
+
+STAGING_FILENAME: str = ".staging.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    workbook TEXT NOT NULL,
+    sheet TEXT NOT NULL,
+    dedupe_key TEXT NOT NULL,
+    excel_rules TEXT NOT NULL,
+    record TEXT NOT NULL,
+    staged_at REAL NOT NULL,
+    UNIQUE (workbook, sheet, dedupe_key)
+);
+CREATE TABLE IF NOT EXISTS materialized (
+    workbook TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL
+);
+"""
+
+# (seq, sheet, record, excel_rules) of one staged row
+StagedRow = Tuple[int, str, AssayRecord, Dict[str, Any]]
+
+
+class StagingStore:
+    """Append-only record store of one output directory (system of record in staging mode).
+
+    Every row keeps its target workbook, sheet (lot) and the excel_rules needed to lay it
+    out, so the xlsx files can be materialized from the store at any time. Rows are never
+    updated or deleted; per workbook the store remembers the last seq written to the xlsx.
+    """
+
+    def __init__(self, output_dir: str) -> None:
+        self._conn = sqlite3.connect(str(Path(output_dir) / STAGING_FILENAME), timeout=30.0)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> StagingStore:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def append(self, workbook: str, sheet: str, record: AssayRecord, excel_rules: Dict[str, Any]) -> bool:
+        """Stage one record; False if (workbook, sheet, dedupe_key) is already staged.
+
+        Not committed until commit(), so a batch becomes visible at once.
+        """
+        payload = {"assay_key": record.assay_key, "lot_id": record.lot_id,
+                   "dedupe_key": record.dedupe_key, "data": record.data}
+        cur = self._conn.execute(
+            "INSERT OR IGNORE INTO records (workbook, sheet, dedupe_key, excel_rules, record, staged_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (workbook, sheet, record.dedupe_key, json.dumps(excel_rules), json.dumps(payload), time.time()),
+        )
+        return cur.rowcount == 1
+
+    def commit(self) -> None:
+        self._conn.commit()
+
+    def has_workbook(self, workbook: str) -> bool:
+        row = self._conn.execute("SELECT 1 FROM records WHERE workbook = ? LIMIT 1", (workbook,)).fetchone()
+        return row is not None
+
+    def workbooks(self) -> List[str]:
+        return [r[0] for r in self._conn.execute("SELECT DISTINCT workbook FROM records ORDER BY workbook")]
+
+    def rows(self, workbook: str, after_seq: int = 0) -> List[StagedRow]:
+        """Staged rows of one workbook with seq > after_seq, in staging order."""
+        out: List[StagedRow] = []
+        for seq, sheet, rules, payload in self._conn.execute(
+            "SELECT seq, sheet, excel_rules, record FROM records WHERE workbook = ? AND seq > ? ORDER BY seq",
+            (workbook, after_seq),
+        ):
+            out.append((seq, sheet, AssayRecord(**json.loads(payload)), json.loads(rules)))
+        return out
+
+    def materialized_seq(self, workbook: str) -> int:
+        row = self._conn.execute("SELECT seq FROM materialized WHERE workbook = ?", (workbook,)).fetchone()
+        return row[0] if row else 0
+
+    def set_materialized_seq(self, workbook: str, seq: int) -> None:
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO materialized (workbook, seq) VALUES (?, ?)", (workbook, seq))
+
+    def pending_count(self) -> int:
+        row = self._conn.execute(
+            "SELECT COUNT(*) FROM records r LEFT JOIN materialized m ON m.workbook = r.workbook "
+            "WHERE r.seq > COALESCE(m.seq, 0)"
+        ).fetchone()
+        return row[0]
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import json
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+    import msvcrt
+
+
+DEFAULT_LOCK_TIMEOUT_S: float = 60.0
+# a writer holds a workbook lock only for one load/append/save; anything older was left behind
+DEFAULT_LOCK_STALE_S: float = 600.0
+BACKOFF_INITIAL_S: float = 0.05
+BACKOFF_MAX_S: float = 1.0
+# a held lock's mtime is touched this many times per stale_after_s, so long batches keep it fresh
+HEARTBEATS_PER_STALE_PERIOD: int = 4
+# taking, breaking and releasing the locks of one output dir is serialized on this file
+GUARD_NAME: str = ".excel_writer.guard"
+
+
+class LockTimeout(RuntimeError):
+    pass
+
+
+def lock_path_for(excel_path: Path) -> Path:
+    """Lock file of one workbook: hidden sibling "<dir>/.<name>.lock"."""
+    return excel_path.with_name(f".{excel_path.name}.lock")
+
+
+class WorkbookLock:
+    """Create-exclusive lock file for one workbook, with bounded blocking wait.
+
+    On contention the caller retries with exponential backoff (plus jitter) until
+    timeout_s. The lock file records owner host/pid and a token; a lock is broken as
+    stale when it is older than stale_after_s, or when its owner process on this host
+    no longer exists (POSIX only – os.kill(pid, 0) would terminate the process on Windows).
+    While held, a heartbeat thread touches the lock's mtime, so only a lock whose owner
+    stopped touching it ages into stale.
+
+    Create, break and release each run under a short OS lock on the output dir's guard
+    file: a waiter judges a lock stale again under the guard and replaces it atomically
+    with its own claim file, so no one can take or release the lock in between.
+    """
+
+    def __init__(self, excel_path: Path, timeout_s: float = DEFAULT_LOCK_TIMEOUT_S,
+                 stale_after_s: float = DEFAULT_LOCK_STALE_S) -> None:
+        self.path = lock_path_for(excel_path)
+        self._timeout_s = timeout_s
+        self._stale_after_s = stale_after_s
+        self._guard_path = self.path.with_name(GUARD_NAME)
+        self._token: Optional[str] = None
+        self._heartbeat: Optional[threading.Thread] = None
+        self._stop_heartbeat = threading.Event()
+
+    def __enter__(self) -> WorkbookLock:
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.release()
+
+    def acquire(self) -> None:
+        deadline = time.monotonic() + self._timeout_s
+        delay = BACKOFF_INITIAL_S
+        while True:
+            if self._try_create() or self._take_if_stale():
+                self._start_heartbeat()
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LockTimeout(f"excel_writer_lock_timeout: {self.path.name} ({self._owner_text()})")
+            time.sleep(min(remaining, delay * random.uniform(0.5, 1.0)))
+            delay = min(delay * 2, BACKOFF_MAX_S)
+
+    def release(self) -> None:
+        if self._token is None:
+            return
+        self._stop_heartbeat.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+            self._heartbeat = None
+        with self._guarded():
+            # only remove our own lock (it may have been broken as stale and re-taken meanwhile)
+            if (self._read_owner() or {}).get("token") == self._token:
+                try:
+                    self.path.unlink(missing_ok=True)
+                except OSError:
+                    pass
+        self._token = None
+
+    def _try_create(self) -> bool:
+        token = uuid.uuid4().hex
+        with self._guarded():
+            try:
+                fd = os.open(str(self.path), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                return False
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._owner_record(token), f)
+        self._token = token
+        return True
+
+    def _take_if_stale(self) -> bool:
+        owner = self._read_owner()
+        if owner is None or not self._is_stale(owner):
+            return False
+        token = uuid.uuid4().hex
+        claim = self.path.with_name(f"{self.path.name}.claim-{token}")
+        with self._guarded():
+            # judged again under the guard: released, re-taken or touched since the first look?
+            current = self._read_owner()
+            if current is not None and (current.get("token") != owner.get("token") or not self._is_stale(current)):
+                return False
+            try:
+                claim.write_text(json.dumps(self._owner_record(token)), encoding="utf-8")
+                os.replace(claim, self.path)
+            except OSError:
+                claim.unlink(missing_ok=True)
+                return False
+            if (self._read_owner() or {}).get("token") != token:
+                return False
+        self._token = token
+        return True
+
+    def _start_heartbeat(self) -> None:
+        self._stop_heartbeat = threading.Event()
+        self._heartbeat = threading.Thread(
+            target=self._beat, args=(self._token, self._stop_heartbeat),
+            name=f"lock-heartbeat-{self.path.name}", daemon=True)
+        self._heartbeat.start()
+
+    def _beat(self, token: Optional[str], stop: threading.Event) -> None:
+        interval = self._stale_after_s / HEARTBEATS_PER_STALE_PERIOD
+        while not stop.wait(interval):
+            with self._guarded():
+                if (self._read_owner() or {}).get("token") != token:
+                    return
+                try:
+                    os.utime(self.path)
+                except OSError:
+                    return
+
+    @contextmanager
+    def _guarded(self) -> Iterator[None]:
+        fd = os.open(str(self._guard_path), os.O_CREAT | os.O_RDWR)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            else:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                try:
+                    yield
+                finally:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _owner_record(token: str) -> Dict[str, Any]:
+        return {"host": socket.gethostname(), "pid": os.getpid(), "token": token, "created": time.time()}
+
+    def _is_stale(self, owner: Dict[str, Any]) -> bool:
+        try:
+            age = time.time() - self.path.stat().st_mtime
+        except OSError:
+            return False
+        if age > self._stale_after_s:
+            return True
+        pid = owner.get("pid")
+        if os.name != "nt" and owner.get("host") == socket.gethostname() and isinstance(pid, int):
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                return True
+            except OSError:
+                return False
+        return False
+
+    def _read_owner(self) -> Optional[Dict[str, Any]]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # being written right now, or a legacy empty lock file: judge by age only
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _owner_text(self) -> str:
+        owner = self._read_owner() or {}
+        return f"held by {owner.get('host', '?')}:{owner.get('pid', '?')}"
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import atexit
+import threading
+import time
+from concurrent.futures import Future, wait
+from typing import Dict, List, Optional, Tuple
+
+from src.extractor.api import AssayRecord
+from src.ruleresolver.api import RuleSet
+from .model import WriteResult
+from .writer import Writer
+
+
+DEFAULT_MAX_BATCH: int = 64
+DEFAULT_MAX_DELAY_S: float = 0.5
+
+# (output_dir, record, ruleset, future of its WriteResult)
+_Pending = Tuple[str, AssayRecord, RuleSet, "Future[WriteResult]"]
+
+
+class WriteBehindQueue:
+    """Single writer thread that takes records from any number of producers.
+
+    submit() only enqueues and returns a Future; the writer thread collects pending
+    records and writes them with one Writer.write_records call per output dir (each
+    workbook loaded and saved once per flush). A flush starts when max_batch records
+    are pending or the oldest one waited max_delay_s, and on flush()/close().
+    A failed flush fails the futures of exactly the records it contained. Should the
+    writer thread itself die, every unfinished future fails and the queue closes, so
+    nobody waits on a record that will never be written.
+
+    The writer is a thread, not a process: openpyxl's save is CPU-bound Python and
+    still shares the GIL with extraction, so only the waiting (file I/O, lock waits)
+    leaves the producers' path. Records still pending at interpreter exit are written
+    by an atexit hook.
+    """
+
+    def __init__(self, writer: Optional[Writer] = None, max_batch: int = DEFAULT_MAX_BATCH,
+                 max_delay_s: float = DEFAULT_MAX_DELAY_S) -> None:
+        self._writer = writer or Writer()
+        self._max_batch = max(1, max_batch)
+        self._max_delay_s = max_delay_s
+        self._cond = threading.Condition()
+        self._pending: List[_Pending] = []
+        self._writing: List[Future[WriteResult]] = []
+        self._oldest = 0.0
+        self._flush_requested = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def __enter__(self) -> WriteBehindQueue:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def submit(self, record: AssayRecord, ruleset: RuleSet, output_dir: str) -> Future[WriteResult]:
+        future: Future[WriteResult] = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("write-behind queue is closed")
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append((output_dir, record, ruleset, future))
+            # first pending record: the writer sleeps without timeout and must arm max_delay_s
+            if len(self._pending) == 1 or len(self._pending) >= self._max_batch:
+                self._cond.notify()
+        return future
+
+    def flush(self, block: bool = True) -> None:
+        """Write everything submitted so far now; with block, wait until it is written."""
+        with self._cond:
+            futures = self._writing + [p[3] for p in self._pending]
+            self._flush_requested = True
+            self._cond.notify()
+        if block:
+            wait(futures)
+
+    def close(self) -> None:
+        """Flush the remaining records and stop the writer thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    def _run(self) -> None:
+        try:
+            self._loop()
+        except BaseException as e:
+            self._abandon(e)
+
+    def _abandon(self, e: BaseException) -> None:
+        error = RuntimeError(f"write-behind writer died: {type(e).__name__}: {e}")
+        with self._cond:
+            self._closed = True
+            futures = self._writing + [p[3] for p in self._pending]
+            self._writing, self._pending = [], []
+        for f in futures:
+            if not f.done():
+                f.set_exception(error)
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._due():
+                    timeout = None
+                    if self._pending:
+                        timeout = max(0.0, self._oldest + self._max_delay_s - time.monotonic())
+                    self._cond.wait(timeout)
+                batch, self._pending = self._pending, []
+                self._writing = [p[3] for p in batch]
+                self._flush_requested = False
+                stop = self._closed and not batch
+            if stop:
+                return
+            self._write(batch)
+
+    def _due(self) -> bool:
+        if self._closed or self._flush_requested:
+            return True
+        if not self._pending:
+            return False
+        return len(self._pending) >= self._max_batch or time.monotonic() - self._oldest >= self._max_delay_s
+
+    def _write(self, batch: List[_Pending]) -> None:
+        by_dir: Dict[str, List[_Pending]] = {}
+        for item in batch:
+            by_dir.setdefault(item[0], []).append(item)
+        for output_dir, items in by_dir.items():
+            items = [item for item in items if item[3].set_running_or_notify_cancel()]
+            futures = [f for _, _, _, f in items]
+            try:
+                results = self._writer.write_records([(rec, rs) for _, rec, rs, _ in items], output_dir)
+            except Exception as e:
+                for f in futures:
+                    f.set_exception(e)
+                continue
+            for f, result in zip(futures, results):
+                f.set_result(result)
@@ -1,15 +1,19 @@
 from __future__ import annotations
 
 import os
+from contextlib import ExitStack
 from pathlib import Path
-from typing import Any, Dict, List, Set
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
 
 from openpyxl import Workbook, load_workbook
 from openpyxl.worksheet.worksheet import Worksheet
 
 from src.ruleresolver.api import RuleSet
 from src.extractor.api import AssayRecord
+from .dedupeindex import DedupeIndex
 from .model import WriteResult
+from .stagingstore import StagingStore
+from .workbooklock import DEFAULT_LOCK_STALE_S, DEFAULT_LOCK_TIMEOUT_S, LockTimeout, WorkbookLock
 
 
 class WriterError(RuntimeError):
@@ -17,7 +21,125 @@ class WriterError(RuntimeError):
 
 
 class Writer:
+    def __init__(self, lock_timeout_s: float = DEFAULT_LOCK_TIMEOUT_S,
+                 lock_stale_after_s: float = DEFAULT_LOCK_STALE_S) -> None:
+        self._lock_timeout_s = lock_timeout_s
+        self._lock_stale_after_s = lock_stale_after_s
+
     def write_record(self, record: AssayRecord, ruleset: RuleSet, output_dir: str) -> WriteResult:
+        return self.write_records([(record, ruleset)], output_dir)[0]
+
+    def write_records(self, items: Sequence[Tuple[AssayRecord, RuleSet]], output_dir: str) -> List[WriteResult]:
+        """Write many records; each target workbook is loaded and saved once.
+
+        Results are in input order and equal those of calling write_record per item in
+        that order (a record deduped against an earlier one of the batch is "skipped").
+        Only the target workbooks are locked, so writers of other assays run concurrently.
+        """
+        out_dir = Path(output_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        # group by workbook, keeping input order within each group
+        groups: Dict[Path, List[Tuple[int, str, AssayRecord, Dict[str, Any]]]] = {}
+        results: List[Optional[WriteResult]] = [None] * len(items)
+        for i, (record, ruleset) in enumerate(items):
+            excel_path, sheet_name, excel_rules = self._target(record, ruleset, out_dir)
+            groups.setdefault(excel_path, []).append((i, sheet_name, record, excel_rules))
+
+        # all target locks before the first write (sorted: no lock-order deadlocks between
+        # batches), so a lock timeout never leaves a batch half written
+        with ExitStack() as locks, DedupeIndex(str(out_dir)) as index:
+            for excel_path in sorted(groups):
+                locks.callback(self._acquire(excel_path).release)
+            for excel_path, group in groups.items():
+                statuses = self._write_with_dedupe(
+                    excel_path, [(sheet, rec, rules) for _, sheet, rec, rules in group], index
+                )
+                for (i, sheet_name, _, _), status in zip(group, statuses):
+                    results[i] = WriteResult(excel_path=str(excel_path), sheet_name=sheet_name, status=status)
+
+        return [r for r in results if r is not None]
+
+    def stage_records(self, items: Sequence[Tuple[AssayRecord, RuleSet]], output_dir: str) -> List[WriteResult]:
+        """Append records to the staging store instead of the workbooks.
+
+        Dedupe and statuses are those of write_records (against the xlsx content and the
+        rows staged before); no workbook is opened or locked. materialize() writes the
+        staged rows to the xlsx files later.
+        """
+        out_dir = Path(output_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        results: List[WriteResult] = []
+        keys: Dict[Tuple[Path, str], Set[str]] = {}
+        with StagingStore(str(out_dir)) as store, DedupeIndex(str(out_dir)) as index:
+            for record, ruleset in items:
+                excel_path, sheet_name, excel_rules = self._target(record, ruleset, out_dir)
+                written = keys.get((excel_path, sheet_name))
+                if written is None:
+                    written = keys[(excel_path, sheet_name)] = index.keys(excel_path, sheet_name)
+                known = excel_path.exists() or store.has_workbook(excel_path.name)
+                if record.dedupe_key in written or not store.append(excel_path.name, sheet_name, record, excel_rules):
+                    status = "skipped"
+                else:
+                    status = "appended" if known else "created"
+                results.append(WriteResult(excel_path=str(excel_path), sheet_name=sheet_name, status=status))
+            store.commit()
+        return results
+
+    def materialize(self, output_dir: str, rebuild: bool = False) -> Dict[str, int]:
+        """Write staged rows to their workbooks; returns workbook name -> rows appended.
+
+        Incremental by default: only rows staged after the last materialization. With
+        rebuild=True every staged row is checked against the xlsx (index re-read from the
+        file) and missing ones are appended again, e.g. after a workbook was deleted.
+        """
+        out_dir = Path(output_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        counts: Dict[str, int] = {}
+        with StagingStore(str(out_dir)) as store, DedupeIndex(str(out_dir)) as index:
+            for workbook in store.workbooks():
+                excel_path = out_dir / workbook
+                lock = self._acquire(excel_path)
+                try:
+                    if rebuild:
+                        index.rebuild(excel_path)
+                    staged = store.rows(workbook, 0 if rebuild else store.materialized_seq(workbook))
+                    if not staged:
+                        counts[workbook] = 0
+                        continue
+                    # skip rows already in the xlsx (crash between save and seq update)
+                    rows: List[Tuple[str, AssayRecord, Dict[str, Any]]] = []
+                    present: Dict[str, Set[str]] = {}
+                    for _, sheet_name, record, excel_rules in staged:
+                        if sheet_name not in present:
+                            present[sheet_name] = index.keys(excel_path, sheet_name)
+                        if record.dedupe_key not in present[sheet_name]:
+                            rows.append((sheet_name, record, excel_rules))
+                    if rows:
+                        self._append_rows(excel_path, rows, index)
+                    store.set_materialized_seq(workbook, max(store.materialized_seq(workbook), staged[-1][0]))
+                    counts[workbook] = len(rows)
+                finally:
+                    lock.release()
+        return counts
+
+    def rebuild_dedupe_index(self, output_dir: str) -> Dict[str, int]:
+        out_dir = Path(output_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        with DedupeIndex(str(out_dir)) as index:
+            counts: Dict[str, int] = {}
+            for excel_path in sorted(out_dir.glob("*.xlsx")):
+                lock = self._acquire(excel_path)
+                try:
+                    counts[excel_path.name] = index.rebuild(excel_path)
+                finally:
+                    lock.release()
+            index.prune(set(counts))
+            return counts
+
+    def _target(self, record: AssayRecord, ruleset: RuleSet, out_dir: Path) -> Tuple[Path, str, Dict[str, Any]]:
         # Excel-Regeln aus dem Ruleset lesen
         excel_rules = ruleset.data.get("excel_rules", {})
         filename_template = excel_rules.get("excel_filename_template", "{assay_name}.xlsx")
@@ -30,47 +152,67 @@ class Writer:
             assay_name=self._sanitize_filename(assay_name),
         )
         sheet_name = sheet_template.format(lot_id=self._sanitize_sheetname(record.lot_id))
+        return out_dir / excel_name, sheet_name, excel_rules
 
-        out_dir = Path(output_dir)
-        out_dir.mkdir(parents=True, exist_ok=True)
-        excel_path = out_dir / excel_name
+    def _write_with_dedupe(
+        self,
+        excel_path: Path,
+        rows: List[Tuple[str, AssayRecord, Dict[str, Any]]],
+        index: DedupeIndex,
+    ) -> List[str]:
+        status_base = "appended" if excel_path.exists() else "created"
 
-        lock_path = out_dir / ".excel_writer.lock"
-        self._acquire_lock(lock_path)
-        try:
-            status = self._write_with_dedupe(excel_path, sheet_name, record, excel_rules)
-        finally:
-            self._release_lock(lock_path)
+        # Dedupe prüfen – against the sidecar index, the workbook is only opened to append
+        statuses: List[str] = []
+        to_append: List[Tuple[str, AssayRecord, Dict[str, Any]]] = []
+        keys_by_sheet: Dict[str, Set[str]] = {}
+        for sheet_name, record, excel_rules in rows:
+            keys = keys_by_sheet.get(sheet_name)
+            if keys is None:
+                keys = keys_by_sheet[sheet_name] = index.keys(excel_path, sheet_name)
+            if record.dedupe_key in keys:
+                statuses.append("skipped")
+                continue
+            keys.add(record.dedupe_key)
+            to_append.append((sheet_name, record, excel_rules))
+            statuses.append(status_base)
+            # the file exists after the first save of a sequential write
+            status_base = "appended"
 
-        return WriteResult(excel_path=str(excel_path), sheet_name=sheet_name, status=status)
+        if to_append:
+            self._append_rows(excel_path, to_append, index)
+        return statuses
 
-    def _write_with_dedupe(
+    def _append_rows(
         self,
         excel_path: Path,
-        sheet_name: str,
-        record: AssayRecord,
-        excel_rules: Dict[str, Any],
-    ) -> str:
+        rows: List[Tuple[str, AssayRecord, Dict[str, Any]]],
+        index: DedupeIndex,
+    ) -> None:
         if excel_path.exists():
             wb = load_workbook(excel_path)
-            status_base = "appended"
         else:
             wb = Workbook()
             # Default-Sheet entfernen
             if "Sheet" in wb.sheetnames and len(wb.sheetnames) == 1:
                 wb.remove(wb["Sheet"])
-            status_base = "created"
-
-        ws = wb[sheet_name] if sheet_name in wb.sheetnames else wb.create_sheet(sheet_name)
 
-        headers = self._ensure_headers(ws, record, excel_rules)
+        for sheet_name, record, excel_rules in rows:
+            ws = wb[sheet_name] if sheet_name in wb.sheetnames else wb.create_sheet(sheet_name)
+            headers = self._ensure_headers(ws, record, excel_rules)
+            ws.append(self._row_values(headers, record, excel_rules))
 
-        # Dedupe prüfen
-        existing = self._existing_dedupe_keys(ws, headers)
-        if record.dedupe_key in existing:
-            wb.save(excel_path)
-            return "skipped"
+        # save next to the target and swap it in: readers without the workbook lock
+        # (dedupe index rebuild during staging) never see a half-written file
+        tmp_path = excel_path.with_name(f".{excel_path.name}.{os.getpid()}.tmp")
+        try:
+            wb.save(tmp_path)
+            os.replace(tmp_path, excel_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        index.record(excel_path, [(sheet_name, record.dedupe_key) for sheet_name, record, _ in rows])
 
+    def _row_values(self, headers: List[str], record: AssayRecord, excel_rules: Dict[str, Any]) -> List[Any]:
         # Mapping: internal_key -> excel_column_name
         mapping: Dict[str, str] = excel_rules.get("column_mapping", {})
         # Reverse: excel_column_name -> internal_key (fürs Zurückübersetzen beim Schreiben)
@@ -88,23 +230,7 @@ class Writer:
                 # Wichtig: Wenn Header gemappt ist (z.B. "Haltbarkeit"), dann den originalen Key nehmen (z.B. "expiry_raw")
                 internal_key = reverse_mapping.get(h, h)
                 row_values.append(record.data.get(internal_key))
-
-        ws.append(row_values)
-
-        wb.save(excel_path)
-        return status_base
-
-    def _existing_dedupe_keys(self, ws: Worksheet, headers: List[str]) -> Set[str]:
-        if "dedupe_key" not in headers:
-            return set()
-        dedupe_col = headers.index("dedupe_key") + 1
-        keys: Set[str] = set()
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            if row and len(row) >= dedupe_col:
-                v = row[dedupe_col - 1]
-                if v:
-                    keys.add(str(v))
-        return keys
+        return row_values
 
     def _ensure_headers(self, ws: Worksheet, record: AssayRecord, excel_rules: Dict[str, Any]) -> List[str]:
         mapping: Dict[str, str] = excel_rules.get("column_mapping", {})
@@ -143,15 +269,10 @@ class Writer:
         cleaned = "".join(ch for ch in str(s) if ch not in invalid).strip()
         return cleaned[:31] if cleaned else "LOT"
 
-    def _acquire_lock(self, lock_path: Path) -> None:
-        try:
-            fd = os.open(str(lock_path), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
-            os.close(fd)
-        except FileExistsError:
-            raise WriterError("excel_writer_lock_exists")
-
-    def _release_lock(self, lock_path: Path) -> None:
+    def _acquire(self, excel_path: Path) -> WorkbookLock:
+        lock = WorkbookLock(excel_path, self._lock_timeout_s, self._lock_stale_after_s)
         try:
-            lock_path.unlink(missing_ok=True)
-        except Exception:
-            pass
+            lock.acquire()
+        except LockTimeout as e:
+            raise WriterError(str(e)) from e
+        return lock
@@ -1,6 +1,9 @@
 import json
 from pathlib import Path
-from src.assaychooser.api import detect_assays
+from src.assaychooser.api import assign_page_ranges, detect_assays
+from src.contentsplitter.api import split_by_assay_name_and_key_views
+from src.contentsplitter.model import AssayDescriptor
+from src.normalizer.api import PageIndex, normalize_text
 
 def test_detect_assays_case_sensitive(tmp_path: Path):
     index = {"assays": [{"assay_key": "(6bd7)", "ruleset_file": "x.json"}]}
@@ -12,3 +15,44 @@ def test_detect_assays_case_sensitive(tmp_path: Path):
 
     matches2 = detect_assays("abc (6BD7) def", str(p))
     assert matches2 == []
+
+
+def test_aho_corasick_matches_find():
+    import random
+
+    from src.assaychooser.ahocorasick import AhoCorasick
+
+    rng = random.Random(3)
+    for _ in range(300):
+        text = "".join(rng.choice("ab()c") for _ in range(rng.randint(0, 60)))
+        patterns = tuple("".join(rng.choice("ab()c") for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 12)))
+        expected = {p: text.find(p) for p in patterns if text.find(p) != -1}
+        assert AhoCorasick(patterns).first_positions(text) == expected
+
+
+def test_detect_assays_orders_by_first_occurrence(tmp_path: Path):
+    keys = ["(aaaa)", "(bbbb)", "(cccc)", "(dddd)"]
+    index = {"assays": [{"assay_key": k, "ruleset_file": "x.json"} for k in keys]}
+    p = tmp_path / "index.json"
+    p.write_text(json.dumps(index), encoding="utf-8")
+
+    matches = detect_assays("x (cccc) y (aaaa) z (cccc) (dddd)", str(p))
+    assert [m.assay_key for m in matches] == ["(cccc)", "(aaaa)", "(dddd)"]
+
+
+def test_page_ranges_follow_the_split_blocks(tmp_path: Path):
+    index = {"assays": [{"assay_key": k, "ruleset_file": "x.json"} for k in ("(aaaa)", "(bbbb)")]}
+    p = tmp_path / "index.json"
+    p.write_text(json.dumps(index), encoding="utf-8")
+
+    # assay B's heading sits at the bottom of page 2, its key only on page 3
+    pages = [["Assay A", "(aaaa) 1"], ["more A", "Assay B"], [], ["(bbbb) 2"], ["end"]]
+    page_index = PageIndex()
+    text = normalize_text(pages, page_index)
+    matches = detect_assays(text, str(p))
+    blocks = split_by_assay_name_and_key_views(text, [AssayDescriptor("(aaaa)", "Assay A"),
+                                                      AssayDescriptor("(bbbb)", "Assay B")])
+
+    ranged = assign_page_ranges(matches, blocks, page_index)
+    assert [(m.assay_key, m.first_page, m.last_page) for m in ranged] == [("(aaaa)", 1, 2), ("(bbbb)", 2, 5)]
+    assert [(m.first_page, m.last_page) for m in matches] == [(None, None), (None, None)]
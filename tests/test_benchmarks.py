@@ -0,0 +1,27 @@
+from pathlib import Path
+
+from benchmarks.parser_bench import compare, run
+from benchmarks.synthetic import SyntheticSpec, generate_report
+from src.parser.api import ParserOptions, parse
+
+
+def test_synthetic_report_parses_into_expected_lines(tmp_path: Path):
+    spec = SyntheticSpec(pages=2, lines_per_page=10, spans_per_line=3)
+    pdf = tmp_path / "syn.pdf"
+    spans = generate_report(spec, str(pdf))
+    assert spans == 2 * (2 + 10 * 3)
+    doc = parse(str(pdf))
+    assert len(doc.pages) == 2
+    assert sum(1 for line in doc.pages[0].lines if line.startswith("Sample ")) == 10
+
+
+def test_run_reports_throughput_and_detects_regression():
+    report = run([SyntheticSpec(pages=1, lines_per_page=5, spans_per_line=2)], ParserOptions(), repeat=1)
+    (scenario,) = report["scenarios"]
+    assert scenario["pages_per_s"] > 0 and scenario["spans_per_s"] > 0
+    assert set(scenario["stages_s"]) == {"open_load", "extract", "cluster", "join"}
+    assert scenario["peak_python_bytes"] > 0
+
+    faster = {"scenarios": [dict(scenario, pages_per_s=scenario["pages_per_s"] * 10)]}
+    assert compare(report, faster, 0.2)
+    assert compare(report, report, 0.2) == []
@@ -10,3 +10,20 @@ def test_split_blocks():
 def test_split_fail_missing_key():
     with pytest.raises(Exception):
         split_by_assay_keys("aaa (1111)", ["(1111)", "(2222)"])
+
+
+def test_block_views_match_string_blocks():
+    from src.contentsplitter.api import split_by_assay_name_and_key, split_by_assay_name_and_key_views
+    from src.contentsplitter.model import AssayDescriptor
+
+    text = "header\n  Assay A\n(1111) lot 1\n\n Assay B (2222)\nvalue 2\n  \n"
+    assays = [AssayDescriptor("(1111)", "Assay A"), AssayDescriptor("(2222)", "Assay B")]
+    blocks = split_by_assay_name_and_key(text, assays)
+    views = split_by_assay_name_and_key_views(text, assays)
+
+    assert set(views) == set(blocks)
+    for k, v in views.items():
+        assert v.source is text
+        assert v.text() == blocks[k]
+        assert len(v) == len(blocks[k])
+        assert v.line_count() == len(blocks[k].splitlines())
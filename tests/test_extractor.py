@@ -0,0 +1,212 @@
+import random
+import re
+import threading
+import time
+
+import pytest
+
+from src.contentsplitter.model import BlockView
+from src.extractor import regexguard
+from src.extractor import scanner as scanner_module
+from src.extractor.api import extract_record
+from src.extractor.extractor import ExtractionError
+from src.extractor.regexguard import RegexGuard, RegexWorkerError
+from src.extractor.scanner import FieldScanner
+from src.ruleresolver.api import compile_ruleset
+from src.ruleresolver.model import RuleSet
+
+
+RULESET = RuleSet(assay_key="(1111)", ruleset_file="t.json", data={
+    "lot_rule": {"regex": r"Lot:\s*(\S+)"},
+    "extract_rules": {"fields": [
+        {"key": "test", "regex": r"^(Assay A)", "required": True},
+        {"key": "date", "regex": r"\bDatum:\s*(\S+)", "required": True},
+        {"key": "time", "regex": r"(?<=Zeit: )(\S+)", "required": True},
+        {"key": "value", "regex": r"(\d+,\d+)", "search_from": {"after": "^Ergebnis"}},
+        {"key": "last", "regex": r"(\S+)$", "search_from": {"line": -1}},
+    ]},
+    "excel_rules": {},
+})
+
+
+def test_block_view_extracts_same_record_as_text():
+    block = "Assay A (1111) Lot: L42\nDatum: 2024-01-02 Zeit: 10:11:12\nErgebnis\n1,25 U\nende"
+    source = "xDatum: 1999-12-31 Zeit: 00:00:00 Ergebnis 9,99\n" + block + "\nAssay B"
+    start = source.index(block)
+    view = BlockView(source=source, start=start, end=start + len(block))
+
+    expected = extract_record(block, RULESET)
+    rec = extract_record(view, RULESET)
+
+    assert rec == expected
+    assert rec.lot_id == "L42"
+    assert rec.dedupe_key == "Assay A|2024-01-02|10:11:12"
+    assert rec.data["value"] == "1,25"
+    assert rec.data["last"] == "ende"
+
+
+def _reference_fields(text, fields):
+    # search_from semantics of the original line/join implementation
+    out = {}
+    lines = text.splitlines()
+    for f in fields:
+        search_text = text
+        sf = f.get("search_from")
+        if isinstance(sf, dict):
+            if "after" in sf:
+                for i, ln in enumerate(lines):
+                    if re.search(sf["after"], ln):
+                        search_text = "\n".join(lines[i + 1:])
+                        break
+            elif "line" in sf:
+                search_text = "\n".join(lines[int(sf["line"]):])
+        m = re.search(f["regex"], search_text)
+        out[f["key"]] = (m.group(1) if m.groups() else m.group(0)).strip() if m else None
+    return out
+
+
+def test_search_from_offsets_match_line_join_fuzz():
+    markers = ["Erg", "^Erg", "b$", "g\\s+a", "(?<=\\n)E", "\\bab", "x?", "Erg.*"]
+    regexes = ["^(\\w+)", "(\\w+)$", "\\b(a\\w*)", "(?<=b)(\\w)", "(E\\w*\\s+\\w+)", "(\\s*\\w+)\\Z", "a",
+               "\\bab(\\w*)", "(?m)^Erg(\\w*)", "\\B(rg\\s*\\w)", "\\babb?", "Erg\\s*(\\w)"]
+    alphabet = ["a", "b", "Erg", " ", "\n", "\n", "\r\n", "\x85", "_"]
+    rng = random.Random(7)
+    for _ in range(400):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randrange(0, 25)))
+        fields = []
+        for i in range(4):
+            f = {"key": f"k{i}", "regex": rng.choice(regexes)}
+            kind = rng.randrange(3)
+            if kind == 1:
+                f["search_from"] = {"after": rng.choice(markers)}
+            elif kind == 2:
+                f["search_from"] = {"line": rng.randrange(-4, 5)}
+            fields.append(f)
+        compiled = compile_ruleset(RuleSet("(1)", "t.json", {"lot_rule": {"regex": "a"},
+                                                            "extract_rules": {"fields": fields}}))
+        expected = _reference_fields(text, fields)
+        scanner = FieldScanner(compiled.lot_pattern, compiled.lot_prefilter, compiled.fields)
+        source = "ab" + text + "\nErg b"
+        for block in ((text, 0, len(text)), (source, 2, 2 + len(text))):
+            got = {k: (m.group(1) if m.groups() else m.group(0)).strip() if m else None
+                   for k, _, m in scanner.scan(*block).fields()}
+            assert got == expected, (text, fields)
+
+
+def test_field_scanner_shares_windows_and_searches():
+    after = {"after": "Validierungskriterien"}
+    fields = [
+        {"key": "lot_id", "regex": r"Kit\s+(\S+)"},
+        {"key": "ug", "regex": r"\bPCQ1\s+(\d+)<=", "search_from": after},
+        {"key": "og", "regex": r"<=PCQ1<=(\d+)", "search_from": after},
+        {"key": "ug_again", "regex": r"\bPCQ1\s+(\d+)<=", "search_from": after},
+        {"key": "first", "regex": r"(\w+)", "search_from": {"line": 0}},
+    ]
+    compiled = compile_ruleset(RuleSet("(1)", "t.json", {"lot_rule": {"regex": r"Kit\s+(\S+)"},
+                                                        "extract_rules": {"fields": fields}}))
+    scanner = FieldScanner(compiled.lot_pattern, compiled.lot_prefilter, compiled.fields)
+    assert len(scanner.windows) == 3  # block, after marker, from line 0
+    assert len(scanner.searches) == 4  # lot/lot_id, ug/ug_again, og, first
+    assert scanner.fields[0][2] == scanner.lot
+
+    text = "Kit E1 PCQ1 9<=PCQ1<=8\nValidierungskriterien\nPCQ1 1<=PCQ1<=2"
+    got = {k: m.group(1) for k, _, m in scanner.scan(text, 0, len(text)).fields()}
+    assert got == {"lot_id": "E1", "ug": "1", "og": "2", "ug_again": "1", "first": "Kit"}
+
+
+def test_field_scanner_groups_searches_sharing_a_leading_literal():
+    fields = [
+        {"key": "lot_id", "regex": r"Kit\s+(E[0-9A-Za-z]+)\s+\d{6}"},
+        {"key": "expiry", "regex": r"Kit\s+E[0-9A-Za-z]+\s+(\d{6})"},
+        {"key": "ist_s1", "regex": r"\bS1\b.*?\s(\d+(?:[\.,]\d+)?)\s+O\.D\."},
+        {"key": "min_s1", "regex": r"\bS1\b.*?>\s*(\d+(?:[\.,]\d+)?)\s+O\.D\."},
+        {"key": "date", "regex": r"Datum:\s*(\S+)"},
+    ]
+    compiled = compile_ruleset(RuleSet("(1)", "t.json", {"lot_rule": {"regex": r"Kit\s+(\S+)\s+\d{6}"},
+                                                        "extract_rules": {"fields": fields}}))
+    scanner = FieldScanner(compiled.lot_pattern, compiled.lot_prefilter, compiled.fields)
+    search = {key: i for key, _, i, _ in scanner.fields}
+    assert sorted((literal.pattern, ids) for literal, ids in scanner.groups) == [
+        ("Kit", (scanner.lot, search["lot_id"], search["expiry"])),
+        ("S1", (search["ist_s1"], search["min_s1"])),
+    ]
+    assert "date" not in {k for k, _, i, _ in scanner.fields if i in scanner.group_of}
+
+    text = "KitS1 Kit X 1\nS1x 0,5 O.D. Datum: 01.02.2024\nS1 0,7 O.D. >0,2 O.D.\nKit E12 240101"
+    got = {k: m.group(1) for k, _, m in scanner.scan(text, 0, len(text)).fields()}
+    assert got == {"lot_id": "E12", "expiry": "240101", "ist_s1": "0,7", "min_s1": "0,2", "date": "01.02.2024"}
+    assert scanner.scan(text, 0, len(text)).lot().group(1) == "E12"
+
+
+def test_risky_field_is_cut_off_by_time_budget():
+    fields = [
+        {"key": "test", "regex": r"Test:\s*(\w+)"},
+        {"key": "date", "regex": r"Datum:\s*(\S+)"},
+        {"key": "time", "regex": r"Zeit:\s*(\S+)"},
+        {"key": "hang", "regex": r"(\w+\s?)+:$"},
+    ]
+    compiled = compile_ruleset(RuleSet("(1)", "t.json", {"lot_rule": {"regex": r"Lot\s+(\S+)"},
+                                                        "extract_rules": {"fields": fields}}))
+    assert compiled.fields[3].risk == "nested quantifier"
+    assert not any(f.risk for f in compiled.fields[:3])
+
+    text = "Lot L1 Test: T Datum: d Zeit: z\n" + "word " * 40 + "!"
+    t0 = time.perf_counter()
+    with pytest.raises(ExtractionError, match=r"hang after \d+\.\d+s \(nested quantifier\)"):
+        extract_record(text, compiled, regex_budget_s=0.5)
+    assert time.perf_counter() - t0 < 5
+
+    fields[3]["regex"] = r"(\w+\s?)+!"
+    compiled = compile_ruleset(RuleSet("(1)", "t.json", {"lot_rule": {"regex": r"Lot\s+(\S+)"},
+                                                        "extract_rules": {"fields": fields}}))
+    rec = extract_record(text, compiled, regex_budget_s=5.0)
+    assert rec.data["hang"] == "word"
+    assert rec == extract_record(text, compiled, regex_budget_s=None)
+
+
+def test_guarded_searches_see_only_their_window():
+    fields = [
+        {"key": "test", "regex": r"^(Assay\s?)+A", "required": True},
+        {"key": "date", "regex": r"\bDatum:\s*(\S+)", "required": True},
+        {"key": "time", "regex": r"(?<=Zeit: )(\S+)", "required": True},
+        {"key": "value", "regex": r"((\d+,?)+) U", "search_from": {"after": r"(Ergebnis\s?)+"}},
+    ]
+    compiled = compile_ruleset(RuleSet("(1111)", "t.json", {"lot_rule": {"regex": r"Lot:\s*(\S+)"},
+                                                           "extract_rules": {"fields": fields}}))
+    assert compiled.fields[0].risk and compiled.fields[3].risk and compiled.fields[3].after_risk
+
+    block = "Assay A (1111) Lot: L42\nDatum: 2024-01-02 Zeit: 10:11:12\nErgebnis\n1,25 U\nende"
+    # word characters right before the view: \b, ^ and lookbehind must not see them
+    source = "xx Zeit: 99 Datum" + block + "tail"
+    view = BlockView(source, 17, 17 + len(block))
+    guarded = extract_record(view, compiled, regex_budget_s=5.0)
+    assert guarded == extract_record(view, compiled, regex_budget_s=None) == extract_record(block, compiled)
+    assert guarded.data["value"] == "1,25"
+
+
+def test_guard_worker_failure_is_an_extraction_error(monkeypatch):
+    assert regexguard._MP_CONTEXT.get_start_method() in ("forkserver", "spawn")
+    with pytest.raises(RegexWorkerError, match="ZeroDivisionError"):
+        RegexGuard().call(5.0, divmod, 1, 0)
+
+    class _Broken:
+        def call(self, *args):
+            raise RegexWorkerError("regex worker died: EOFError")
+
+    monkeypatch.setattr(scanner_module, "shared_guard", _Broken)
+    fields = [{"key": "test", "regex": r"(\w+\s?)+:", "required": True}]
+    with pytest.raises(ExtractionError, match="regex worker died"):
+        extract_record("Lot: L1 Test:", RuleSet("(1)", "t.json", {"lot_rule": {"regex": r"Lot:\s*(\S+)"},
+                                                                   "extract_rules": {"fields": fields}}))
+
+
+def test_guard_calls_do_not_wait_for_each_other():
+    guard = RegexGuard(max_idle=2)
+    threads = [threading.Thread(target=guard.call, args=(10.0, time.sleep, 1.0)) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # both calls ran at once, each in its own worker, and both workers are kept for reuse
+    assert len(guard._idle) == 2
+    guard.close()
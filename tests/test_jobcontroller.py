@@ -0,0 +1,157 @@
+import json
+import shutil
+import time
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+from src.jobcontroller.api import JobController, submit, submit_batch
+from src.normalizer import api as normalizer_api
+from src.normalizer.api import normalize_text as real_normalize
+from src.writer.api import materialize, open_write_behind_queue
+
+
+REPO = Path(__file__).resolve().parent.parent
+
+
+def _project(root: Path) -> Path:
+    shutil.copytree(REPO / "rules", root / "rules")
+    shutil.copytree(REPO / "input", root / "input")
+    return root
+
+
+def _workbooks(root: Path):
+    out = {}
+    for path in sorted((root / "output" / "final").glob("*.xlsx")):
+        wb = load_workbook(path)
+        out[path.name] = {ws.title: [[c.value for c in row] for row in ws.iter_rows()] for ws in wb.worksheets}
+    return out
+
+
+def test_submit_batch_matches_single_submits(tmp_path: Path):
+    single = _project(tmp_path / "single")
+    batch = _project(tmp_path / "batch")
+    names = ["sample_single.pdf", "sample_multi.pdf"]
+
+    expected = [submit(str(single / "input" / n), str(single)) for n in names]
+    results = submit_batch([str(batch / "input" / n) for n in names], str(batch))
+
+    assert [r.status for r in results] == [r.status for r in expected] == ["DONE", "DONE"]
+    assert [r.details["assay_keys"] for r in results] == [r.details["assay_keys"] for r in expected]
+    assert _workbooks(batch) == _workbooks(single)
+    state = json.loads((batch / "jobs" / f"{results[1].job_id}.json").read_text(encoding="utf-8"))
+    split = next(s for s in state["steps"] if s["step"] == "contentsplitter")
+    assert split["pages"] == {"(5f03)": [1, 2], "(c4d1)": [3, 4], "(3c84)": [5, 6], "(42d4)": [7, 8]}
+    assert not list((batch / "locks").iterdir())
+
+    again = submit_batch([str(batch / "input" / n) for n in names], str(batch))
+    assert [r.status for r in again] == ["SKIPPED", "SKIPPED"]
+
+
+def test_write_behind_mode_matches_batch_mode(tmp_path: Path):
+    batch = _project(tmp_path / "batch")
+    behind = _project(tmp_path / "behind")
+    names = ["sample_single.pdf", "sample_multi.pdf"]
+
+    expected = submit_batch([str(batch / "input" / n) for n in names], str(batch))
+    with open_write_behind_queue(max_delay_s=0.05) as queue:
+        results = JobController(write_behind=queue).submit_batch([str(behind / "input" / n) for n in names], str(behind))
+
+    assert [r.status for r in results] == [r.status for r in expected] == ["DONE", "DONE"]
+    assert [[w["status"] for w in r.details["writes"]] for r in results] == \
+        [[w["status"] for w in r.details["writes"]] for r in expected]
+    assert _workbooks(behind) == _workbooks(batch)
+    assert not list((behind / "locks").iterdir())
+
+
+def test_strip_furniture_is_opt_in(tmp_path: Path):
+    plain = _project(tmp_path / "plain")
+    stripped = _project(tmp_path / "stripped")
+    pdf = "sample_multi.pdf"
+
+    expected = submit(str(plain / "input" / pdf), str(plain))
+    result = JobController(strip_furniture=True).submit(str(stripped / "input" / pdf), str(stripped))
+
+    assert result.status == expected.status == "DONE"
+    assert result.details["assay_keys"] == expected.details["assay_keys"]
+    assert _workbooks(stripped) == _workbooks(plain)
+    normalized = [(root / "jobs" / f"{expected.job_id}_normalized.txt").read_text(encoding="utf-8")
+                  for root in (plain, stripped)]
+    assert len(normalized[1]) < len(normalized[0])
+
+
+def test_write_behind_job_does_not_wait_for_the_queue_delay(tmp_path: Path):
+    root = _project(tmp_path)
+    with open_write_behind_queue(max_delay_s=60) as queue:
+        t0 = time.perf_counter()
+        result = JobController(write_behind=queue).submit(str(root / "input" / "sample_single.pdf"), str(root))
+        elapsed = time.perf_counter() - t0
+    assert result.status == "DONE"
+    assert elapsed < 30
+
+
+def test_staging_mode_materializes_to_the_same_workbooks(tmp_path: Path):
+    batch = _project(tmp_path / "batch")
+    staged = _project(tmp_path / "staged")
+    names = ["sample_single.pdf", "sample_multi.pdf"]
+
+    expected = submit_batch([str(batch / "input" / n) for n in names], str(batch))
+    results = JobController(staging=True).submit_batch([str(staged / "input" / n) for n in names], str(staged))
+    assert not list((staged / "output" / "final").glob("*.xlsx"))
+
+    materialize(str(staged / "output" / "final"))
+    assert [[w["status"] for w in r.details["writes"]] for r in results] == \
+        [[w["status"] for w in r.details["writes"]] for r in expected]
+    assert _workbooks(staged) == _workbooks(batch)
+
+
+def _set_parse_regions(root: Path, ruleset_file: str, regions) -> None:
+    path = root / "rules" / ruleset_file
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if regions is None:
+        data.pop("parse_regions", None)
+    else:
+        data["parse_regions"] = regions
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def test_region_probe_stops_at_first_assay_without_regions(tmp_path: Path, monkeypatch):
+    root = _project(tmp_path)
+    _set_parse_regions(root, "Anti-TPO IgG.json", None)  # (5f03), first assay of sample_multi
+    probed = []
+    monkeypatch.setattr(normalizer_api, "normalize_text", lambda pages: probed.append(1) or real_normalize(pages))
+
+    plan = JobController()._plan_parse_regions(str(root / "input" / "sample_multi.pdf"), str(root / "rules"),
+                                                str(root / "rules" / "index.json"), str(tmp_path / "cache"))
+    assert plan is None
+    assert len(probed) == 1
+
+
+def test_clip_without_the_assay_key_falls_back_to_full_parse(tmp_path: Path):
+    root = _project(tmp_path)
+    _set_parse_regions(root, "25-OH Vitamin D.json", [{"page_offset": 0, "clip": [0, 700, 596, 842]}])
+
+    result = submit(str(root / "input" / "sample_single.pdf"), str(root))
+
+    assert result.status == "DONE"
+    assert result.details["assay_keys"] == ["(6bd7)"]
+    state = json.loads((root / "jobs" / f"{result.job_id}.json").read_text(encoding="utf-8"))
+    fallback = [s for s in state["steps"] if s.get("reason") == "assays_differ"]
+    assert fallback and fallback[0]["planned"] == ["(6bd7)"]
+
+
+def test_clip_missing_a_required_field_falls_back_to_full_parse(tmp_path: Path):
+    full = _project(tmp_path / "full")
+    clipped = _project(tmp_path / "clipped")
+    # header clip with assay name and key, but without the "Kit" line (lot_rule, lot_id)
+    _set_parse_regions(clipped, "25-OH Vitamin D.json", [{"page_offset": 0, "clip": [0, 0, 596, 80]}])
+
+    expected = submit(str(full / "input" / "sample_single.pdf"), str(full))
+    result = submit(str(clipped / "input" / "sample_single.pdf"), str(clipped))
+
+    assert result.status == expected.status == "DONE"
+    assert _workbooks(clipped) == _workbooks(full)
+    state = json.loads((clipped / "jobs" / f"{result.job_id}.json").read_text(encoding="utf-8"))
+    fallback = [s for s in state["steps"] if s.get("reason") == "clip_incomplete"]
+    assert len(fallback) == 1 and "lot_id not found" in fallback[0]["error"]
+    assert [s["page_count"] for s in state["steps"] if s["step"] == "parser"] == [3, 3]
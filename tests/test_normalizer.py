@@ -1,4 +1,4 @@
-from src.normalizer.api import normalize_lines
+from src.normalizer.api import PageIndex, normalize_lines, normalize_text
 
 def test_normalize_preserves_line_count():
     inp = ["A   B", "  C\t\tD  ", ""]
@@ -6,3 +6,21 @@ def test_normalize_preserves_line_count():
     assert len(out) == len(inp)
     assert out[0] == "A B"
     assert out[1] == "C D"
+
+
+def test_normalize_text_matches_line_path():
+    pages = [["A   B", "  C\t\tD  ", ""], [], ["\xa0x\x0b y \r", "multi\n  line  "], ["", ""]]
+    flat = [line for page in pages for line in page]
+    assert normalize_text(iter(pages)) == "\n".join(normalize_lines(flat))
+    assert normalize_text([]) == ""
+
+
+def test_normalize_text_indexes_page_offsets():
+    pages = [["  A  ", "B"], [], ["C\t\tD"], ["", ""], ["E"]]
+    index = PageIndex()
+    text = normalize_text(iter(pages), index)
+    assert text == normalize_text(pages) == "A\nB\nC D\n\n\nE"
+    assert index.starts == [0, 4, 8, 10]
+    assert index.page_numbers == [1, 3, 4, 5]
+    assert [index.page_at(i) for i in range(len(text))] == [1, 1, 1, 1, 3, 3, 3, 3, 4, 4, 5]
+    assert PageIndex().page_at(0) is None
@@ -0,0 +1,195 @@
+import hashlib
+from pathlib import Path
+
+import pytest
+
+from src.parser.api import ParserOptions, ParseRegion, iter_pages, parse
+from src.parser.parser import ParserError
+
+INPUT_DIR = Path(__file__).resolve().parent.parent / "input"
+
+
+@pytest.mark.parametrize("name", ["sample_single.pdf", "sample_multi.pdf"])
+def test_sweep_clustering_matches_scan(name: str):
+    pdf = str(INPUT_DIR / name)
+    scan = parse(pdf, ParserOptions(clustering="scan"))
+    sweep = parse(pdf, ParserOptions(clustering="sweep"))
+    assert [p.lines for p in sweep.pages] == [p.lines for p in scan.pages]
+    assert [p.page_number for p in sweep.pages] == [p.page_number for p in scan.pages]
+
+
+def test_unknown_clustering_rejected():
+    with pytest.raises(ParserError, match="unknown clustering strategy: bogus"):
+        parse(str(INPUT_DIR / "sample_single.pdf"), ParserOptions(clustering="bogus"))
+
+
+@pytest.mark.parametrize("name", ["sample_single.pdf", "sample_multi.pdf"])
+def test_lean_extraction_matches_dict(name: str):
+    pdf = str(INPUT_DIR / name)
+    ref = parse(pdf, ParserOptions(extraction="dict"))
+    lean = parse(pdf, ParserOptions(extraction="lean"))
+    assert [p.lines for p in lean.pages] == [p.lines for p in ref.pages]
+
+
+def test_lean_extraction_matches_dict_on_regions():
+    pdf = str(INPUT_DIR / "sample_multi.pdf")
+    regions = (ParseRegion(1, (0.0, 0.0, 596.0, 98.0)), ParseRegion(2, (40.0, 300.0, 400.0, 700.0)))
+    ref = parse(pdf, ParserOptions(extraction="dict", regions=regions))
+    lean = parse(pdf, ParserOptions(extraction="lean", regions=regions))
+    assert [p.lines for p in lean.pages] == [p.lines for p in ref.pages]
+    assert lean.pages[1].lines
+
+
+@pytest.mark.parametrize("name", ["sample_single.pdf", "sample_multi.pdf"])
+def test_numpy_layout_matches_python(name: str):
+    pdf = str(INPUT_DIR / name)
+    ref = parse(pdf, ParserOptions(layout="python"))
+    vec = parse(pdf, ParserOptions(layout="numpy"))
+    assert [p.lines for p in vec.pages] == [p.lines for p in ref.pages]
+
+
+def test_numpy_layout_matches_python_on_tolerance_edges():
+    import random
+
+    from src.parser.parser import Parser, _Fragment
+
+    rng = random.Random(7)
+    parser = Parser(ParserOptions(layout="python"))
+    vec = Parser(ParserOptions(layout="numpy"))._numpy_layout
+    assert vec is not None
+    for _ in range(50):
+        frags = []
+        for _ in range(rng.randint(1, 60)):
+            y0 = rng.choice([10.0, 11.0, 12.0, 12.5, 14.0, 30.0]) + rng.random()
+            x0 = rng.choice([0.0, 20.0, 20.0, 41.5, 100.0]) + rng.random() * 3
+            frags.append(_Fragment(text=rng.choice(["a", "bb", " ", "c d"]), x0=x0, y0=y0, x1=x0 + 10.0, y1=y0 + 8.0))
+        expected = []
+        for cluster in parser._cluster_fragments_into_lines(frags):
+            line = parser._join_line_fragments(cluster)
+            if line.strip():
+                expected.append(line)
+        assert vec.build_lines(frags) == expected
+
+
+def test_numpy_layout_falls_back_without_numpy(monkeypatch):
+    import src.parser.parser as parser_module
+
+    monkeypatch.setattr(parser_module, "numpy_available", lambda: False)
+    pdf = str(INPUT_DIR / "sample_single.pdf")
+    assert parser_module.Parser(ParserOptions(layout="numpy"))._numpy_layout is None
+    assert [p.lines for p in parse(pdf, ParserOptions(layout="numpy")).pages] == [p.lines for p in parse(pdf).pages]
+
+
+def test_parallel_parse_matches_sequential():
+    pdf = str(INPUT_DIR / "sample_multi.pdf")
+    seq = parse(pdf)
+    par = parse(pdf, ParserOptions(workers=2, parallel_min_pages=1))
+    assert [p.page_number for p in par.pages] == [p.page_number for p in seq.pages]
+    assert [p.lines for p in par.pages] == [p.lines for p in seq.pages]
+
+
+def test_iter_pages_matches_parse():
+    pdf = str(INPUT_DIR / "sample_multi.pdf")
+    it = iter_pages(pdf)
+    assert not isinstance(it, list)
+    streamed = list(it)
+    assert [(p.page_number, p.lines) for p in streamed] == [(p.page_number, p.lines) for p in parse(pdf).pages]
+
+
+def test_parse_cache_hit_and_eviction(tmp_path: Path):
+    pdf = str(INPUT_DIR / "sample_single.pdf")
+    cache_dir = tmp_path / "cache"
+    ref = parse(pdf)
+
+    first = parse(pdf, ParserOptions(cache_dir=str(cache_dir)))
+    assert len(list(cache_dir.iterdir())) == 1
+    second = parse(pdf, ParserOptions(cache_dir=str(cache_dir)))
+    assert [(p.page_number, p.lines) for p in first.pages] == [(p.page_number, p.lines) for p in ref.pages]
+    assert [(p.page_number, p.lines) for p in second.pages] == [(p.page_number, p.lines) for p in ref.pages]
+
+    # a caller-supplied digest is the cache key: the hit does not touch the file at all
+    digest = hashlib.sha256(Path(pdf).read_bytes()).hexdigest()
+    moved = parse(str(tmp_path / "missing.pdf"), ParserOptions(cache_dir=str(cache_dir)), digest=digest)
+    assert [(p.page_number, p.lines) for p in moved.pages] == [(p.page_number, p.lines) for p in ref.pages]
+
+    tiny = tmp_path / "tiny"
+    parse(pdf, ParserOptions(cache_dir=str(tiny), cache_max_bytes=1))
+    assert list(tiny.iterdir()) == []
+
+
+def test_parse_cache_streams_entries(tmp_path: Path):
+    pdf = str(INPUT_DIR / "sample_multi.pdf")
+    cache_dir = tmp_path / "cache"
+    options = ParserOptions(cache_dir=str(cache_dir), strip_furniture=True)
+    ref = parse(pdf, ParserOptions(strip_furniture=True))
+
+    # a miss writes each page as it is yielded; stopping early leaves no entry
+    it = iter_pages(pdf, options)
+    next(it)
+    assert [p.name.endswith(".tmp") for p in cache_dir.iterdir()] == [True]
+    it.close()
+    assert list(cache_dir.iterdir()) == []
+
+    first = parse(pdf, options)
+    (entry,) = cache_dir.iterdir()
+    hit = parse(pdf, options)
+    for doc in (first, hit):
+        assert [(p.page_number, p.lines) for p in doc.pages] == [(p.page_number, p.lines) for p in ref.pages]
+        assert doc.meta["furniture"] == ref.meta["furniture"]
+
+    # damage found while streaming a hit: the PDF is parsed again from the first missing page
+    entry.write_bytes(entry.read_bytes()[:entry.stat().st_size // 2])
+    repaired = parse(pdf, options)
+    assert [(p.page_number, p.lines) for p in repaired.pages] == [(p.page_number, p.lines) for p in ref.pages]
+    assert repaired.meta["furniture"] == ref.meta["furniture"]
+    assert [(p.page_number, p.lines) for p in parse(pdf, options).pages] == \
+        [(p.page_number, p.lines) for p in ref.pages]
+
+
+def test_region_parse_only_extracts_clips():
+    pdf = str(INPUT_DIR / "sample_multi.pdf")
+    full = parse(pdf)
+    header = (0.0, 0.0, 596.0, 98.0)
+    clipped = parse(pdf, ParserOptions(regions=(ParseRegion(1, header), ParseRegion(3, header))))
+    assert [p.page_number for p in clipped.pages] == [p.page_number for p in full.pages]
+    assert clipped.pages[0].lines == full.pages[0].lines[:len(clipped.pages[0].lines)]
+    assert "(5f03)" in "\n".join(clipped.pages[0].lines)
+    assert "(c4d1)" in "\n".join(clipped.pages[2].lines)
+    assert clipped.pages[1].lines == []
+    assert len(clipped.pages[0].lines) < len(full.pages[0].lines)
+
+
+@pytest.mark.parametrize("name", ["sample_single.pdf", "sample_multi.pdf"])
+def test_low_memory_profile_matches_default(name: str):
+    pdf = str(INPUT_DIR / name)
+    ref = parse(pdf)
+    lean = parse(pdf, ParserOptions(low_memory=True, store_max_bytes=0))
+    assert [p.lines for p in lean.pages] == [p.lines for p in ref.pages]
+
+
+def test_strip_furniture_keeps_one_header_per_section():
+    pdf = str(INPUT_DIR / "sample_multi.pdf")
+    full = parse(pdf)
+    stripped = parse(pdf, ParserOptions(strip_furniture=True))
+    text = "\n".join(line for p in stripped.pages for line in p.lines)
+    assert len(text) < len("\n".join(line for p in full.pages for line in p.lines))
+    assert stripped.pages[0].lines == full.pages[0].lines
+    for key in ("(5f03)", "(c4d1)", "(3c84)", "(42d4)"):
+        assert text.count(key) == 1
+    # every assay section keeps its own plate header
+    assert text.count("Plattenname:") == 4
+    furniture = stripped.meta["furniture"]
+    assert any(f["band"] == "top" and f["text"].startswith("Plattenname:") for f in furniture)
+
+
+def test_furniture_filter_starts_new_section_on_new_header():
+    from src.parser.furniture import FurnitureFilter
+
+    f = FurnitureFilter(2.0)
+    head_a = ("top:a", (0.0, 0.0))
+    head_b = ("top:b", (0.0, 0.0))
+    plate = ("top:plate", (0.0, 36.0))
+    assert f.apply(1, ["A", "plate", "x"], [head_a, plate, None]) == ["A", "plate", "x"]
+    assert f.apply(2, ["A", "plate", "y"], [head_a, ("top:plate", (0.0, 36.1)), None]) == ["y"]
+    assert f.apply(3, ["B", "plate", "z"], [head_b, plate, None]) == ["B", "plate", "z"]
+    assert [r["repeated_on"] for r in f.furniture()] == [[2], [2]]
@@ -0,0 +1,145 @@
+import copy
+import json
+import os
+import re
+from pathlib import Path
+
+import pytest
+
+from src.ruleresolver.api import list_assay_keys, resolve_ruleset
+from src.ruleresolver import compiler
+from src.ruleresolver.compiler import (
+    UNPARSED_RISK,
+    backtracking_risk,
+    context_flags,
+    leading_literal,
+    line_sensitive,
+    prefilter_literal,
+)
+from src.ruleresolver.registry import RuleResolverError
+
+
+def _write_rules(rules: Path, assay_name: str = "A") -> Path:
+    rules.mkdir(exist_ok=True)
+    index = rules / "index.json"
+    index.write_text(json.dumps({"assays": [{"assay_key": "(1111)", "ruleset_file": "a.json"}]}), encoding="utf-8")
+    ruleset = {"assay_name": assay_name, "assay_key": "(1111)", "lot_rule": {}, "extract_rules": {}, "excel_rules": {}}
+    (rules / "a.json").write_text(json.dumps(ruleset), encoding="utf-8")
+    return index
+
+
+def test_registry_shares_rulesets_until_file_changes(tmp_path: Path):
+    rules = tmp_path / "rules"
+    index = _write_rules(rules)
+
+    first = resolve_ruleset("(1111)", str(rules), str(index))
+    assert resolve_ruleset("(1111)", str(rules), str(index)) is first
+    assert list_assay_keys(str(index)) == ["(1111)"]
+
+    _write_rules(rules, assay_name="Assay B")
+    st = (rules / "a.json").stat()
+    os.utime(rules / "a.json", ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    reloaded = resolve_ruleset("(1111)", str(rules), str(index))
+    assert reloaded is not first
+    assert reloaded.data["assay_name"] == "Assay B"
+
+
+
+def test_registry_rulesets_are_read_only(tmp_path: Path):
+    rules = tmp_path / "rules"
+    index = _write_rules(rules)
+    rs = resolve_ruleset("(1111)", str(rules), str(index))
+
+    with pytest.raises(TypeError, match="read-only"):
+        rs.data["assay_name"] = "X"
+    with pytest.raises(TypeError, match="read-only"):
+        rs.data["excel_rules"].setdefault("column_mapping", {})
+    assert resolve_ruleset("(1111)", str(rules), str(index)).data["assay_name"] == "A"
+
+    # JSON-Export und Kopien bleiben möglich
+    assert json.loads(json.dumps(rs.data))["assay_name"] == "A"
+    assert copy.deepcopy(rs.data) == rs.data
+
+
+def test_registry_rejects_invalid_parse_regions(tmp_path: Path):
+    rules = tmp_path / "rules"
+    index = _write_rules(rules)
+    data = json.loads((rules / "a.json").read_text(encoding="utf-8"))
+    data["parse_regions"] = [{"clip": [0, 0, 10]}]
+    (rules / "a.json").write_text(json.dumps(data), encoding="utf-8")
+    with pytest.raises(RuleResolverError, match=r"parse_regions entry requires clip \[x0, y0, x1, y1\]"):
+        resolve_ruleset("(1111)", str(rules), str(index))
+
+
+def test_compiled_ruleset_is_cached_and_validated(tmp_path: Path):
+    from src.ruleresolver.api import resolve_compiled_ruleset
+
+    rules = tmp_path / "rules"
+    index = _write_rules(rules)
+    data = json.loads((rules / "a.json").read_text(encoding="utf-8"))
+    data["lot_rule"] = {"regex": r"Lot\s+(\S+)"}
+    data["extract_rules"] = {"fields": [{"key": "v", "regex": r"V=(\d+)", "search_from": {"after": "Ergebnis"}}]}
+    (rules / "a.json").write_text(json.dumps(data), encoding="utf-8")
+
+    compiled = resolve_compiled_ruleset("(1111)", str(rules), str(index))
+    assert resolve_compiled_ruleset("(1111)", str(rules), str(index)) is compiled
+    assert compiled.ruleset is resolve_ruleset("(1111)", str(rules), str(index))
+    assert compiled.lot_pattern.search("Lot E123").group(1) == "E123"
+    assert compiled.fields[0].after.pattern == "Ergebnis"
+
+    data["extract_rules"]["fields"][0]["regex"] = "V=(\\d+"
+    (rules / "a.json").write_text(json.dumps(data), encoding="utf-8")
+    st = (rules / "a.json").stat()
+    os.utime(rules / "a.json", ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    with pytest.raises(Exception, match="invalid regex in field v"):
+        resolve_compiled_ruleset("(1111)", str(rules), str(index))
+
+
+def test_prefilter_literal_only_behind_zero_width_assertions():
+    assert prefilter_literal(re.compile(r"\bPCQ1\s+(\d+)")) == "PCQ1"
+    assert prefilter_literal(re.compile(r"\b(PC)(Q1)\s")) == "PCQ1"
+    assert prefilter_literal(re.compile(r"(?m)^Ergebnis")) == "Ergebnis"
+    # sre handles a leading literal itself; anchors, alternation, case folding: no prefilter
+    for regex in (r"Datum:\s*(\d+)", r"^Valid", r"\b(?:PCQ1|NCQ1)", r"(?i)\bPCQ1", r"\bP"):
+        assert prefilter_literal(re.compile(regex)) == ""
+
+
+def test_backtracking_risk_flags_bounded_and_adjacent_repeats():
+    for regex, reason in ((r"(.*a){20}", "nested quantifier"), (r"(\w+\s?)+:$", "nested quantifier"),
+                          (r"\s*\s*\s*x", "adjacent quantifiers"), (r"\d+\s*\w+", "adjacent quantifiers"),
+                          (r"(a|ab)*", "overlapping alternation in repeat")):
+        assert backtracking_risk(re.compile(regex)) == reason, regex
+    # disjoint or separated repeats, fixed-width repeats and the shipped rules stay unguarded
+    for regex in (r"Datum:\s*(\S+)", r"\d+\s+\d+", r"(ab){3}c*", r".*a.*",
+                  r"\bPCQ1\s+\d+(?:[\.,]\d+)?<=PCQ1<=\d+(?:[\.,]\d+)?\s+\d+(?:[\.,]\d+)?<=\s*(\d+(?:[\.,]\d+)?)\s*<="):
+        assert backtracking_risk(re.compile(regex)) == "", regex
+
+
+def test_context_flags_come_from_the_parsed_pattern():
+    cases = {
+        r"[^\s]+ (\S+)": (False, False), r"\\b[$^]": (False, False), r"[\b]x": (False, False),
+        r"^Lot": (True, False), r"(?m)x|^y": (True, False), r"(?:a|\Ab)": (True, False),
+        r"(?<=Zeit: )(\S+)": (True, False), r"(?<!x)y": (True, False), r"(?=a)\w": (False, False),
+        r"(x\b)+": (False, True), r"\Bx": (False, True),
+    }
+    for regex, flags in cases.items():
+        assert context_flags(re.compile(regex)) == flags, regex
+    assert not line_sensitive(re.compile(r"[^\s$]+\\A"))
+    for regex in (r"x$", r"\Z", r"(?=a)", r"a\b"):
+        assert line_sensitive(re.compile(regex)), regex
+
+
+def test_unparsable_pattern_is_guarded_and_logged(monkeypatch, caplog):
+    pattern = re.compile(r"\bPCQ1\s+(\d+)")
+
+    def reject(*args):
+        raise ValueError("unsupported")
+
+    monkeypatch.setattr(compiler._sre_parse, "parse", reject)
+    with caplog.at_level("WARNING", logger="src.ruleresolver.compiler"):
+        assert prefilter_literal(pattern) == "" and leading_literal(pattern) == ""
+        assert backtracking_risk(pattern) == UNPARSED_RISK
+        assert context_flags(pattern) == (True, True)
+        assert line_sensitive(pattern)
+    assert len(caplog.records) == 5
+    assert caplog.records[0].getMessage() == f"regex analysis skipped for {pattern.pattern!r}: ValueError: unsupported"
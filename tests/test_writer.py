@@ -0,0 +1,260 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from openpyxl import load_workbook
+
+from src.extractor.api import AssayRecord
+from src.ruleresolver.api import RuleSet
+from src.writer import workbooklock
+from src.writer import writer as writer_module
+from src.writer.api import (
+    WriteBehindQueue,
+    materialize,
+    open_materializer,
+    open_write_behind_queue,
+    rebuild_dedupe_index,
+    stage_records,
+    write_record,
+    write_records,
+)
+from src.writer.workbooklock import WorkbookLock, lock_path_for
+from src.writer.writer import Writer, WriterError
+
+
+RULESET = RuleSet(assay_key="(1111)", ruleset_file="a.json", data={
+    "assay_name": "Assay A",
+    "excel_rules": {"column_mapping": {"date": "Datum"}},
+})
+
+
+def _record(lot: str, run: int) -> AssayRecord:
+    return AssayRecord(assay_key="(1111)", lot_id=lot, dedupe_key=f"T|2024-01-0{run}|10:00:00",
+                       data={"date": f"0{run}.01.2024", "run": run})
+
+
+def _cells(path: Path):
+    wb = load_workbook(path)
+    return {ws.title: [[c.value for c in row] for row in ws.iter_rows()] for ws in wb.worksheets}
+
+
+def test_write_records_matches_sequential_writes(tmp_path: Path, monkeypatch):
+    records = [_record("L1", 1), _record("L2", 2), _record("L1", 3), _record("L1", 1), _record("L2", 4)]
+    seq_dir, batch_dir = tmp_path / "seq", tmp_path / "batch"
+
+    expected = [write_record(r, RULESET, str(seq_dir)) for r in records]
+
+    saves = []
+    real_save = writer_module.Workbook.save
+    monkeypatch.setattr(writer_module.Workbook, "save", lambda wb, path: (saves.append(path), real_save(wb, path)))
+    results = write_records([(r, RULESET) for r in records], str(batch_dir))
+
+    assert [r.status for r in results] == [r.status for r in expected] == \
+        ["created", "appended", "appended", "skipped", "appended"]
+    assert [r.sheet_name for r in results] == ["L1", "L2", "L1", "L1", "L2"]
+    assert len(saves) == 1
+    assert _cells(batch_dir / "Assay_A.xlsx") == _cells(seq_dir / "Assay_A.xlsx")
+    assert not list(batch_dir.glob(".*.lock"))
+
+
+def test_skipped_records_do_not_open_the_workbook(tmp_path: Path, monkeypatch):
+    write_records([(_record("L1", 1), RULESET), (_record("L2", 2), RULESET)], str(tmp_path))
+    assert (tmp_path / ".dedupe_index.sqlite").exists()
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("workbook opened for a pure dedupe hit")
+
+    monkeypatch.setattr(writer_module, "load_workbook", _fail)
+    results = write_records([(_record("L1", 1), RULESET), (_record("L2", 2), RULESET)], str(tmp_path))
+    assert [r.status for r in results] == ["skipped", "skipped"]
+
+
+def test_dedupe_index_follows_manual_workbook_edits(tmp_path: Path):
+    write_records([(_record("L1", 1), RULESET), (_record("L1", 2), RULESET)], str(tmp_path))
+
+    # Zeile von Hand löschen: der Lauf muss wieder geschrieben werden
+    path = tmp_path / "Assay_A.xlsx"
+    wb = load_workbook(path)
+    wb["L1"].delete_rows(2)
+    wb.save(path)
+
+    results = write_records([(_record("L1", 1), RULESET), (_record("L1", 2), RULESET)], str(tmp_path))
+    assert [r.status for r in results] == ["appended", "skipped"]
+    assert rebuild_dedupe_index(str(tmp_path)) == {"Assay_A.xlsx": 2}
+
+
+OTHER_RULESET = RuleSet(assay_key="(2222)", ruleset_file="b.json", data={"assay_name": "Assay B", "excel_rules": {}})
+
+
+def _foreign_lock(path: Path, age_s: float = 0.0) -> Path:
+    lock = lock_path_for(path)
+    lock.write_text(json.dumps({"host": "elsewhere", "pid": os.getpid(), "token": "foreign"}), encoding="utf-8")
+    if age_s:
+        os.utime(lock, (time.time() - age_s, time.time() - age_s))
+    return lock
+
+
+def test_lock_on_one_workbook_does_not_block_others(tmp_path: Path):
+    _foreign_lock(tmp_path / "Assay_A.xlsx")
+    assert Writer(lock_timeout_s=0.1).write_record(_record("L1", 1), OTHER_RULESET, str(tmp_path)).status == "created"
+
+
+def test_held_workbook_lock_times_out(tmp_path: Path):
+    _foreign_lock(tmp_path / "Assay_A.xlsx")
+    with pytest.raises(WriterError, match="excel_writer_lock_timeout: .Assay_A.xlsx.lock"):
+        Writer(lock_timeout_s=0.1).write_record(_record("L1", 1), RULESET, str(tmp_path))
+
+
+def test_waiting_writer_proceeds_after_release(tmp_path: Path, monkeypatch):
+    lock = _foreign_lock(tmp_path / "Assay_A.xlsx")
+    waits = []
+    # the first backoff sleep stands in for the other writer finishing
+    monkeypatch.setattr(workbooklock.time, "sleep", lambda s: (waits.append(s), lock.unlink(missing_ok=True)))
+
+    assert Writer(lock_timeout_s=60).write_record(_record("L1", 1), RULESET, str(tmp_path)).status == "created"
+    assert len(waits) == 1
+    assert not lock.exists()
+
+
+def test_lock_older_than_stale_limit_is_broken(tmp_path: Path):
+    _foreign_lock(tmp_path / "Assay_A.xlsx", age_s=3600)
+    result = Writer(lock_timeout_s=0.1, lock_stale_after_s=600).write_record(_record("L1", 1), RULESET, str(tmp_path))
+    assert result.status == "created"
+    assert not list(tmp_path.glob(".*.lock*"))
+
+
+def test_stale_lock_is_taken_by_one_waiter_at_a_time(tmp_path: Path):
+    _foreign_lock(tmp_path / "Assay_A.xlsx", age_s=3600)
+    holders, peak = [], []
+
+    def hold(_):
+        with WorkbookLock(tmp_path / "Assay_A.xlsx", timeout_s=30, stale_after_s=600):
+            holders.append(1)
+            peak.append(len(holders))
+            time.sleep(0.02)
+            holders.pop()
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(hold, range(8)))
+    assert len(peak) == 8 and max(peak) == 1
+    assert not list(tmp_path.glob(".*.lock*"))
+
+
+def test_held_lock_is_kept_fresh_by_heartbeat(tmp_path: Path):
+    lock = WorkbookLock(tmp_path / "Assay_A.xlsx", stale_after_s=0.4)
+    with lock:
+        first = lock.path.stat().st_mtime
+        time.sleep(0.5)
+        assert lock.path.stat().st_mtime > first
+    assert not lock.path.exists()
+    assert not any(t.name.startswith("lock-heartbeat") for t in threading.enumerate())
+
+
+@pytest.mark.skipif(os.name == "nt", reason="owner pid check is POSIX only")
+def test_lock_of_dead_local_process_is_broken(tmp_path: Path):
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    lock = lock_path_for(tmp_path / "Assay_A.xlsx")
+    lock.write_text(json.dumps({"host": socket.gethostname(), "pid": proc.pid, "token": "dead"}), encoding="utf-8")
+    assert Writer(lock_timeout_s=0.1).write_record(_record("L1", 1), RULESET, str(tmp_path)).status == "created"
+    assert not lock.exists()
+
+
+def test_write_behind_queue_coalesces_and_reports_per_record(tmp_path: Path, monkeypatch):
+    records = [_record(f"L{i % 3}", i % 9 + 1) for i in range(24)]
+    seq_dir, queue_dir = tmp_path / "seq", tmp_path / "queue"
+    expected = [write_record(r, RULESET, str(seq_dir)) for r in records]
+
+    saves = []
+    real_save = writer_module.Workbook.save
+    monkeypatch.setattr(writer_module.Workbook, "save", lambda wb, path: (saves.append(path), real_save(wb, path)))
+
+    with open_write_behind_queue(max_batch=1000, max_delay_s=60) as queue:
+        with ThreadPoolExecutor(4) as pool:
+            futures = list(pool.map(lambda r: queue.submit(r, RULESET, str(queue_dir)), records))
+        assert not any(f.done() for f in futures)
+        queue.flush()
+        results = [f.result() for f in futures]
+
+    # submit-Reihenfolge der Threads ist beliebig, daher nur Mengen vergleichen
+    assert sorted(r.status for r in results) == sorted(r.status for r in expected)
+    assert len(saves) == 1
+    assert _cells(queue_dir / "Assay_A.xlsx").keys() == _cells(seq_dir / "Assay_A.xlsx").keys()
+    assert sum(len(rows) for rows in _cells(queue_dir / "Assay_A.xlsx").values()) == \
+        sum(len(rows) for rows in _cells(seq_dir / "Assay_A.xlsx").values())
+
+
+def test_write_behind_queue_flushes_after_max_delay(tmp_path: Path):
+    with open_write_behind_queue(max_batch=1000, max_delay_s=0.05) as queue:
+        future = queue.submit(_record("L1", 1), RULESET, str(tmp_path))
+        assert future.result(timeout=10).status == "created"
+
+
+def test_write_behind_queue_fails_pending_futures_when_writer_dies(tmp_path: Path):
+    class _Fatal(BaseException):
+        pass
+
+    class _DyingWriter:
+        def write_records(self, items, output_dir):
+            raise _Fatal("disk gone")
+
+    queue = WriteBehindQueue(_DyingWriter(), max_batch=1000, max_delay_s=60)
+    futures = [queue.submit(_record("L1", i), RULESET, str(tmp_path)) for i in (1, 2)]
+    queue.flush(block=False)
+    for f in futures:
+        with pytest.raises(RuntimeError, match="write-behind writer died: _Fatal: disk gone"):
+            f.result(timeout=10)
+    with pytest.raises(RuntimeError, match="closed"):
+        queue.submit(_record("L1", 3), RULESET, str(tmp_path))
+    queue.close()
+
+
+def test_stage_records_does_not_touch_workbooks(tmp_path: Path, monkeypatch):
+    write_records([(_record("L1", 1), RULESET)], str(tmp_path))
+    before = (tmp_path / "Assay_A.xlsx").stat().st_mtime_ns
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("workbook opened during staging")
+
+    monkeypatch.setattr(writer_module, "load_workbook", _fail)
+    monkeypatch.setattr(writer_module.Workbook, "save", _fail)
+    results = stage_records([(_record("L1", 1), RULESET), (_record("L1", 2), RULESET), (_record("L1", 2), RULESET)],
+                            str(tmp_path))
+
+    assert [r.status for r in results] == ["skipped", "appended", "skipped"]
+    assert (tmp_path / "Assay_A.xlsx").stat().st_mtime_ns == before
+
+
+def test_materialize_matches_write_records(tmp_path: Path):
+    records = [_record("L1", 1), _record("L2", 2), _record("L1", 3), _record("L1", 1), _record("L2", 4)]
+    direct_dir, staged_dir = tmp_path / "direct", tmp_path / "staged"
+    expected = write_records([(r, RULESET) for r in records[:3]], str(direct_dir)) + \
+        write_records([(r, RULESET) for r in records[3:]], str(direct_dir))
+
+    results = stage_records([(r, RULESET) for r in records[:3]], str(staged_dir))
+    assert materialize(str(staged_dir)) == {"Assay_A.xlsx": 3}
+    results += stage_records([(r, RULESET) for r in records[3:]], str(staged_dir))
+    assert materialize(str(staged_dir)) == {"Assay_A.xlsx": 1}
+    assert materialize(str(staged_dir)) == {"Assay_A.xlsx": 0}
+
+    assert [r.status for r in results] == [r.status for r in expected]
+    assert _cells(staged_dir / "Assay_A.xlsx") == _cells(direct_dir / "Assay_A.xlsx")
+
+    # Workbook verloren: rebuild erzeugt es aus dem Staging-Speicher neu
+    (staged_dir / "Assay_A.xlsx").unlink()
+    assert materialize(str(staged_dir), rebuild=True) == {"Assay_A.xlsx": 4}
+    assert _cells(staged_dir / "Assay_A.xlsx") == _cells(direct_dir / "Assay_A.xlsx")
+
+
+def test_materializer_schedule_writes_staged_rows_on_stop(tmp_path: Path):
+    with open_materializer(str(tmp_path), interval_s=3600):
+        stage_records([(_record("L1", 1), RULESET)], str(tmp_path))
+        assert not (tmp_path / "Assay_A.xlsx").exists()
+    assert _cells(tmp_path / "Assay_A.xlsx")["L1"][1][2] == "T|2024-01-01|10:00:00"